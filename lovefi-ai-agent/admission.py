@@ -0,0 +1,99 @@
+"""
+Admission control for the scoring handlers.
+
+Every match request used to start geocoding and scoring straight away, so a
+burst of requests slowed everyone down and kept growing memory. Scoring now
+runs in worker threads behind an AdmissionLane: at most max_concurrent
+requests run, at most max_queue more wait (each for up to max_wait seconds),
+and anything beyond that is rejected immediately with Overloaded. Interactive
+requests and batch jobs use separate lanes so a few large batches cannot
+starve single-pair requests.
+
+Handlers turn Overloaded into their usual error response. The rejection is
+also recorded in a context variable so rest_server.py can answer HTTP 429.
+"""
+
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+INTERACTIVE_MAX_CONCURRENT = 8
+INTERACTIVE_MAX_QUEUE = 32
+INTERACTIVE_MAX_WAIT = 2.0
+BATCH_MAX_CONCURRENT = 2
+BATCH_MAX_QUEUE = 4
+BATCH_MAX_WAIT = 10.0
+
+
+class Overloaded(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Set when a lane rejects a request in the current task
+rejection: ContextVar[Optional[Overloaded]] = ContextVar("admission_rejection", default=None)
+
+
+class AdmissionLane:
+    """Async context manager bounding concurrent work, with a bounded wait queue"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+
+    def _reject(self, reason: str) -> Overloaded:
+        err = Overloaded(f"server busy ({self.name} lane {reason}), try again later", retry_after=self.max_wait)
+        rejection.set(err)
+        return err
+
+    async def __aenter__(self):
+        if self._semaphore.locked():
+            if self.queued >= self.max_queue:
+                self.rejected_full += 1
+                raise self._reject("queue full")
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise self._reject(f"wait exceeded {self.max_wait:g}s") from None
+            finally:
+                self.queued -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lane": self.name,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+
+def interactive_lane() -> AdmissionLane:
+    return AdmissionLane("interactive", INTERACTIVE_MAX_CONCURRENT, INTERACTIVE_MAX_QUEUE, INTERACTIVE_MAX_WAIT)
+
+
+def batch_lane() -> AdmissionLane:
+    return AdmissionLane("batch", BATCH_MAX_CONCURRENT, BATCH_MAX_QUEUE, BATCH_MAX_WAIT)
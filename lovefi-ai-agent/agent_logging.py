@@ -0,0 +1,126 @@
+"""
+Low-overhead logging for the agents' hot paths.
+
+Handlers used to log every message with eager f-strings, so each chat
+message stringified its whole content list on the event loop, and then a
+StreamHandler wrote it to stdout before the handler could continue. This
+module moves that cost off the loop in three ways:
+
+- SampledLog.info() checks the level and a per-category sampling rate
+  before doing anything. It passes the message arguments through
+  unformatted, wrapped in Truncated so that payloads are cut to
+  max_chars when they are finally rendered.
+- install_queue_logging() replaces a logger's handlers with a
+  DeferredQueueHandler. Emitting a record is then a queue put, and a
+  QueueListener thread formats and writes it. Unlike the stock
+  QueueHandler, DeferredQueueHandler does not format the record in the
+  calling thread.
+- Warnings and errors are never sampled.
+
+Rates come from LOVEFI_LOG_SAMPLE, e.g. "chat=0.1,match=0.01,rest=0.01"
+(categories not listed are logged in full), and the truncation length from
+LOVEFI_LOG_MAX_CHARS.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import random
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_CHARS = 300
+
+CATEGORY_CHAT = "chat"
+CATEGORY_MATCH = "match"
+CATEGORY_REST = "rest"
+
+
+class Truncated:
+    """Renders str(value) cut to limit characters, only when the record is formatted"""
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: int):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        text = str(self.value)
+        if len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}... ({len(text)} chars)"
+
+
+def parse_rates(spec: str) -> Dict[str, float]:
+    """'chat=0.1,match=0.01' -> {'chat': 0.1, 'match': 0.01}"""
+    rates = {}
+    for part in spec.split(","):
+        if "=" in part:
+            category, rate = part.split("=", 1)
+            rates[category.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class SampledLog:
+    def __init__(self, rates: Optional[Dict[str, float]] = None, max_chars: int = DEFAULT_MAX_CHARS):
+        self.rates = rates or {}
+        self.max_chars = max_chars
+        self.dropped: Counter = Counter()
+
+    @classmethod
+    def from_env(cls) -> "SampledLog":
+        return cls(
+            rates=parse_rates(os.environ.get("LOVEFI_LOG_SAMPLE", "")),
+            max_chars=int(os.environ.get("LOVEFI_LOG_MAX_CHARS", DEFAULT_MAX_CHARS)),
+        )
+
+    def info(self, logger: logging.Logger, category: str, msg: str, *args: Any):
+        """logger.info(msg, *args) for a sampled share of category; str-like args are truncated"""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        rate = self.rates.get(category, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            self.dropped[category] += 1
+            return
+        limit = self.max_chars
+        # Numbers stay as they are so %d and %.1f placeholders still work
+        args = tuple(arg if isinstance(arg, (int, float)) else Truncated(arg, limit) for arg in args)
+        logger.info(msg, *args, stacklevel=2)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rates": dict(self.rates), "max_chars": self.max_chars, "dropped": dict(self.dropped)}
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Enqueue records as they are; the listener thread does all formatting"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def install_queue_logging(logger: logging.Logger) -> Optional[QueueListener]:
+    """
+    Move logger's handlers onto a listener thread. Call it after forking:
+    the listener thread does not survive fork().
+    """
+    handlers = [handler for handler in logger.handlers if not isinstance(handler, QueueHandler)]
+    if not handlers:
+        return None
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(DeferredQueueHandler(records))
+    listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener: QueueListener):
+    # QueueListener.stop() fails on Python < 3.12 if it was already stopped
+    if listener._thread is not None:
+        listener.stop()
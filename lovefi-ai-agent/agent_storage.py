@@ -0,0 +1,324 @@
+"""
+Write-behind key-value storage for the dating agents.
+
+uagents' default KeyValueStore rewrites the whole <address>_data.json file on
+every set, so the cost of storing one chat session grows with the number of
+sessions already stored. WriteBehindStore keeps the data in memory, queues
+changes, and appends them in batches to a JSON-lines log; the log is
+periodically compacted into a snapshot. set() is O(1) and disk work is
+proportional to what changed since the last flush.
+
+Recovery loads the snapshot and replays the log. Records are whole-value
+sets/removes applied in order, and a torn final line from a crash
+mid-append is skipped. Each compaction bumps a generation number, stored in
+the snapshot and as the first line of the fresh log. A log whose generation
+is older than the snapshot's was already folded into it (crash between
+writing the snapshot and truncating the log) and is not replayed, so keys
+removed by clear() cannot come back.
+
+flush_async() does the appends, fsyncs and compactions on a worker thread;
+the agents call it from their flush interval so disk waits stay off the
+event loop. A snapshot is copied on the loop thread and written by
+whichever write gets the I/O lock next, before any log records. Each batch
+remembers the generation it was taken in, and a batch that reaches the disk
+after a newer snapshot (compact() or clear() ran while it was in flight) is
+dropped, as the snapshot already holds it.
+
+SessionTable sits on top of the store and gives chat sessions an expiry
+and a per-sender limit, so sessions whose LLM reply never arrives do not
+accumulate forever.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from uagents.storage import StorageAPI
+
+DEFAULT_FLUSH_SECONDS = 1.0
+# Compact once the log holds this many times more records than live keys
+COMPACT_RATIO = 4
+COMPACT_MIN_RECORDS = 1000
+
+DEFAULT_SESSION_TTL = 900.0
+DEFAULT_MAX_SESSIONS_PER_SENDER = 8
+DEFAULT_SWEEP_SECONDS = 60.0
+
+
+class WriteBehindStore(StorageAPI):
+    """In-memory dict with batched appends to a log file and periodic compaction"""
+
+    def __init__(self, path: str):
+        self.log_path = path
+        self.snapshot_path = f"{path}.snapshot"
+        self._data: Dict[str, Any] = {}
+        self._pending: List[str] = []
+        self._log_records = 0
+        self._generation = 0
+        # Serializes file writes between flush(), flush_async() threads and compact()
+        self._io_lock = threading.Lock()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # Latest (generation, data) copy not yet on disk; only held for a swap
+        self._snapshot: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._snapshot_lock = threading.Lock()
+        self._recover()
+        # Generation of the snapshot on disk; guarded by _io_lock
+        self._disk_generation = self._generation
+
+    def _recover(self):
+        if os.path.isfile(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if set(snapshot) == {"generation", "data"} and isinstance(snapshot["generation"], int):
+                self._generation = snapshot["generation"]
+                self._data = snapshot["data"]
+            else:
+                # Written before generations existed
+                self._data = snapshot
+        if not os.path.isfile(self.log_path):
+            if self._generation:
+                self._reset_log(self._generation)
+            return
+        good_end = 0
+        log_generation = None
+        records = []
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good_end += len(line)
+                if "g" in record and log_generation is None and not records:
+                    log_generation = record["g"]
+                else:
+                    records.append(record)
+        if (log_generation or 0) != self._generation:
+            # Older than the snapshot (already folded into it), or a torn
+            # header from a crash while the log was being reset
+            self._reset_log(self._generation)
+            return
+        for record in records:
+            self._apply(record)
+        self._log_records = len(records)
+        # Drop a torn tail so the next append starts on a clean line
+        if good_end < os.path.getsize(self.log_path):
+            with open(self.log_path, "r+b") as f:
+                f.truncate(good_end)
+
+    def _apply(self, record: Dict[str, Any]):
+        if "v" in record:
+            self._data[record["k"]] = record["v"]
+        else:
+            self._data.pop(record["k"], None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def get(self, key: str) -> Any | None:
+        return self._data.get(key)
+
+    def has(self, key: str) -> bool:
+        return key in self._data
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = value
+        self._pending.append(json.dumps({"k": key, "v": value}))
+
+    def remove(self, key: str) -> None:
+        if key in self._data:
+            del self._data[key]
+            self._pending.append(json.dumps({"k": key}))
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.compact()
+
+    def keys(self):
+        return self._data.keys()
+
+    def _take_batch(self) -> Tuple[int, List[str]]:
+        """
+        On the caller's thread: the generation and the queued records, or no
+        records when the log is due for compaction and a snapshot was taken
+        """
+        pending, self._pending = self._pending, []
+        self._log_records += len(pending)
+        if self._log_records >= COMPACT_MIN_RECORDS and self._log_records > COMPACT_RATIO * len(self._data):
+            # The snapshot already holds the pending records
+            self._next_snapshot()
+            pending = []
+        return self._generation, pending
+
+    def _next_snapshot(self):
+        self._pending = []
+        self._log_records = 0
+        self._generation += 1
+        with self._snapshot_lock:
+            self._snapshot = (self._generation, dict(self._data))
+
+    def _write_due_snapshot(self):
+        """Write the latest snapshot taken on the loop thread, if any; needs _io_lock"""
+        with self._snapshot_lock:
+            snapshot, self._snapshot = self._snapshot, None
+        if snapshot is not None and snapshot[0] > self._disk_generation:
+            self._write_snapshot(*snapshot)
+
+    def _write(self, generation: int, pending: List[str]):
+        with self._io_lock:
+            self._write_due_snapshot()
+            # Older batches were taken before the snapshot on disk was copied
+            if pending and generation == self._disk_generation:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(pending) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def _write_snapshot(self, generation: int, data: Dict[str, Any]):
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation, "data": data}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._reset_log(generation)
+        self._disk_generation = generation
+
+    def _reset_log(self, generation: int):
+        """Truncate the log down to its generation header"""
+        with open(self.log_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"g": generation}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def flush(self) -> int:
+        """Append queued changes to the log; returns the number of records written"""
+        generation, pending = self._take_batch()
+        self._write(generation, pending)
+        return len(pending)
+
+    async def flush_async(self) -> int:
+        """flush() with the file writes and fsync on a worker thread"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        generation, pending = self._take_batch()
+        # Taken before yielding, so batches are written in the order they were queued
+        async with self._flush_lock:
+            await asyncio.to_thread(self._write, generation, pending)
+        return len(pending)
+
+    def compact(self):
+        """Write the live data as a new snapshot and truncate the log"""
+        # Held from the copy to the write, so an in-flight flush_async batch
+        # lands either before this snapshot or not at all
+        with self._io_lock:
+            self._next_snapshot()
+            self._write_due_snapshot()
+
+    def size_bytes(self) -> int:
+        """Bytes currently used on disk by the snapshot and log"""
+        return sum(os.path.getsize(p) for p in (self.snapshot_path, self.log_path) if os.path.isfile(p))
+
+
+class SessionTable:
+    """
+    Chat session -> sender mapping with expiry, persisted in a WriteBehindStore.
+
+    A session is opened when a chat turn is forwarded to the LLM agent and
+    closed when the structured output comes back. Sessions whose reply never
+    arrives expire after ttl seconds and are removed by sweep(); a sender may
+    hold at most max_per_sender open sessions, the oldest being evicted first.
+    """
+
+    def __init__(self, store: WriteBehindStore, ttl: float = DEFAULT_SESSION_TTL,
+                 max_per_sender: int = DEFAULT_MAX_SESSIONS_PER_SENDER):
+        self.store = store
+        self.ttl = ttl
+        self.max_per_sender = max_per_sender
+        # session -> expiry (wall clock, so it survives restarts), oldest first;
+        # one TTL for every session means open order is expiry order
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+        self._by_sender: Dict[str, "OrderedDict[str, None]"] = {}
+        self.expired = 0
+        self.evicted = 0
+        recovered = []
+        for key in store.keys():
+            value = store.get(key)
+            if isinstance(value, dict) and "sender" in value and "expires" in value:
+                recovered.append((value["expires"], key, value["sender"]))
+        for expires, session, sender in sorted(recovered):
+            self._track(session, sender, expires)
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def _track(self, session: str, sender: str, expires: float):
+        self._expiry[session] = expires
+        self._by_sender.setdefault(sender, OrderedDict())[session] = None
+
+    def _drop(self, session: str, sender: Optional[str]):
+        self._expiry.pop(session, None)
+        sessions = self._by_sender.get(sender)
+        if sessions is not None:
+            sessions.pop(session, None)
+            if not sessions:
+                del self._by_sender[sender]
+        self.store.remove(session)
+
+    def open(self, session: str, sender: str) -> List[str]:
+        """Record the sender of a session; returns sessions evicted to stay under the per-sender limit"""
+        if session in self._expiry:
+            self.close(session)
+        expires = time.time() + self.ttl
+        self._track(session, sender, expires)
+        self.store.set(session, {"sender": sender, "expires": expires})
+        evicted = []
+        sessions = self._by_sender[sender]
+        while len(sessions) > self.max_per_sender:
+            oldest = next(iter(sessions))
+            self._drop(oldest, sender)
+            evicted.append(oldest)
+        self.evicted += len(evicted)
+        return evicted
+
+    def sender(self, session: str) -> Optional[str]:
+        """Sender of an open, unexpired session"""
+        expires = self._expiry.get(session)
+        if expires is None or expires <= time.time():
+            return None
+        return self.store.get(session)["sender"]
+
+    def close(self, session: str):
+        value = self.store.get(session)
+        self._drop(session, value.get("sender") if isinstance(value, dict) else None)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Remove every expired session; returns how many were removed"""
+        now = time.time() if now is None else now
+        removed = 0
+        while self._expiry:
+            session, expires = next(iter(self._expiry.items()))
+            if expires > now:
+                break
+            self.close(session)
+            removed += 1
+        self.expired += removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "live_sessions": len(self._expiry),
+            "senders": len(self._by_sender),
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "storage_keys": len(self.store),
+            "storage_bytes": self.store.size_bytes(),
+        }
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+"""
+Memory benchmark for the compiled profile representation.
+
+Loads N synthetic profiles into a ProfileIndex and reports RSS growth per
+profile, plus the per-structure accounting from ProfileIndex.footprint()
+(bytes per compiled profile and per index entry). With --max-bytes-per-profile
+the exit status is 1 when RSS growth per profile exceeds the limit, so a CI
+job can catch regressions in the profile representation.
+
+    python bench_memory.py --profiles 200000 --lsh --max-bytes-per-profile 6000
+"""
+
+import argparse
+import gc
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(__file__))
+from match_engine import ProfileIndex
+from memory_stats import rss_bytes
+from minhash_lsh import MinHashLSH
+from synthetic_profiles import make_synthetic_profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=100000)
+    parser.add_argument("--lsh", action="store_true", help="also build the MinHash LSH index")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-footprint", action="store_true", help="skip the per-structure walk (slow at millions)")
+    parser.add_argument("--max-bytes-per-profile", type=float, default=None)
+    args = parser.parse_args()
+
+    gc.collect()
+    before = rss_bytes()
+    start = time.perf_counter()
+    index = ProfileIndex(lsh=MinHashLSH() if args.lsh else None)
+    for profile in make_synthetic_profiles(args.profiles, args.seed):
+        index.add(profile)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    growth = rss_bytes() - before
+    per_profile = growth / max(len(index), 1)
+
+    print(f"Loaded {len(index)} profiles in {elapsed:.1f}s ({'with' if args.lsh else 'without'} LSH)")
+    print(f"RSS growth: {growth / 2**20:.1f} MiB, {per_profile:.0f} bytes/profile")
+    if not args.no_footprint:
+        footprint = index.footprint()
+        print(f"Accounted: {footprint['bytes'] / 2**20:.1f} MiB, {footprint['bytes_per_profile']:.0f} bytes/profile")
+        print(f"{'structure':<16}{'entries':>12}{'MiB':>10}{'bytes/entry':>14}")
+        for name, structure in footprint["structures"].items():
+            print(f"{name:<16}{structure['entries']:>12}{structure['bytes'] / 2**20:>10.1f}"
+                  f"{structure['bytes_per_entry']:>14.1f}")
+
+    if args.max_bytes_per_profile is not None and per_profile > args.max_bytes_per_profile:
+        print(f"❌ {per_profile:.0f} bytes/profile exceeds the limit of {args.max_bytes_per_profile:.0f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
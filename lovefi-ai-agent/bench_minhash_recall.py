@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+"""
+Recall/speed benchmark for MinHash LSH candidate generation on interest sets.
+
+Builds a synthetic corpus, ranks it exactly by interest overlap for a sample
+of query profiles, and reports how many of the exact top-K each (bands, rows)
+configuration retrieves, how many candidates it returns and how long queries take.
+
+    python bench_minhash_recall.py --profiles 50000 --queries 200 --k 10
+"""
+
+import argparse
+import heapq
+import random
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(__file__))
+from minhash_lsh import MinHashLSH
+
+CONFIGS = [(8, 2), (16, 2), (16, 4), (32, 4), (32, 8)]
+
+
+def synthetic_corpus(num_profiles: int, vocab_size: int, num_clusters: int, seed: int):
+    """Interest sets drawn mostly from a per-profile cluster so high-overlap neighbours exist"""
+    rng = random.Random(seed)
+    vocab = [f"interest_{i}" for i in range(vocab_size)]
+    clusters = [rng.sample(vocab, 12) for _ in range(num_clusters)]
+    corpus = []
+    for _ in range(num_profiles):
+        cluster = rng.choice(clusters)
+        interests = set(rng.sample(cluster, rng.randint(3, 7)))
+        interests.update(rng.sample(vocab, rng.randint(0, 2)))
+        corpus.append(frozenset(interests))
+    return corpus
+
+
+def interest_score(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / max(len(a), len(b), 1)
+
+
+def exact_top_k(corpus, query_pid: int, k: int):
+    """Ids scoring at least the K-th best exact score (ties at the cut-off all count as relevant)"""
+    query = corpus[query_pid]
+    scored = [(interest_score(query, other), pid) for pid, other in enumerate(corpus) if pid != query_pid]
+    top = heapq.nlargest(k, scored)
+    if not top or top[-1][0] == 0:
+        return set(pid for score, pid in top if score > 0)
+    cutoff = top[-1][0]
+    return set(pid for score, pid in scored if score >= cutoff)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--vocab", type=int, default=300)
+    parser.add_argument("--clusters", type=int, default=0, help="default: one per 200 profiles")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    clusters = args.clusters or max(args.profiles // 200, 1)
+    corpus = synthetic_corpus(args.profiles, args.vocab, clusters, args.seed)
+    queries = random.Random(args.seed).sample(range(len(corpus)), args.queries)
+
+    start = time.perf_counter()
+    truth = {pid: exact_top_k(corpus, pid, args.k) for pid in queries}
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    print(f"Corpus: {len(corpus)} profiles, {args.queries} queries, K={args.k}")
+    print(f"Exact scan: {exact_ms:.2f} ms/query")
+    print("-" * 72)
+    print(f"{'bands':>5} {'rows':>4} {'build s':>8} {'recall@K':>9} {'cands/query':>12} {'ms/query':>9}")
+
+    for bands, rows in CONFIGS:
+        lsh = MinHashLSH(bands=bands, rows=rows)
+        start = time.perf_counter()
+        for pid, interests in enumerate(corpus):
+            lsh.add(pid, interests)
+        build_s = time.perf_counter() - start
+
+        hits = total = candidates = 0
+        start = time.perf_counter()
+        results = {pid: set(lsh.query(corpus[pid]) or ()) for pid in queries}
+        query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        for pid, found in results.items():
+            found.discard(pid)
+            candidates += len(found)
+            relevant = truth[pid]
+            expected = min(args.k, len(relevant))
+            hits += min(expected, len(relevant & found))
+            total += expected
+
+        recall = hits / total if total else 1.0
+        print(f"{bands:>5} {rows:>4} {build_s:>8.2f} {recall:>9.3f} {candidates / len(queries):>12.0f} {query_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
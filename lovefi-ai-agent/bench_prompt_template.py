@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+"""
+Per-message cost of building the StructuredOutputPrompt envelope sent to the
+LLM agent: per-message schema generation and serialization (the old
+handle_message path) versus the pre-serialized template.
+
+    python bench_prompt_template.py --iterations 2000
+"""
+
+import argparse
+import json
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(__file__))
+from uagents import Model
+
+from dating_match_agent import STRUCTURED_PROMPT_TEMPLATE, MatchRequest, StructuredOutputPrompt
+
+TEXT = "Alice, 25, lives in New York and loves hiking and cooking. Bob, 27, is in Brooklyn and into hiking and jazz."
+
+
+def per_message_envelope(text: str):
+    """What ctx.send did for every chat text: schema, model, digest, JSON body"""
+    message = StructuredOutputPrompt(prompt=text, output_schema=MatchRequest.schema())
+    return Model.build_schema_digest(message), message.model_dump_json()
+
+
+def templated_envelope(text: str):
+    return STRUCTURED_PROMPT_TEMPLATE.schema_digest, STRUCTURED_PROMPT_TEMPLATE.render(prompt=text)
+
+
+def time_per_call(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(TEXT)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    old_digest, old_body = per_message_envelope(TEXT)
+    new_digest, new_body = templated_envelope(TEXT)
+    assert old_digest == new_digest, "template digest differs from Model.build_schema_digest"
+    assert json.loads(old_body) == json.loads(new_body), "template body differs from model_dump_json"
+
+    old_us = time_per_call(per_message_envelope, args.iterations)
+    new_us = time_per_call(templated_envelope, args.iterations)
+    print(f"Envelope body: {len(new_body)} bytes")
+    print(f"Per-message schema + serialization: {old_us:8.1f} us/message")
+    print(f"Pre-serialized template:            {new_us:8.1f} us/message")
+    print(f"Saving:                             {old_us - new_us:8.1f} us/message ({old_us / new_us:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Local fast-path parser for chat match requests.
+
+Chat text is normally sent to the LLM agent to be turned into a MatchRequest.
+When the user already pasted a MatchRequest as JSON, or a simple form such as
+
+    name1: Alice Smith
+    age1: 25
+    location1: New York
+    interests1: reading, hiking
+    name2: Bob Jones
+    birthday2: 1998-04-02
+    location2: Brooklyn, NY
+
+the request is parsed here and scored immediately; only text that neither
+stage understands goes to the LLM.
+"""
+
+import json
+import re
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+STAGE_JSON = "json"
+STAGE_GRAMMAR = "grammar"
+STAGE_LLM = "llm"
+
+FIELD_ALIASES = {
+    "name": "name",
+    "full_name": "name",
+    "first_name": "name",
+    "birthday": "birthday",
+    "birth_date": "birthday",
+    "dob": "birthday",
+    "age": "age",
+    "gender": "gender",
+    "location": "location",
+    "address": "location",
+    "city": "location",
+    "search_radius": "search_radius",
+    "radius": "search_radius",
+    "interests": "interests",
+    "personal_interests": "interests",
+    "hobbies": "interests",
+}
+
+_LINE_RE = re.compile(r"^\s*(?:[-*]\s*)?([A-Za-z][\w \-]*?)\s*[:=]\s*(.+?)\s*$")
+_KEY_RE = re.compile(r"^(?:person_?)?([a-z_]+?)_?([12])$|^(?:person_?)?([12])_?([a-z_]+)$")
+_LIST_SPLIT_RE = re.compile(r"\s*(?:,|;|/|\band\b)\s*")
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+# Ages outside this range are left for the LLM stage
+MAX_AGE = 150
+
+parse_stats: Counter = Counter()
+
+
+def record_stage(stage: str):
+    parse_stats[stage] += 1
+
+
+def hit_rates() -> Dict[str, float]:
+    """Share of chat requests handled by each stage"""
+    total = sum(parse_stats.values())
+    if not total:
+        return {STAGE_JSON: 0.0, STAGE_GRAMMAR: 0.0, STAGE_LLM: 0.0}
+    return {stage: parse_stats[stage] / total for stage in (STAGE_JSON, STAGE_GRAMMAR, STAGE_LLM)}
+
+
+def _normalize_key(key: str) -> Optional[Tuple[str, str]]:
+    """Map 'Name 1', 'location2', 'person1_age' to (field, '1'|'2')"""
+    key = re.sub(r"[\s\-]+", "_", key.strip().lower())
+    match = _KEY_RE.match(key)
+    if not match:
+        return None
+    field, person = (match.group(1), match.group(2)) if match.group(1) else (match.group(4), match.group(3))
+    field = FIELD_ALIASES.get(field.strip("_"))
+    return (field, person) if field else None
+
+
+def _birthday_from_age(age: int) -> str:
+    if not 0 <= age <= MAX_AGE:
+        raise ValueError(f"age {age} is outside 0-{MAX_AGE}")
+    today = datetime.now(timezone.utc).date()
+    try:
+        return date(today.year - age, today.month, today.day).isoformat()
+    except ValueError:
+        return date(today.year - age, today.month, 28).isoformat()
+
+
+def _person(fields: Dict[str, Any], n: str) -> Optional[Dict[str, Any]]:
+    name = fields.get(("name", n))
+    location = fields.get(("location", n))
+    if not name or not location:
+        return None
+    parts = str(name).split()
+    if not parts:
+        return None
+    birthday = str(fields.get(("birthday", n), "") or "")
+    if not birthday and fields.get(("age", n)) is not None:
+        try:
+            birthday = _birthday_from_age(int(fields[("age", n)]))
+        except (TypeError, ValueError, OverflowError):
+            return None
+    interests = fields.get(("interests", n), [])
+    if isinstance(interests, str):
+        interests = [i for i in _LIST_SPLIT_RE.split(interests) if i]
+    elif not isinstance(interests, list) or not all(isinstance(i, str) for i in interests):
+        # Left for the LLM stage rather than guessing
+        return None
+    try:
+        search_radius = int(fields.get(("search_radius", n), 10))
+    except (TypeError, ValueError, OverflowError):
+        search_radius = 10
+    return {
+        f"personal_info{n}": {
+            "first_name": parts[0],
+            "last_name": " ".join(parts[1:]),
+            "birthday": birthday,
+        },
+        f"gender{n}": str(fields.get(("gender", n), "not_specified")),
+        f"location{n}": {"address": str(location), "search_radius": search_radius},
+        f"personal_interests{n}": list(interests),
+        f"partner_preferences{n}": [],
+    }
+
+
+def _from_fields(fields: Dict[Tuple[str, str], Any]) -> Optional[Dict[str, Any]]:
+    person1 = _person(fields, "1")
+    person2 = _person(fields, "2")
+    if person1 is None or person2 is None:
+        return None
+    return {**person1, **person2}
+
+
+def _parse_json(text: str) -> Optional[Dict[str, Any]]:
+    text = _FENCE_RE.sub("", text.strip())
+    if not text.startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    if "personal_info1" in data and "personal_info2" in data:
+        return data
+    fields = {}
+    for key, value in data.items():
+        normalized = _normalize_key(key)
+        if normalized:
+            fields[normalized] = value
+    return _from_fields(fields)
+
+
+def _parse_grammar(text: str) -> Optional[Dict[str, Any]]:
+    fields = {}
+    for line in text.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        normalized = _normalize_key(match.group(1))
+        if normalized:
+            fields[normalized] = match.group(2)
+    return _from_fields(fields)
+
+
+def parse_match_text(text: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Return (stage, MatchRequest-shaped dict), or (None, None) when the LLM is needed"""
+    data = _parse_json(text)
+    if data is not None:
+        return STAGE_JSON, data
+    data = _parse_grammar(text)
+    if data is not None:
+        return STAGE_GRAMMAR, data
+    return None, None
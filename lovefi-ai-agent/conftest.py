@@ -0,0 +1,12 @@
+"""
+pytest setup shared by the test scripts.
+
+Importing the agent modules creates their module-level GeocodeCache, so the
+cache is pointed at a temporary file before any test module is collected.
+"""
+
+import os
+import tempfile
+
+_cache_dir = tempfile.TemporaryDirectory(prefix="lovefi-tests-")
+os.environ["LOVEFI_GEOCODE_CACHE"] = os.path.join(_cache_dir.name, "geocode_cache.sqlite3")
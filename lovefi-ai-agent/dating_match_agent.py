@@ -1,4 +1,6 @@
+import asyncio
 from datetime import datetime, timedelta
+from time import perf_counter_ns
 from uuid import uuid4
 from typing import Any, List, Dict
 from uagents import Agent, Context, Model, Protocol
@@ -16,6 +18,23 @@ from uagents_core.contrib.protocols.chat import (
     chat_protocol_spec,
 )
 
+from agent_logging import CATEGORY_CHAT, CATEGORY_MATCH, SampledLog, install_queue_logging
+from admission import Overloaded, batch_lane, interactive_lane
+from agent_storage import DEFAULT_FLUSH_SECONDS, DEFAULT_SWEEP_SECONDS, SessionTable, WriteBehindStore
+from chat_parser import STAGE_LLM, parse_match_text, record_stage
+from dedup_cache import MISSING, TTLCache, payload_hash
+from geocode_budget import LOOKUP_TIMEOUT_SECONDS, TIER_NEUTRAL, TIER_SIMILARITY, BudgetedGeocoder, Deadline, locate_pair
+from geocode_cache import GeocodeCache
+from load_control import LoadController
+from loop_monitor import LoopMonitor
+from handler_profiler import HandlerProfiler
+from match_batch import chunk_by_size, score_batch_items
+from match_score import MatchScore, batch_details
+from stage_metrics import RequestTimings, observe, observe_components
+from session_tracing import NOOP_SPAN, SCORING_FAILED, SessionTracer, Span, timing_attributes
+from profile_cache import PendingRefs, ProfileCache, profile_version
+from protocol_templates import MessageTemplate, send_cached, send_template
+
 # Helper functions
 def calculate_age(birthday_str: str) -> int | None:
     if not birthday_str:
@@ -28,10 +47,13 @@ def calculate_age(birthday_str: str) -> int | None:
     except:
         return None
 
-def get_coordinates(address: str) -> tuple[float, float]:
+# Shared on disk with the other agents and REST workers
+geocode_cache = GeocodeCache()
+
+def lookup_coordinates(address: str) -> tuple[float, float]:
     try:
         url = f"https://nominatim.openstreetmap.org/search?q={requests.utils.quote(address)}&format=json&limit=1"
-        response = requests.get(url, headers={'User-Agent': 'DatingMatchAgent/1.0'})
+        response = requests.get(url, headers={'User-Agent': 'DatingMatchAgent/1.0'}, timeout=LOOKUP_TIMEOUT_SECONDS)
         if response.status_code == 200:
             data = response.json()
             if data:
@@ -40,6 +62,9 @@ def get_coordinates(address: str) -> tuple[float, float]:
         pass
     return None, None
 
+# Answers within each request's latency budget, falling back to cheaper tiers
+get_coordinates = BudgetedGeocoder(lookup_coordinates, geocode_cache)
+
 def haversine(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
     lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
     dlon = lon2 - lon1
@@ -83,6 +108,68 @@ class MatchResponse(Model):
     score: float
     details: str
 
+# Batched MatchRequests: many pairs per envelope, matched up by correlation_id.
+# Large responses arrive as several MatchBatchResponse chunks
+class MatchBatchItem(Model):
+    correlation_id: str
+    request: MatchRequest
+    # "straight", "gay", "lesbian", ...; with the genders these pre-filter
+    # incompatible pairs, and an empty value is open to any gender
+    sexuality1: str = ""
+    sexuality2: str = ""
+
+class MatchBatchRequest(Model):
+    batch_id: str
+    items: List[MatchBatchItem]
+    # Per-pair details strings are only rendered on request
+    with_details: bool = False
+
+class MatchBatchResult(Model):
+    correlation_id: str
+    score: float
+    details: str
+
+class MatchBatchResponse(Model):
+    batch_id: str
+    chunk: int
+    chunks: int
+    results: List[MatchBatchResult]
+
+# Profile-reference messages: callers upload each profile once and then refer
+# to it by id and version hash (profile_cache.profile_version). The agent answers
+# a MatchRefRequest for profiles it lacks with a ProfileFetchRequest
+class MatchProfile(Model):
+    personal_info: PersonalInfo
+    gender: str
+    location: Location
+    personal_interests: List[str]
+    partner_preferences: List[Preference]
+
+class ProfileRef(Model):
+    profile_id: str
+    version: str
+
+class MatchRefRequest(Model):
+    request_id: str
+    profile1: ProfileRef
+    profile2: ProfileRef
+
+class MatchRefResponse(Model):
+    request_id: str
+    score: float
+    details: str
+
+class ProfileFetchRequest(Model):
+    profiles: List[ProfileRef]
+
+class ProfileUploadEntry(Model):
+    profile_id: str
+    version: str
+    profile: MatchProfile
+
+class ProfileUpload(Model):
+    profiles: List[ProfileUploadEntry]
+
 # Initialize the agent
 agent = Agent(
     name="DatingMatchAgent",
@@ -92,6 +179,11 @@ agent = Agent(
     endpoint=["http://localhost:8000/submit"]
 )
 
+# Per-message state (chat session senders) lives in a write-behind store:
+# ctx.storage rewrites its whole JSON file on every set
+agent_store = WriteBehindStore(f"{agent.address[0:16]}_sessions.log")
+chat_sessions = SessionTable(agent_store)
+
 # Define the chat protocol and structured output protocol
 chat_proto = Protocol(spec=chat_protocol_spec)
 struct_output_client_proto = Protocol(
@@ -115,13 +207,38 @@ def create_text_chat(text: str, end_session: bool = False) -> ChatMessage:
         content=content,
     )
 
+def score_location(
+    location1: Location, location2: Location, geocode=get_coordinates, deadline: Deadline | None = None
+) -> tuple[float, float | None, str]:
+    """Location compatibility out of 20, the distance in km if known, and the geocode tier used"""
+    dist = None
+    try:
+        (lat1, lon1), (lat2, lon2), tier = locate_pair(location1.address, location2.address, geocode, deadline)
+    except Exception:
+        tier = TIER_SIMILARITY
+    if tier == TIER_NEUTRAL:
+        loc_score = 10  # Neutral if unknown
+    elif tier == TIER_SIMILARITY:
+        # Fallback to string similarity
+        similarity = difflib.SequenceMatcher(None, location1.address.lower(), location2.address.lower()).ratio()
+        loc_score = similarity * 20
+    else:
+        dist = haversine(lon1, lat1, lon2, lat2)
+        max_radius = max(location1.search_radius, location2.search_radius)
+        if max_radius > 0 and dist <= max_radius:
+            loc_score = 20 * (1 - dist / max_radius)
+        else:
+            loc_score = 0
+    return loc_score, dist, tier
+
 # Function to calculate match score (wrapper for simple parameters)
 def calculate_match_score(
     name1: str = None, age1: int = None, interests1: List[str] = None, location1: str = None, preferences1: dict = None,
     name2: str = None, age2: int = None, interests2: List[str] = None, location2: str = None, preferences2: dict = None,
     # Original parameters for backward compatibility
     personal_info1: PersonalInfo = None, gender1: str = None, location1_obj: Location = None, personal_interests1: List[str] = None, partner_preferences1: List[Preference] = None,
-    personal_info2: PersonalInfo = None, gender2: str = None, location2_obj: Location = None, personal_interests2: List[str] = None, partner_preferences2: List[Preference] = None
+    personal_info2: PersonalInfo = None, gender2: str = None, location2_obj: Location = None, personal_interests2: List[str] = None, partner_preferences2: List[Preference] = None,
+    deadline: Deadline | None = None
 ) -> tuple[float, str]:
     # Handle simple parameter format (for testing)
     if name1 is not None and personal_info1 is None:
@@ -148,68 +265,46 @@ def calculate_match_score(
         gender2 = "not_specified"
         
         # Call special version for simple parameters that handles ages directly
-        return calculate_match_score_simple(
+        result = calculate_match_score_simple(
             age1, age2, personal_interests1, personal_interests2, location1_obj, location2_obj, 
-            partner_preferences1, partner_preferences2, max_age_diff1, max_age_diff2
+            partner_preferences1, partner_preferences2, max_age_diff1, max_age_diff2, deadline=deadline
         )
+        return result.score, result.details()
     
-    return calculate_match_score_internal(
+    result = calculate_match_score_internal(
         personal_info1, gender1, location1_obj, personal_interests1, partner_preferences1,
-        personal_info2, gender2, location2_obj, personal_interests2, partner_preferences2
+        personal_info2, gender2, location2_obj, personal_interests2, partner_preferences2,
+        deadline=deadline
     )
+    return result.score, result.details()
 
 # Simple function for test cases with direct age parameters
 def calculate_match_score_simple(
     age1: int, age2: int, personal_interests1: List[str], personal_interests2: List[str], 
     location1: Location, location2: Location, partner_preferences1: List[Preference], 
-    partner_preferences2: List[Preference], max_age_diff1: int, max_age_diff2: int
-) -> tuple[float, str]:
-    score = 0.0
-    details = []
-
+    partner_preferences2: List[Preference], max_age_diff1: int, max_age_diff2: int,
+    deadline: Deadline | None = None
+) -> MatchScore:
+    started = perf_counter_ns()
     # Interest compatibility (40%)
     common_interests = set(personal_interests1).intersection(set(personal_interests2))
     max_interests = max(len(personal_interests1), len(personal_interests2), 1)
     interest_score = (len(common_interests) / max_interests) * 40
-    score += interest_score
-    details.append(f"Interest compatibility: {interest_score:.1f}/40 (Common interests: {', '.join(common_interests) or 'None'})")
+    interest_done = perf_counter_ns()
 
     # Age compatibility (20%) - Use direct ages
     if age1 is not None and age2 is not None:
         age_diff = abs(age1 - age2)
         max_age_diff = max(max_age_diff1, max_age_diff2)
         age_score = max(0, (1 - age_diff / max_age_diff)) * 20 if max_age_diff > 0 else 20
-        age_detail = f"{age_diff} years"
     else:
+        age_diff = None
         age_score = 10  # Neutral if unknown
-        age_detail = "Unknown"
-    score += age_score
-    details.append(f"Age compatibility: {age_score:.1f}/20 (Age difference: {age_detail})")
+    age_done = perf_counter_ns()
 
     # Location compatibility (20%)
-    loc_score = 0.0
-    dist = None
-    try:
-        lat1, lon1 = get_coordinates(location1.address)
-        lat2, lon2 = get_coordinates(location2.address)
-        if lat1 is not None and lon1 is not None and lat2 is not None and lon2 is not None:
-            dist = haversine(lon1, lat1, lon2, lat2)
-            max_radius = max(location1.search_radius, location2.search_radius)
-            if dist <= max_radius:
-                loc_score = 20 * (1 - dist / max_radius)
-            else:
-                loc_score = 0
-        else:
-            # Fallback to string similarity
-            similarity = difflib.SequenceMatcher(None, location1.address.lower(), location2.address.lower()).ratio()
-            loc_score = similarity * 20
-    except Exception:
-        # Fallback
-        similarity = difflib.SequenceMatcher(None, location1.address.lower(), location2.address.lower()).ratio()
-        loc_score = similarity * 20
-    score += loc_score
-    dist_str = f"{dist:.1f} km" if dist is not None else "Unknown"
-    details.append(f"Location compatibility: {loc_score:.1f}/20 (Distance: {dist_str})")
+    loc_score, dist, tier = score_location(location1, location2, deadline=deadline)
+    location_done = perf_counter_ns()
 
     # Preference compatibility (20%)
     num_matching = 0
@@ -221,68 +316,46 @@ def calculate_match_score_simple(
         pref_score = (num_matching / total) * 20
     else:
         pref_score = 0
-    score += pref_score
-    details.append(f"Preference compatibility: {pref_score:.1f}/20 (Matching preferences: {num_matching}/{total})")
+    observe_components(
+        started, interest_done, age_done, location_done, perf_counter_ns(),
+        deadline.timings if deadline is not None else None
+    )
 
-    # Ensure score is between 0 and 100
-    score = min(max(score, 0), 100)
-    return score, "; ".join(details)
+    return MatchScore(
+        interest_score, age_score, loc_score, pref_score,
+        common_interests=common_interests, age_diff=age_diff, distance=dist, location_tier=tier,
+        matching_preferences=num_matching, total_preferences=total,
+        reduced=deadline is not None and deadline.reduced,
+    )
 
 # Internal function with original logic
 def calculate_match_score_internal(
     personal_info1: PersonalInfo, gender1: str, location1: Location, personal_interests1: List[str], partner_preferences1: List[Preference],
-    personal_info2: PersonalInfo, gender2: str, location2: Location, personal_interests2: List[str], partner_preferences2: List[Preference]
-) -> tuple[float, str]:
-    score = 0.0
-    details = []
-
-    # Calculate ages
-    age1 = calculate_age(personal_info1.birthday)
-    age2 = calculate_age(personal_info2.birthday)
-
+    personal_info2: PersonalInfo, gender2: str, location2: Location, personal_interests2: List[str], partner_preferences2: List[Preference], geocode=get_coordinates,
+    deadline: Deadline | None = None
+) -> MatchScore:
+    started = perf_counter_ns()
     # Interest compatibility (40%)
     common_interests = set(personal_interests1).intersection(set(personal_interests2))
     max_interests = max(len(personal_interests1), len(personal_interests2), 1)
     interest_score = (len(common_interests) / max_interests) * 40
-    score += interest_score
-    details.append(f"Interest compatibility: {interest_score:.1f}/40 (Common interests: {', '.join(common_interests) or 'None'})")
+    interest_done = perf_counter_ns()
 
     # Age compatibility (20%)
+    age1 = calculate_age(personal_info1.birthday)
+    age2 = calculate_age(personal_info2.birthday)
     if age1 is not None and age2 is not None:
         age_diff = abs(age1 - age2)
         max_age_diff = 10  # Default, can be extended if added to preferences
         age_score = max(0, (1 - age_diff / max_age_diff)) * 20 if max_age_diff > 0 else 20
-        age_detail = f"{age_diff} years"
     else:
+        age_diff = None
         age_score = 10  # Neutral if unknown
-        age_detail = "Unknown"
-    score += age_score
-    details.append(f"Age compatibility: {age_score:.1f}/20 (Age difference: {age_detail})")
+    age_done = perf_counter_ns()
 
     # Location compatibility (20%)
-    loc_score = 0.0
-    dist = None
-    try:
-        lat1, lon1 = get_coordinates(location1.address)
-        lat2, lon2 = get_coordinates(location2.address)
-        if lat1 is not None and lon1 is not None and lat2 is not None and lon2 is not None:
-            dist = haversine(lon1, lat1, lon2, lat2)
-            max_radius = max(location1.search_radius, location2.search_radius)
-            if dist <= max_radius:
-                loc_score = 20 * (1 - dist / max_radius)
-            else:
-                loc_score = 0
-        else:
-            # Fallback to string similarity
-            similarity = difflib.SequenceMatcher(None, location1.address.lower(), location2.address.lower()).ratio()
-            loc_score = similarity * 20
-    except Exception:
-        # Fallback
-        similarity = difflib.SequenceMatcher(None, location1.address.lower(), location2.address.lower()).ratio()
-        loc_score = similarity * 20
-    score += loc_score
-    dist_str = f"{dist:.1f} km" if dist is not None else "Unknown"
-    details.append(f"Location compatibility: {loc_score:.1f}/20 (Distance: {dist_str})")
+    loc_score, dist, tier = score_location(location1, location2, geocode, deadline)
+    location_done = perf_counter_ns()
 
     # Preference compatibility (20%)
     num_matching = 0
@@ -294,12 +367,17 @@ def calculate_match_score_internal(
         pref_score = (num_matching / total) * 20
     else:
         pref_score = 0
-    score += pref_score
-    details.append(f"Preference compatibility: {pref_score:.1f}/20 (Matching preferences: {num_matching}/{total})")
+    observe_components(
+        started, interest_done, age_done, location_done, perf_counter_ns(),
+        deadline.timings if deadline is not None else None
+    )
 
-    # Ensure score is between 0 and 100
-    score = min(max(score, 0), 100)
-    return score, "; ".join(details)
+    return MatchScore(
+        interest_score, age_score, loc_score, pref_score,
+        common_interests=common_interests, age_diff=age_diff, distance=dist, location_tier=tier,
+        matching_preferences=num_matching, total_preferences=total,
+        reduced=deadline is not None and deadline.reduced,
+    )
 
 class StructuredOutputPrompt(Model):
     prompt: str
@@ -308,31 +386,152 @@ class StructuredOutputPrompt(Model):
 class StructuredOutputResponse(Model):
     output: dict[str, Any]
 
+# The MatchRequest schema never changes, so the prompt envelope around it is
+# built once; each chat message only serializes the user's text
+STRUCTURED_PROMPT_TEMPLATE = MessageTemplate(StructuredOutputPrompt, output_schema=MatchRequest.schema())
+
+# Recently seen chat msg_ids -> reply already sent (None while the LLM path is pending)
+chat_dedup = TTLCache()
+# MatchRequest payload hashes -> MatchResponse, so duplicated envelopes are not rescored
+match_dedup = TTLCache()
+# Validated profiles by id, MatchRefRequests waiting for a ProfileUpload, and
+# scores keyed by (id, version) pairs
+profile_cache = ProfileCache()
+pending_refs = PendingRefs()
+ref_scores = TTLCache()
+# Bounded concurrency for scoring; single pairs and batches queue in separate lanes
+interactive_admission = interactive_lane()
+batch_admission = batch_lane()
+# Switches scoring to reduced mode while the event loop lags or the lanes back up
+load_controller = LoadController([interactive_admission, batch_admission])
+# Samples LOVEFI_PROFILE_RATE of scoring calls and replies under cProfile
+profiler = HandlerProfiler.from_env()
+# Records the handler and stack whenever something blocks the event loop
+loop_monitor = LoopMonitor()
+# Hot-path log lines: lazily formatted, truncated and sampled per LOVEFI_LOG_SAMPLE
+hot_log = SampledLog.from_env()
+# Spans for each hop of a chat match, exported per LOVEFI_TRACE_FILE or LOVEFI_TRACE_ENDPOINT
+tracer = SessionTracer.from_env(agent.name)
+
+async def send_match_score(ctx: Context, recipient: str, prompt: MatchRequest, trace: Span = NOOP_SPAN) -> ChatMessage | None:
+    """Score a parsed chat match request and reply with the result; returns the reply sent, or None on failure"""
+    span = trace.child("score")
+    try:
+        async with interactive_admission:
+            deadline = load_controller.deadline()
+            if span.recording:
+                deadline.timings = RequestTimings()
+            result = await asyncio.to_thread(
+                profiler.call, calculate_match_score_internal,
+                prompt.personal_info1, prompt.gender1, prompt.location1, prompt.personal_interests1, prompt.partner_preferences1,
+                prompt.personal_info2, prompt.gender2, prompt.location2, prompt.personal_interests2, prompt.partner_preferences2,
+                deadline=deadline
+            )
+            started = perf_counter_ns()
+            score, details = result.score, result.details()
+    except Overloaded as err:
+        span.end(error=str(err))
+        ctx.logger.warning(f"Rejected chat match request from {recipient}: {err}")
+        await ctx.send(
+            recipient,
+            create_text_chat(
+                "Sorry, I'm handling too many match requests right now. Please try again in a moment."
+            ),
+        )
+        return
+    except Exception as err:
+        span.end(error=str(err))
+        ctx.logger.error(f"Error calculating match score: {err}")
+        await ctx.send(
+            recipient,
+            create_text_chat(
+                "Sorry, I couldn't process your match request. Please try again later."
+            ),
+        )
+        return
+
+    span.set(score=score, location_tier=deadline.tier or "", **timing_attributes(deadline.timings))
+    span.end()
+
+    reply = trace.child("reply")
+    name1 = f"{prompt.personal_info1.first_name} {prompt.personal_info1.last_name}"
+    name2 = f"{prompt.personal_info2.first_name} {prompt.personal_info2.last_name}"
+    response_text = f"Match Score for {name1} and {name2}: {score:.1f}/100"
+    if details:
+        response_text += f"\nDetails: {details}"
+    chat_message = create_text_chat(response_text)
+    observe("response", perf_counter_ns() - started)
+    started = perf_counter_ns()
+    async with profiler.section("send"):
+        await send_cached(ctx, recipient, chat_message, chat_proto.digest)
+    observe("send", perf_counter_ns() - started)
+    reply.end()
+    return chat_message
+
 @chat_proto.on_message(ChatMessage)
 async def handle_message(ctx: Context, sender: str, msg: ChatMessage):
-    ctx.logger.info(f"Got a message from {sender}: {msg.content}")
-    ctx.storage.set(str(ctx.session), sender)
-    await ctx.send(
+    hot_log.info(ctx.logger, CATEGORY_CHAT, "Got a message from %s: %s", sender, msg.content)
+    await send_cached(
+        ctx,
         sender,
         ChatAcknowledgement(timestamp=datetime.utcnow(), acknowledged_msg_id=msg.msg_id),
+        chat_proto.digest,
     )
 
-    for item in msg.content:
-        if isinstance(item, StartSessionContent):
-            ctx.logger.info(f"Got a start session message from {sender}")
-            continue
-        elif isinstance(item, TextContent):
-            ctx.logger.info(f"Got a text message from {sender}: {item.text}")
-            ctx.storage.set(str(ctx.session), sender)
-            await ctx.send(
-                AI_AGENT_ADDRESS,
-                StructuredOutputPrompt(
-                    prompt=item.text,
-                    output_schema=MatchRequest.model_json_schema()
-                ),
-            )
-        else:
-            ctx.logger.info(f"Got unexpected content from {sender}")
+    cached_reply = chat_dedup.get(msg.msg_id)
+    if cached_reply is not MISSING:
+        hot_log.info(ctx.logger, CATEGORY_CHAT, "Duplicate message %s from %s, not reprocessing", msg.msg_id, sender)
+        if cached_reply is not None:
+            await send_cached(ctx, sender, cached_reply, chat_proto.digest)
+        return
+    chat_dedup.put(msg.msg_id)
+
+    try:
+        for item in msg.content:
+            if isinstance(item, StartSessionContent):
+                hot_log.info(ctx.logger, CATEGORY_CHAT, "Got a start session message from %s", sender)
+                continue
+            elif isinstance(item, TextContent):
+                hot_log.info(ctx.logger, CATEGORY_CHAT, "Got a text message from %s: %s", sender, item.text)
+                trace = tracer.trace(str(ctx.session), str(msg.msg_id), "chat_match", sender=sender)
+                parse_span = trace.child("parse_text")
+                started = perf_counter_ns()
+                try:
+                    stage, data = parse_match_text(item.text)
+                    if stage is not None:
+                        prompt = MatchRequest.parse_obj(data)
+                        observe("parse", perf_counter_ns() - started)
+                except Exception as err:
+                    # Anything the fast path cannot handle goes to the LLM instead of dropping the message
+                    hot_log.info(ctx.logger, CATEGORY_CHAT, "Local parse failed, using LLM: %s", err)
+                    stage = None
+                parse_span.set(stage=stage or STAGE_LLM)
+                parse_span.end()
+                if stage is not None:
+                    record_stage(stage)
+                    hot_log.info(ctx.logger, CATEGORY_CHAT, "Parsed match request locally (%s), skipping LLM round-trip", stage)
+                    reply = await send_match_score(ctx, sender, prompt, trace)
+                    if reply is not None:
+                        chat_dedup.put(msg.msg_id, reply)
+                    else:
+                        # Failures are not cached, so a retry of this msg_id is scored again
+                        chat_dedup.discard(msg.msg_id)
+                    trace.end(error=None if reply is not None else SCORING_FAILED)
+                    continue
+                record_stage(STAGE_LLM)
+                evicted = chat_sessions.open(str(ctx.session), sender)
+                if evicted:
+                    hot_log.info(ctx.logger, CATEGORY_CHAT, "%s has too many open sessions, dropped the %s oldest", sender, len(evicted))
+                tracer.hand_off(str(ctx.session), trace, "llm", agent=AI_AGENT_ADDRESS)
+                await send_template(
+                    ctx, AI_AGENT_ADDRESS, STRUCTURED_PROMPT_TEMPLATE, struct_output_client_proto.digest, prompt=item.text
+                )
+            else:
+                hot_log.info(ctx.logger, CATEGORY_CHAT, "Got unexpected content from %s", sender)
+    except BaseException:
+        # Free the reservation so a retry of this msg_id is processed again
+        chat_dedup.discard(msg.msg_id)
+        raise
 
 @chat_proto.on_message(ChatAcknowledgement)
 async def handle_ack(ctx: Context, sender: str, msg: ChatAcknowledgement):
@@ -344,12 +543,15 @@ async def handle_ack(ctx: Context, sender: str, msg: ChatAcknowledgement):
 async def handle_structured_output_response(
     ctx: Context, sender: str, msg: StructuredOutputResponse
 ):
-    session_sender = ctx.storage.get(str(ctx.session))
+    session_sender = chat_sessions.sender(str(ctx.session))
+    trace = tracer.resume(str(ctx.session), "chat_match", llm_agent=sender)
     if session_sender is None:
+        trace.end(error="unknown or expired session")
         ctx.logger.error(
-            "Discarding message because no session sender found in storage"
+            "Discarding message because no session sender found in storage (unknown or expired session)"
         )
         return
+    chat_sessions.close(str(ctx.session))
 
     if "<UNKNOWN>" in str(msg.output):
         await ctx.send(
@@ -358,11 +560,17 @@ async def handle_structured_output_response(
                 "Sorry, I couldn't process your match request. Please provide details for two people to compare."
             ),
         )
+        trace.end(error="LLM could not extract two profiles")
         return
 
+    parse_span = trace.child("parse_output")
     try:
+        started = perf_counter_ns()
         prompt = MatchRequest.parse_obj(msg.output)
+        observe("parse", perf_counter_ns() - started)
+        parse_span.end()
     except Exception as err:
+        parse_span.end(error=str(err))
         ctx.logger.error(f"Error parsing structured output: {err}")
         await ctx.send(
             session_sender,
@@ -370,40 +578,42 @@ async def handle_structured_output_response(
                 "Sorry, I couldn't process your match request. Please try again with valid details."
             ),
         )
+        trace.end(error="invalid structured output")
         return
 
-    try:
-        score, details = calculate_match_score_internal(
-            prompt.personal_info1, prompt.gender1, prompt.location1, prompt.personal_interests1, prompt.partner_preferences1,
-            prompt.personal_info2, prompt.gender2, prompt.location2, prompt.personal_interests2, prompt.partner_preferences2
-        )
-    except Exception as err:
-        ctx.logger.error(f"Error calculating match score: {err}")
-        await ctx.send(
-            session_sender,
-            create_text_chat(
-                "Sorry, I couldn't process your match request. Please try again later."
-            ),
-        )
-        return
-
-    name1 = f"{prompt.personal_info1.first_name} {prompt.personal_info1.last_name}"
-    name2 = f"{prompt.personal_info2.first_name} {prompt.personal_info2.last_name}"
-    response_text = f"Match Score for {name1} and {name2}: {score:.1f}/100\nDetails: {details}"
-    chat_message = create_text_chat(response_text)
-    await ctx.send(session_sender, chat_message)
+    reply = await send_match_score(ctx, session_sender, prompt, trace)
+    trace.end(error=None if reply is not None else SCORING_FAILED)
 
 # Protocol handler for direct match calculation requests
 @agent.on_message(MatchRequest, replies=MatchResponse)
 async def handle_match_calculation(ctx: Context, sender: str, msg: MatchRequest):
-    ctx.logger.info(f"Received match calculation request from {sender}")
+    hot_log.info(ctx.logger, CATEGORY_MATCH, "Received match calculation request from %s", sender)
+    request_key = payload_hash(msg)
+    cached_response = match_dedup.get(request_key)
+    if cached_response is not MISSING:
+        hot_log.info(ctx.logger, CATEGORY_MATCH, "Duplicate match request from %s, replaying cached response", sender)
+        await ctx.send(sender, cached_response)
+        return
     try:
-        score, details = calculate_match_score_internal(
-            msg.personal_info1, msg.gender1, msg.location1, msg.personal_interests1, msg.partner_preferences1,
-            msg.personal_info2, msg.gender2, msg.location2, msg.personal_interests2, msg.partner_preferences2
-        )
+        async with interactive_admission:
+            result = await asyncio.to_thread(
+                profiler.call, calculate_match_score_internal,
+                msg.personal_info1, msg.gender1, msg.location1, msg.personal_interests1, msg.partner_preferences1,
+                msg.personal_info2, msg.gender2, msg.location2, msg.personal_interests2, msg.partner_preferences2,
+                deadline=load_controller.deadline()
+            )
+            started = perf_counter_ns()
+            score, details = result.score, result.details()
         response = MatchResponse(score=score, details=details)
-        await ctx.send(sender, response)
+        observe("response", perf_counter_ns() - started)
+        match_dedup.put(request_key, response)
+        started = perf_counter_ns()
+        async with profiler.section("send"):
+            await ctx.send(sender, response)
+        observe("send", perf_counter_ns() - started)
+    except Overloaded as err:
+        ctx.logger.warning(f"Rejected match request from {sender}: {err}")
+        await ctx.send(sender, MatchResponse(score=0.0, details=f"Error processing match request: {str(err)}"))
     except Exception as err:
         ctx.logger.error(f"Error processing match request: {err}")
         error_response = MatchResponse(
@@ -412,14 +622,129 @@ async def handle_match_calculation(ctx: Context, sender: str, msg: MatchRequest)
         )
         await ctx.send(sender, error_response)
 
+def batch_geocode():
+    # Batches never wait on live lookups in reduced mode
+    return get_coordinates.cached if load_controller.reduced else get_coordinates
+
+def score_match_request(msg: MatchRequest, geocode=get_coordinates) -> MatchScore:
+    return calculate_match_score_internal(
+        msg.personal_info1, msg.gender1, msg.location1, msg.personal_interests1, msg.partner_preferences1,
+        msg.personal_info2, msg.gender2, msg.location2, msg.personal_interests2, msg.partner_preferences2,
+        geocode=geocode,
+    )
+
+@agent.on_message(MatchBatchRequest, replies=MatchBatchResponse)
+async def handle_match_batch(ctx: Context, sender: str, msg: MatchBatchRequest):
+    hot_log.info(ctx.logger, CATEGORY_MATCH, "Received match batch %s with %s pairs from %s", msg.batch_id, len(msg.items), sender)
+    try:
+        async with batch_admission:
+            scores = await score_batch_items(msg.items, score_match_request, batch_geocode())
+    except Overloaded as err:
+        ctx.logger.warning(f"Rejected match batch {msg.batch_id} from {sender}: {err}")
+        scores = [MatchScore.failed(f"Error processing match request: {str(err)}")] * len(msg.items)
+    results = [
+        MatchBatchResult(correlation_id=item.correlation_id, score=result.score, details=batch_details(result, msg.with_details))
+        for item, result in zip(msg.items, scores)
+    ]
+    chunks = chunk_by_size(results)
+    for index, chunk in enumerate(chunks):
+        await ctx.send(
+            sender,
+            MatchBatchResponse(batch_id=msg.batch_id, chunk=index, chunks=len(chunks), results=chunk),
+        )
+
+async def score_or_fetch_refs(ctx: Context, sender: str, msg: MatchRefRequest):
+    """Reply with the score if both profiles are cached, otherwise park the request and fetch them"""
+    refs = (msg.profile1, msg.profile2)
+    missing = [(ref.profile_id, ref.version) for ref in refs if not profile_cache.has(ref.profile_id, ref.version)]
+    if missing:
+        to_fetch = pending_refs.park(sender, msg.request_id, msg, missing)
+        if to_fetch:
+            await ctx.send(sender, ProfileFetchRequest(
+                profiles=[ProfileRef(profile_id=profile_id, version=version) for profile_id, version in to_fetch]
+            ))
+        return
+
+    key = (msg.profile1.profile_id, msg.profile1.version, msg.profile2.profile_id, msg.profile2.version)
+    result = ref_scores.get(key)
+    if result is MISSING:
+        p1 = profile_cache.get(msg.profile1.profile_id, msg.profile1.version)
+        p2 = profile_cache.get(msg.profile2.profile_id, msg.profile2.version)
+        try:
+            async with interactive_admission:
+                result = await asyncio.to_thread(
+                    profiler.call, calculate_match_score_internal,
+                    p1.personal_info, p1.gender, p1.location, p1.personal_interests, p1.partner_preferences,
+                    p2.personal_info, p2.gender, p2.location, p2.personal_interests, p2.partner_preferences,
+                    deadline=load_controller.deadline()
+                )
+        except Overloaded as err:
+            ctx.logger.warning(f"Rejected match request {msg.request_id} from {sender}: {err}")
+            result = MatchScore.failed(f"Error processing match request: {str(err)}")
+        except Exception as err:
+            ctx.logger.error(f"Error processing match request: {err}")
+            result = MatchScore.failed(f"Error processing match request: {str(err)}")
+        else:
+            ref_scores.put(key, result)
+    await ctx.send(sender, MatchRefResponse(request_id=msg.request_id, score=result.score, details=result.details()))
+
+@agent.on_message(MatchRefRequest)
+async def handle_match_ref_request(ctx: Context, sender: str, msg: MatchRefRequest):
+    hot_log.info(ctx.logger, CATEGORY_MATCH, "Received match request %s by profile reference from %s", msg.request_id, sender)
+    await score_or_fetch_refs(ctx, sender, msg)
+
+@agent.on_message(ProfileUpload)
+async def handle_profile_upload(ctx: Context, sender: str, msg: ProfileUpload):
+    received = []
+    for entry in msg.profiles:
+        if profile_version(entry.profile) != entry.version:
+            ctx.logger.warning(f"Ignoring profile {entry.profile_id} from {sender}: version hash does not match")
+            continue
+        profile_cache.put(entry.profile_id, entry.version, entry.profile)
+        received.append((entry.profile_id, entry.version))
+    hot_log.info(ctx.logger, CATEGORY_MATCH, "Cached %s profiles from %s (%s cached)", len(received), sender, len(profile_cache))
+    for request in pending_refs.take(sender, received):
+        await score_or_fetch_refs(ctx, sender, request)
+
 # Include protocols in the agent
 agent.include(chat_proto)
 agent.include(struct_output_client_proto)
 
+@agent.on_interval(period=DEFAULT_FLUSH_SECONDS)
+async def flush_agent_store(ctx: Context):
+    await agent_store.flush_async()
+
+@agent.on_interval(period=DEFAULT_SWEEP_SECONDS)
+async def sweep_chat_sessions(ctx: Context):
+    expired = chat_sessions.sweep()
+    tracer.sweep()
+    ctx.logger.info(f"Chat sessions: {chat_sessions.stats()}, {expired} expired since last sweep")
+
+@agent.on_interval(period=60.0)
+async def log_admission_stats(ctx: Context):
+    ctx.logger.info(f"Admission: {interactive_admission.stats()}, {batch_admission.stats()}")
+    ctx.logger.info(f"Load: {load_controller.stats()}")
+    ctx.logger.info(f"Event loop lag: {loop_monitor.stats()}")
+    ctx.logger.info(f"Log sampling: {hot_log.stats()}")
+    ctx.logger.info(f"Tracing: {tracer.stats()}")
+    ctx.logger.info(f"Location tiers used: {dict(get_coordinates.tiers)}")
+
+@agent.on_event("shutdown")
+async def shutdown(ctx: Context):
+    await agent_store.flush_async()
+    loop_monitor.stop()
+    tracer.flush()
+
 @agent.on_event("startup")
 async def startup(ctx: Context):
+    # Records are formatted and written by a listener thread, off the event loop
+    install_queue_logging(ctx.logger)
     ctx.logger.info(f"DatingMatchAgent started. Address: {ctx.agent.address}")
     ctx.logger.info("Agent accepts MatchRequest messages via protocol communication")
+    load_controller.start(lambda mode: ctx.logger.warning(f"Scoring switched to {mode} mode: {load_controller.stats()}"))
+    loop_monitor.start(lambda stall: ctx.logger.warning(
+        f"Event loop blocked {stall['blocked_ms']:.0f} ms in {stall['handler']} at {stall['stack'][-1]}"
+    ))
 
 if __name__ == "__main__":
     print(f"DatingMatchAgent address: {agent.address}")
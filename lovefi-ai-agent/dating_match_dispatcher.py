@@ -0,0 +1,220 @@
+"""
+DatingMatchDispatcher: public entry point that spreads MatchRequest and
+MatchBatchRequest traffic over a pool of local scoring worker agents.
+
+Clients talk to the dispatcher exactly as they would to DatingMatchAgent.
+Each request is wrapped in a WorkerJob with a job id, sent to the healthy
+worker with the fewest outstanding jobs, and the worker's WorkerResult is
+unwrapped and sent back to the original sender. Jobs that time out are
+retried once on another worker before the client gets an error response.
+
+A batch can time out after some of its chunks were already forwarded. Only
+the items with no result yet are retried (and, on the final failure, get
+error results), so a client never sees a correlation_id twice. The retry
+answers with its own chunk sequence (chunk 0 of N again, same batch_id),
+so clients should collect results by correlation_id until every item of
+the batch is answered rather than by chunk index.
+
+    python dating_match_dispatcher.py --workers 4             # one process per worker
+    python dating_match_dispatcher.py --workers 4 --bureau    # all agents in one Bureau
+"""
+
+import argparse
+import subprocess
+import sys
+from typing import Optional, Sequence
+from uuid import uuid4
+
+from uagents import Agent, Bureau, Context, Model
+from uagents_core.identity import Identity
+
+from dating_match_agent import (
+    MatchBatchRequest,
+    MatchBatchResponse,
+    MatchBatchResult,
+    MatchRequest,
+    MatchResponse,
+    get_coordinates,
+    score_match_request,
+)
+from match_batch import chunk_by_size, score_batch, score_batch_items
+from match_score import batch_details
+from worker_pool import PendingJob, WorkerPool
+
+DISPATCHER_PORT = 8004
+WORKER_BASE_PORT = 8100
+DEFAULT_WORKERS = 4
+MAX_ATTEMPTS = 2
+
+class WorkerJob(Model):
+    job_id: str
+    match: Optional[MatchRequest] = None
+    batch: Optional[MatchBatchRequest] = None
+
+class WorkerResult(Model):
+    job_id: str
+    match: Optional[MatchResponse] = None
+    batch: Optional[MatchBatchResponse] = None
+    done: bool = True
+
+def worker_seed(index: int) -> str:
+    return f"dating_match_worker_seed_{index}"
+
+def worker_address(index: int) -> str:
+    return Identity.from_seed(worker_seed(index), 0).address
+
+# Worker agents
+async def handle_worker_job(ctx: Context, sender: str, job: WorkerJob):
+    if job.match is not None:
+        [result] = await score_batch([job.match], score_match_request, get_coordinates)
+        await ctx.send(sender, WorkerResult(job_id=job.job_id, match=MatchResponse(score=result.score, details=result.details())))
+        return
+
+    batch = job.batch
+    scores = await score_batch_items(batch.items, score_match_request, get_coordinates)
+    results = [
+        MatchBatchResult(correlation_id=item.correlation_id, score=result.score, details=batch_details(result, batch.with_details))
+        for item, result in zip(batch.items, scores)
+    ]
+    chunks = chunk_by_size(results)
+    for index, chunk in enumerate(chunks):
+        response = MatchBatchResponse(batch_id=batch.batch_id, chunk=index, chunks=len(chunks), results=chunk)
+        await ctx.send(sender, WorkerResult(job_id=job.job_id, batch=response, done=index == len(chunks) - 1))
+
+def make_worker(index: int, standalone: bool = True) -> Agent:
+    port = WORKER_BASE_PORT + index
+    worker = Agent(
+        name=f"DatingMatchWorker{index}",
+        seed=worker_seed(index),
+        metadata={"type": "dating_match_worker"},
+        **({"port": port, "endpoint": [f"http://localhost:{port}/submit"]} if standalone else {}),
+    )
+    worker.on_message(WorkerJob, replies=WorkerResult)(handle_worker_job)
+    return worker
+
+# Dispatcher agent
+dispatcher = Agent(
+    name="DatingMatchDispatcher",
+    seed="dating_match_dispatcher_seed",
+    metadata={"type": "dating_match"},
+    port=DISPATCHER_PORT,
+    endpoint=[f"http://localhost:{DISPATCHER_PORT}/submit"]
+)
+
+pool = WorkerPool([worker_address(index) for index in range(DEFAULT_WORKERS)])
+
+def configure_pool(workers: int):
+    global pool
+    pool = WorkerPool([worker_address(index) for index in range(workers)])
+
+def error_reply(job: WorkerJob, reason: str) -> Model:
+    details = f"Error processing match request: {reason}"
+    if job.match is not None:
+        return MatchResponse(score=0.0, details=details)
+    return MatchBatchResponse(
+        batch_id=job.batch.batch_id,
+        chunk=0,
+        chunks=1,
+        results=[
+            MatchBatchResult(correlation_id=item.correlation_id, score=0.0, details=details)
+            for item in job.batch.items
+        ],
+    )
+
+def unanswered(job: PendingJob) -> Optional[WorkerJob]:
+    """The job without batch items whose results were already forwarded; None if nothing is left"""
+    message = job.message
+    if message.batch is None or not job.answered:
+        return message
+    items = [item for item in message.batch.items if item.correlation_id not in job.answered]
+    if not items:
+        return None
+    return WorkerJob(job_id=message.job_id, batch=message.batch.copy(update={"items": items}))
+
+async def submit(ctx: Context, client: str, job: WorkerJob, attempts: int = 1, exclude: Sequence[str] = ()):
+    worker = pool.pick(exclude)
+    if worker is None:
+        ctx.logger.error(f"No healthy scoring worker for job {job.job_id} from {client}")
+        await ctx.send(client, error_reply(job, "no scoring workers available"))
+        return
+    pool.start(job.job_id, worker, client, job, attempts)
+    await ctx.send(worker, job)
+
+# No replies= on the client-facing handlers: the reply comes later, from handle_worker_result
+@dispatcher.on_message(MatchRequest)
+async def dispatch_match_request(ctx: Context, sender: str, msg: MatchRequest):
+    await submit(ctx, sender, WorkerJob(job_id=str(uuid4()), match=msg))
+
+@dispatcher.on_message(MatchBatchRequest)
+async def dispatch_match_batch(ctx: Context, sender: str, msg: MatchBatchRequest):
+    ctx.logger.info(f"Dispatching match batch {msg.batch_id} with {len(msg.items)} pairs from {sender}")
+    await submit(ctx, sender, WorkerJob(job_id=str(uuid4()), batch=msg))
+
+@dispatcher.on_message(WorkerResult)
+async def handle_worker_result(ctx: Context, sender: str, msg: WorkerResult):
+    parts = [result.correlation_id for result in msg.batch.results] if msg.batch is not None else ()
+    job = pool.reply(msg.job_id, sender, msg.done, parts=parts)
+    if job is None:
+        ctx.logger.info(f"Ignoring late or unknown result for job {msg.job_id} from {sender}")
+        return
+    await ctx.send(job.client, msg.match if msg.match is not None else msg.batch)
+
+@dispatcher.on_interval(period=5.0)
+async def check_workers(ctx: Context):
+    for job in pool.expire():
+        ctx.logger.warning(f"Job {job.job_id} timed out on worker {job.worker}")
+        remaining = unanswered(job)
+        if remaining is None:
+            # Every item was forwarded; only the final chunk flag was lost
+            continue
+        if job.attempts < MAX_ATTEMPTS:
+            await submit(ctx, job.client, remaining, job.attempts + 1, exclude=[job.worker])
+        else:
+            await ctx.send(job.client, error_reply(remaining, "scoring workers did not respond"))
+
+@dispatcher.on_interval(period=60.0)
+async def log_worker_health(ctx: Context):
+    for worker in pool.stats():
+        ctx.logger.info(f"Worker {worker}")
+
+@dispatcher.on_event("startup")
+async def startup(ctx: Context):
+    ctx.logger.info(f"DatingMatchDispatcher started. Address: {ctx.agent.address}")
+    ctx.logger.info(f"Routing MatchRequest and MatchBatchRequest to {len(pool.workers)} workers")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--bureau", action="store_true", help="run the dispatcher and workers in one Bureau")
+    parser.add_argument("--run-worker", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_worker is not None:
+        make_worker(args.run_worker).run()
+        return
+
+    configure_pool(args.workers)
+    print(f"DatingMatchDispatcher address: {dispatcher.address}")
+    print(f"Starting dispatcher on http://localhost:{DISPATCHER_PORT} with {args.workers} workers...")
+    if args.bureau:
+        bureau = Bureau(port=DISPATCHER_PORT, endpoint=[f"http://localhost:{DISPATCHER_PORT}/submit"])
+        bureau.add(dispatcher)
+        for index in range(args.workers):
+            bureau.add(make_worker(index, standalone=False))
+        bureau.run()
+        return
+
+    workers = [
+        subprocess.Popen([sys.executable, __file__, "--run-worker", str(index)])
+        for index in range(args.workers)
+    ]
+    try:
+        dispatcher.run()
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.wait()
+
+if __name__ == "__main__":
+    main()
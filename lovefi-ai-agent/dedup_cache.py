@@ -0,0 +1,75 @@
+"""
+Bounded TTL cache used to make message handling idempotent.
+
+Retried ChatMessage deliveries (same msg_id) and duplicated MatchRequest
+envelopes (same payload) hit the cache and get the cached reply replayed
+instead of another LLM round-trip and score.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+from uagents import Model
+
+from memory_stats import mapping_footprint
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL_SECONDS = 600.0
+
+# Returned by TTLCache.get for keys that were never stored (None is a valid value)
+MISSING = object()
+
+
+class TTLCache:
+    """Size-bounded mapping (oldest entries dropped first) whose entries expire ttl seconds after being stored"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def footprint(self) -> Dict[str, Any]:
+        return mapping_footprint(self._entries)
+
+    def _evict_expired(self, now: float):
+        # Entries are kept in store order and share one TTL, so expired ones are at the front
+        entries = self._entries
+        while entries:
+            key, (expires, _) = next(iter(entries.items()))
+            if expires > now:
+                break
+            del entries[key]
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        now = time.monotonic()
+        self._evict_expired(now)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any = None):
+        now = time.monotonic()
+        self._evict_expired(now)
+        entries = self._entries
+        entries.pop(key, None)
+        entries[key] = (now + self.ttl, value)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        self._entries.pop(key, None)
+
+
+def payload_hash(message: Model) -> str:
+    return hashlib.sha256(message.model_dump_json().encode("utf-8")).hexdigest()
+
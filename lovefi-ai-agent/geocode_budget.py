@@ -0,0 +1,248 @@
+"""
+Latency budget for the location part of match scoring.
+
+Geocoding goes to Nominatim, which can take seconds, so it set the tail
+latency of every match handler. Each scoring call now gets a Deadline
+(DEFAULT_BUDGET_MS unless the client supplies one) and locates both
+addresses with the cheapest source that can answer in time:
+
+    cache       coordinates already in the geocode cache
+    geocoder    a live lookup that finished before the deadline
+    gazetteer   the built-in table of major cities below
+    similarity  no coordinates; compare the address strings
+    neutral     an address is missing; half marks for location
+
+A lookup that misses the deadline keeps running in the background and
+stores its result in the cache, so the next request for that address is
+answered from the cache. The tier used is reported with the score.
+
+A Deadline created with reduced=True (see load_control.py) skips the live
+lookup and the similarity tier: only cached and gazetteer coordinates are
+used, and anything else scores neutral.
+
+If the Deadline carries a RequestTimings (stage_metrics.py), locate()
+records how long each address took to resolve and whether it was cached.
+"""
+
+import re
+import threading
+import time
+from time import perf_counter_ns
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Optional, Tuple
+
+from dedup_cache import MISSING
+from stage_metrics import RequestTimings, observe
+
+DEFAULT_BUDGET_MS = 800
+MAX_BUDGET_MS = 10000
+# HTTP timeout for the lookups themselves, which may outlive the request
+LOOKUP_TIMEOUT_SECONDS = 10.0
+LOOKUP_WORKERS = 8
+
+TIER_CACHE = "cache"
+TIER_GEOCODER = "geocoder"
+TIER_GAZETTEER = "gazetteer"
+TIER_SIMILARITY = "similarity"
+TIER_NEUTRAL = "neutral"
+# Best to worst; a pair is reported at the worse tier of its two addresses
+TIERS = (TIER_CACHE, TIER_GEOCODER, TIER_GAZETTEER, TIER_SIMILARITY, TIER_NEUTRAL)
+
+Coordinates = Tuple[Optional[float], Optional[float]]
+UNKNOWN: Coordinates = (None, None)
+
+# Approximate city-centre coordinates, keyed by lowercase name
+GAZETTEER: Dict[str, Coordinates] = {
+    "new york": (40.7128, -74.0060), "new york city": (40.7128, -74.0060), "nyc": (40.7128, -74.0060),
+    "brooklyn": (40.6782, -73.9442), "los angeles": (34.0522, -118.2437), "la": (34.0522, -118.2437),
+    "chicago": (41.8781, -87.6298), "houston": (29.7604, -95.3698), "phoenix": (33.4484, -112.0740),
+    "philadelphia": (39.9526, -75.1652), "san antonio": (29.4241, -98.4936), "san diego": (32.7157, -117.1611),
+    "dallas": (32.7767, -96.7970), "austin": (30.2672, -97.7431), "san jose": (37.3382, -121.8863),
+    "san francisco": (37.7749, -122.4194), "sf": (37.7749, -122.4194), "oakland": (37.8044, -122.2712),
+    "seattle": (47.6062, -122.3321), "portland": (45.5152, -122.6784), "denver": (39.7392, -104.9903),
+    "las vegas": (36.1699, -115.1398), "boston": (42.3601, -71.0589), "cambridge": (42.3736, -71.1097),
+    "washington": (38.9072, -77.0369), "washington dc": (38.9072, -77.0369), "miami": (25.7617, -80.1918),
+    "atlanta": (33.7490, -84.3880), "orlando": (28.5384, -81.3789), "nashville": (36.1627, -86.7816),
+    "detroit": (42.3314, -83.0458), "minneapolis": (44.9778, -93.2650), "new orleans": (29.9511, -90.0715),
+    "salt lake city": (40.7608, -111.8910), "pittsburgh": (40.4406, -79.9959), "baltimore": (39.2904, -76.6122),
+    "toronto": (43.6532, -79.3832), "vancouver": (49.2827, -123.1207), "montreal": (45.5017, -73.5673),
+    "mexico city": (19.4326, -99.1332), "sao paulo": (-23.5505, -46.6333), "buenos aires": (-34.6037, -58.3816),
+    "london": (51.5074, -0.1278), "paris": (48.8566, 2.3522), "berlin": (52.5200, 13.4050),
+    "madrid": (40.4168, -3.7038), "barcelona": (41.3874, 2.1686), "rome": (41.9028, 12.4964),
+    "amsterdam": (52.3676, 4.9041), "dublin": (53.3498, -6.2603), "zurich": (47.3769, 8.5417),
+    "stockholm": (59.3293, 18.0686), "lisbon": (38.7223, -9.1393), "dubai": (25.2048, 55.2708),
+    "mumbai": (19.0760, 72.8777), "delhi": (28.7041, 77.1025), "new delhi": (28.6139, 77.2090),
+    "bangalore": (12.9716, 77.5946), "bengaluru": (12.9716, 77.5946), "singapore": (1.3521, 103.8198),
+    "hong kong": (22.3193, 114.1694), "tokyo": (35.6762, 139.6503), "seoul": (37.5665, 126.9780),
+    "beijing": (39.9042, 116.4074), "shanghai": (31.2304, 121.4737), "sydney": (-33.8688, 151.2093),
+    "melbourne": (-37.8136, 144.9631), "cape town": (-33.9249, 18.4241), "lagos": (6.5244, 3.3792),
+}
+
+
+def gazetteer_coordinates(address: str) -> Optional[Coordinates]:
+    """Coordinates of the first known city among the comma-separated parts of address"""
+    for part in [address, *address.split(",")]:
+        key = re.sub(r"[^a-z ]", "", part.lower()).strip()
+        key = re.sub(r"\s+", " ", key)
+        if key in GAZETTEER:
+            return GAZETTEER[key]
+    return None
+
+
+class Deadline:
+    def __init__(self, budget_ms: Optional[int] = None, reduced: bool = False):
+        budget_ms = DEFAULT_BUDGET_MS if budget_ms is None else min(max(budget_ms, 0), MAX_BUDGET_MS)
+        self.budget_ms = budget_ms
+        self.reduced = reduced
+        # Set by locate_pair to the tier the location score came from
+        self.tier: Optional[str] = None
+        # Set by handlers whose client asked for a per-request breakdown
+        self.timings: Optional[RequestTimings] = None
+        self.expires = time.monotonic() + budget_ms / 1000
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+
+def worst_tier(*tiers: str) -> str:
+    return max(tiers, key=TIERS.index)
+
+
+class BudgetedGeocoder:
+    """
+    Callable like a plain geocode function (blocking, no budget) for batch
+    scoring; locate() answers a pair of addresses within a Deadline.
+    """
+
+    def __init__(self, lookup: Callable[[str], Coordinates], cache=None, workers: int = LOOKUP_WORKERS):
+        self.lookup = lookup
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="geocode")
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.tiers: Counter = Counter()
+
+    def _cached(self, address: str):
+        return MISSING if self.cache is None else self.cache.get(address)
+
+    def _resolve(self, address: str) -> Coordinates:
+        started = perf_counter_ns()
+        try:
+            coordinates = self.lookup(address)
+            observe("geocode_lookup", perf_counter_ns() - started)
+            if self.cache is not None:
+                self.cache.put(address, coordinates)
+            return coordinates
+        finally:
+            with self._lock:
+                self._inflight.pop(address, None)
+
+    def _start(self, address: str) -> Future:
+        # One lookup per address however many requests are waiting on it
+        with self._lock:
+            future = self._inflight.get(address)
+            if future is None:
+                future = self._executor.submit(self._resolve, address)
+                self._inflight[address] = future
+            return future
+
+    def __call__(self, address: str) -> Coordinates:
+        cached = self._cached(address)
+        if cached is not MISSING:
+            return cached
+        return self._start(address).result()
+
+    def cached(self, address: str) -> Coordinates:
+        """Cached coordinates only, never a live lookup; UNKNOWN if not cached"""
+        cached = self._cached(address)
+        return UNKNOWN if cached is MISSING else cached
+
+    def locate(self, address1: str, address2: str, deadline: Deadline) -> Tuple[Coordinates, Coordinates, str]:
+        """Coordinates for both addresses (UNKNOWN if unresolved) and the tier they came from"""
+        started = perf_counter_ns()
+        if not address1.strip() or not address2.strip():
+            observe("geocode_miss", perf_counter_ns() - started)
+            return self._count(UNKNOWN, UNKNOWN, TIER_NEUTRAL)
+
+        found: Dict[str, Tuple[Coordinates, str]] = {}
+        lookups: Dict[Future, str] = {}
+        # When each address was answered, for RequestTimings
+        answered: Dict[str, int] = {}
+        for address in dict.fromkeys((address1, address2)):
+            cached = self._cached(address)
+            answered[address] = perf_counter_ns()
+            if cached is MISSING:
+                if not deadline.reduced:
+                    lookups[self._start(address)] = address
+            elif cached[0] is not None:
+                found[address] = (cached, TIER_CACHE)
+        if lookups:
+            completed = set()
+            try:
+                for future in as_completed(lookups, timeout=deadline.remaining()):
+                    completed.add(future)
+                    answered[lookups[future]] = perf_counter_ns()
+            except TimeoutError:
+                # Lookups still running took the whole wait
+                waited = perf_counter_ns()
+                for future, address in lookups.items():
+                    if future not in completed:
+                        answered[address] = waited
+        for future, address in lookups.items():
+            if future.done() and future.exception() is None and future.result()[0] is not None:
+                found[address] = (future.result(), TIER_GEOCODER)
+        located = resolve_pair(address1, address2, found, deadline.reduced)
+        finished = perf_counter_ns()
+        if lookups:
+            observe("geocode_remote", finished - started)
+        else:
+            observe("geocode_hit" if located[2] == TIER_CACHE else "geocode_miss", finished - started)
+        if deadline.timings is not None:
+            for address, at in answered.items():
+                source = found[address][1] if address in found else located[2]
+                deadline.timings.address(address, source == TIER_CACHE, source, at - started)
+        return self._count(*located)
+
+    def _count(self, coordinates1: Coordinates, coordinates2: Coordinates, tier: str):
+        self.tiers[tier] += 1
+        return coordinates1, coordinates2, tier
+
+
+def resolve_pair(address1: str, address2: str, found: Dict[str, Tuple[Coordinates, str]],
+                 reduced: bool = False) -> Tuple[Coordinates, Coordinates, str]:
+    """
+    Fill unresolved addresses from the gazetteer; similarity tier (neutral
+    when reduced) if either is still unknown
+    """
+    for address in (address1, address2):
+        if address not in found:
+            coordinates = gazetteer_coordinates(address)
+            if coordinates is not None:
+                found[address] = (coordinates, TIER_GAZETTEER)
+    if address1 in found and address2 in found:
+        return found[address1][0], found[address2][0], worst_tier(found[address1][1], found[address2][1])
+    return UNKNOWN, UNKNOWN, TIER_NEUTRAL if reduced else TIER_SIMILARITY
+
+
+def locate_pair(address1: str, address2: str, geocode: Callable[[str], Coordinates],
+                deadline: Optional[Deadline] = None) -> Tuple[Coordinates, Coordinates, str]:
+    """
+    Locate both addresses within deadline (default budget if None). Plain
+    geocode functions, such as a batch's pre-resolved lookup table, are
+    called directly and count as the geocoder tier.
+    """
+    if isinstance(geocode, BudgetedGeocoder):
+        located = geocode.locate(address1, address2, deadline or Deadline())
+    elif not address1.strip() or not address2.strip():
+        located = UNKNOWN, UNKNOWN, TIER_NEUTRAL
+    else:
+        found = {}
+        for address in (address1, address2):
+            coordinates = geocode(address)
+            if coordinates[0] is not None:
+                found[address] = (coordinates, TIER_GEOCODER)
+        located = resolve_pair(address1, address2, found, deadline is not None and deadline.reduced)
+    if deadline is not None:
+        deadline.tier = located[2]
+    return located
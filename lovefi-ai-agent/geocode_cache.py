@@ -0,0 +1,97 @@
+"""
+On-disk geocode cache shared by every process serving the agents.
+
+Nominatim lookups cost a network round trip and are rate limited, and the
+same handful of cities come up over and over. Results are kept in a small
+SQLite database (WAL mode, so worker processes read concurrently while one
+writes) with an in-process dict in front of it. Failed lookups are cached
+for a shorter time so an unknown address does not go to the network on
+every request.
+
+The database lives next to this module unless LOVEFI_GEOCODE_CACHE names
+another file, so it does not depend on the directory an agent is started
+from.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from dedup_cache import MISSING
+from memory_stats import mapping_footprint
+
+DEFAULT_GEOCODE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocode_cache.sqlite3")
+NEGATIVE_TTL_SECONDS = 600.0
+MAX_MEMORY_ENTRIES = 100000
+
+Coordinates = Tuple[Optional[float], Optional[float]]
+
+
+class GeocodeCache:
+    def __init__(self, path: Optional[str] = None, negative_ttl: float = NEGATIVE_TTL_SECONDS):
+        # Read when the cache is created, so tests can point it at a temporary file
+        self.path = path or os.environ.get("LOVEFI_GEOCODE_CACHE", DEFAULT_GEOCODE_CACHE_PATH)
+        self.negative_ttl = negative_ttl
+        self._memory: Dict[str, Tuple[Optional[float], Optional[float], float]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork; each worker process opens its own
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode (address TEXT PRIMARY KEY, lat REAL, lon REAL, updated REAL)"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _fresh(self, lat: Optional[float], updated: float, now: float) -> bool:
+        return lat is not None or now - updated < self.negative_ttl
+
+    def get(self, address: str, default: Any = MISSING) -> Any:
+        """Cached (lat, lon), (None, None) for a recent failed lookup, or default"""
+        now = time.time()
+        entry = self._memory.get(address)
+        if entry is None:
+            with self._lock:
+                entry = self._connection().execute(
+                    "SELECT lat, lon, updated FROM geocode WHERE address = ?", (address,)
+                ).fetchone()
+            if entry is not None:
+                self._remember(address, entry)
+        if entry is None or not self._fresh(entry[0], entry[2], now):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(self, address: str, coordinates: Coordinates):
+        lat, lon = coordinates
+        entry = (lat, lon, time.time())
+        self._remember(address, entry)
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO geocode (address, lat, lon, updated) VALUES (?, ?, ?, ?)",
+                (address, *entry),
+            )
+
+    def _remember(self, address: str, entry: Tuple[Optional[float], Optional[float], float]):
+        if len(self._memory) >= MAX_MEMORY_ENTRIES:
+            self._memory.clear()
+        self._memory[address] = entry
+
+    def footprint(self) -> Dict[str, Any]:
+        """Size of the in-process layer; the SQLite file is not counted"""
+        return mapping_footprint(self._memory)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
@@ -0,0 +1,152 @@
+"""
+Sampled cProfile hook for the agent handlers.
+
+A fraction of requests (LOVEFI_PROFILE_RATE, 0 to 1, off by default) is
+run under cProfile and each profile is written to its own .prof file in
+LOVEFI_PROFILE_DIR, by default a profiles/ directory next to this module
+(not the directory an agent is started from). Only the newest LOVEFI_PROFILE_KEEP files are kept, so
+profiling can stay on under real traffic. report() aggregates the recent
+files into a top-functions table; the REST agent serves it at
+GET /api/profile and changes the rate with POST /api/profile.
+
+cProfile only sees the thread that enabled it. Scoring runs in worker
+threads (asyncio.to_thread), so call() profiles the scoring function inside
+its thread. section() profiles a stretch of a coroutine on the event loop,
+such as the uagents send path; other coroutines that run while it awaits
+are included, and at most one section per thread is profiled at a time.
+Writing the profile and rotating old files happen in a worker thread so
+that sampled sections do not block the event loop.
+"""
+
+import asyncio
+import cProfile
+import glob
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+DEFAULT_KEEP = 200
+REPORT_PROFILES = 50
+REPORT_FUNCTIONS = 25
+
+
+class HandlerProfiler:
+    def __init__(self, rate: float = 0.0, directory: str = DEFAULT_PROFILE_DIR, keep: int = DEFAULT_KEEP):
+        self.rate = rate
+        self.directory = directory
+        self.keep = keep
+        self.sampled = 0
+        self.written = 0
+        self._active = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "HandlerProfiler":
+        return cls(
+            rate=float(os.environ.get("LOVEFI_PROFILE_RATE", "0")),
+            directory=os.environ.get("LOVEFI_PROFILE_DIR", DEFAULT_PROFILE_DIR),
+            keep=int(os.environ.get("LOVEFI_PROFILE_KEEP", DEFAULT_KEEP)),
+        )
+
+    def _start(self) -> Optional[cProfile.Profile]:
+        if self.rate <= 0 or getattr(self._active, "profile", None) is not None or random.random() >= self.rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile at a time; skip this sample
+            return None
+        self._active.profile = profile
+        self.sampled += 1
+        return profile
+
+    def _stop(self, profile: cProfile.Profile):
+        profile.disable()
+        self._active.profile = None
+
+    def _write(self, profile: cProfile.Profile, name: str):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{time.time_ns()}-{os.getpid()}-{name}.prof")
+        # Written under a temporary name so report() never reads a partial file
+        profile.dump_stats(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self.written += 1
+            self._rotate()
+
+    def _rotate(self):
+        paths = self.files()
+        # Worker processes share the directory, so another may delete first
+        for path in paths[:max(0, len(paths) - self.keep)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def files(self) -> List[str]:
+        """Profile files, oldest first"""
+        return sorted(glob.glob(os.path.join(self.directory, "*.prof")), key=os.path.basename)
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """fn(*args, **kwargs), profiled if this call is sampled"""
+        profile = self._start()
+        if profile is None:
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            # Already off the event loop (asyncio.to_thread), so write here
+            self._stop(profile)
+            self._write(profile, fn.__name__)
+
+    @asynccontextmanager
+    async def section(self, name: str):
+        """Profile the body of an async with block on the event loop, if sampled"""
+        profile = self._start()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                self._stop(profile)
+                await asyncio.to_thread(self._write, profile, name)
+
+    def report(self, profiles: int = REPORT_PROFILES, functions: int = REPORT_FUNCTIONS) -> Dict[str, Any]:
+        """Top functions by own time over the newest profiles files"""
+        stats: Optional[pstats.Stats] = None
+        loaded = 0
+        for path in self.files()[-profiles:]:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(path)
+                else:
+                    stats.add(path)
+                loaded += 1
+            except (OSError, EOFError, ValueError):
+                # Rotated away by another worker
+                continue
+        top: List[Dict[str, Any]] = []
+        if stats is not None:
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:functions]
+            for (filename, line, function), (_, calls, own, cumulative, _) in rows:
+                top.append({
+                    "function": f"{os.path.basename(filename)}:{line}({function})",
+                    "calls": calls,
+                    "own_ms": round(own * 1000, 3),
+                    "cumulative_ms": round(cumulative * 1000, 3),
+                })
+        return {"profiles": loaded, "functions": top}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "directory": self.directory,
+            "keep": self.keep,
+            "sampled": self.sampled,
+            "written": self.written,
+        }
@@ -0,0 +1,118 @@
+"""
+Load-adaptive quality mode for match scoring.
+
+At peak load a slightly coarser score is better than a timeout. A
+LoadController samples event-loop lag and the depth of the admission
+queues. When either crosses its enter threshold the scorer switches to
+reduced mode: no live geocoding, no address-similarity fallback and no
+details string. It switches back to full mode only after both have stayed
+under the lower exit thresholds for calm_samples samples in a row, so the
+mode does not flap around a single threshold.
+
+Handlers build their Deadline with controller.deadline(), which carries
+the current mode. Mode changes are counted in stats().
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from geocode_budget import Deadline
+
+SAMPLE_SECONDS = 0.5
+ENTER_LAG_SECONDS = 0.25
+EXIT_LAG_SECONDS = 0.05
+ENTER_QUEUE_DEPTH = 16
+EXIT_QUEUE_DEPTH = 2
+# About five seconds of calm before going back to full mode
+CALM_SAMPLES = 10
+
+MODE_FULL = "full"
+MODE_REDUCED = "reduced"
+
+
+class LoadController:
+    def __init__(self, lanes: Iterable[Any], enter_lag: float = ENTER_LAG_SECONDS, exit_lag: float = EXIT_LAG_SECONDS,
+                 enter_queue: int = ENTER_QUEUE_DEPTH, exit_queue: int = EXIT_QUEUE_DEPTH,
+                 calm_samples: int = CALM_SAMPLES):
+        self.lanes = list(lanes)
+        self.enter_lag = enter_lag
+        self.exit_lag = exit_lag
+        self.enter_queue = enter_queue
+        self.exit_queue = exit_queue
+        self.calm_samples = calm_samples
+        self.reduced = False
+        self.lag = 0.0
+        self.entered_reduced = 0
+        self.exited_reduced = 0
+        self._calm = 0
+        self._reduced_seconds = 0.0
+        self._since = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def mode(self) -> str:
+        return MODE_REDUCED if self.reduced else MODE_FULL
+
+    def queue_depth(self) -> int:
+        return sum(lane.queued for lane in self.lanes)
+
+    def observe(self, lag: float, now: Optional[float] = None) -> Optional[str]:
+        """Record one lag sample; returns the new mode if it changed"""
+        now = time.monotonic() if now is None else now
+        self.lag = lag
+        depth = self.queue_depth()
+        if not self.reduced:
+            if lag >= self.enter_lag or depth >= self.enter_queue:
+                self._switch(True, now)
+                return MODE_REDUCED
+            return None
+        if lag <= self.exit_lag and depth <= self.exit_queue:
+            self._calm += 1
+        else:
+            self._calm = 0
+        if self._calm >= self.calm_samples:
+            self._switch(False, now)
+            return MODE_FULL
+        return None
+
+    def _switch(self, reduced: bool, now: float):
+        if reduced:
+            self.entered_reduced += 1
+        else:
+            self.exited_reduced += 1
+            self._reduced_seconds += now - self._since
+        self.reduced = reduced
+        self._since = now
+        self._calm = 0
+
+    def deadline(self, budget_ms: Optional[int] = None) -> Deadline:
+        return Deadline(budget_ms, reduced=self.reduced)
+
+    async def monitor(self, on_change: Optional[Callable[[str], None]] = None, interval: float = SAMPLE_SECONDS):
+        """Sample event-loop lag every interval seconds until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            mode = self.observe(max(0.0, loop.time() - start - interval))
+            if mode is not None and on_change is not None:
+                on_change(mode)
+
+    def start(self, on_change: Optional[Callable[[str], None]] = None) -> asyncio.Task:
+        """Run monitor() in the background; the controller keeps the task referenced"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.monitor(on_change))
+        return self._task
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.monotonic() if now is None else now
+        reduced_seconds = self._reduced_seconds + (now - self._since if self.reduced else 0.0)
+        return {
+            "mode": self.mode,
+            "loop_lag_ms": round(self.lag * 1000, 1),
+            "queue_depth": self.queue_depth(),
+            "entered_reduced": self.entered_reduced,
+            "exited_reduced": self.exited_reduced,
+            "reduced_seconds": round(reduced_seconds, 1),
+        }
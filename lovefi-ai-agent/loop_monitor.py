@@ -0,0 +1,151 @@
+"""
+Event-loop lag monitor that catches blocking calls in async handlers.
+
+A heartbeat coroutine wakes every interval and records how late it woke,
+which gives the lag percentiles. A watchdog thread checks the heartbeat as
+well. If the loop falls more than threshold seconds behind, the loop thread
+is stuck in something that does not yield, such as a requests.get in a
+handler or CPU-heavy scoring not moved to a thread. The watchdog then grabs
+the loop thread's stack with sys._current_frames() while it is still
+blocked. It records the handler that was running, which is the outermost
+coroutine defined in this directory, and the innermost frames. The lag
+that stall caused is filled in once the heartbeat runs again.
+
+load_control.py samples lag more coarsely to pick the scoring mode; this
+monitor is for finding which code is responsible.
+"""
+
+import asyncio
+import inspect
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+INTERVAL_SECONDS = 0.05
+STALL_THRESHOLD_SECONDS = 0.1
+# About a minute of samples at the default interval
+LAG_SAMPLES = 1200
+MAX_STALLS = 50
+STACK_DEPTH = 15
+
+AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def describe_stack(frame) -> Dict[str, Any]:
+    """Handler (outermost coroutine from AGENT_DIR) and innermost frames of a thread's stack"""
+    handler = None
+    outer = frame
+    while outer is not None:
+        code = outer.f_code
+        if code.co_flags & inspect.CO_COROUTINE and os.path.abspath(code.co_filename).startswith(AGENT_DIR):
+            handler = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        outer = outer.f_back
+    stack = [
+        f"{os.path.basename(entry.filename)}:{entry.lineno} in {entry.name}"
+        for entry in traceback.extract_stack(frame)[-STACK_DEPTH:]
+    ]
+    return {"handler": handler or "unknown", "stack": stack}
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = INTERVAL_SECONDS, threshold: float = STALL_THRESHOLD_SECONDS,
+                 samples: int = LAG_SAMPLES, max_stalls: int = MAX_STALLS):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: Deque[float] = deque(maxlen=samples)
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=max_stalls)
+        self.stall_count = 0
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        # The stall being reported until the heartbeat runs again
+        self._stalled: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._watchdog_stop = threading.Event()
+
+    async def heartbeat(self):
+        self._loop_thread = threading.get_ident()
+        try:
+            while True:
+                start = time.monotonic()
+                self._beat = start
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lag = max(0.0, now - start - self.interval)
+                self.lags.append(lag)
+                self._beat = now
+                stalled = self._stalled
+                if stalled is not None:
+                    stalled["lag_ms"] = round(lag * 1000, 1)
+                    self._stalled = None
+        finally:
+            # Stopped with its loop: nothing left to watch
+            self._loop_thread = None
+            self._stop_watchdog()
+
+    def check(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """From the watchdog thread: capture the loop's stack once per stall"""
+        now = time.monotonic() if now is None else now
+        behind = now - self._beat - self.interval
+        if self._loop_thread is None or self._stalled is not None or behind < self.threshold:
+            return None
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return None
+        stall = {"time": time.time(), "blocked_ms": round(behind * 1000, 1), "lag_ms": None, **describe_stack(frame)}
+        self._stalled = stall
+        self.stalls.append(stall)
+        self.stall_count += 1
+        return stall
+
+    def _watch(self, on_stall: Optional[Callable[[Dict[str, Any]], None]], stop: threading.Event):
+        while not stop.wait(self.interval):
+            stall = self.check()
+            if stall is not None and on_stall is not None:
+                on_stall(stall)
+
+    def _stop_watchdog(self) -> Optional[threading.Thread]:
+        watchdog, self._watchdog = self._watchdog, None
+        self._watchdog_stop.set()
+        return watchdog
+
+    def start(self, on_stall: Optional[Callable[[Dict[str, Any]], None]] = None) -> asyncio.Task:
+        """Run the heartbeat on the current loop and the watchdog in a daemon thread"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.heartbeat())
+        if self._watchdog is None:
+            self._watchdog_stop = threading.Event()
+            self._watchdog = threading.Thread(
+                target=self._watch, args=(on_stall, self._watchdog_stop), name="loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+        return self._task
+
+    def stop(self, timeout: float = 1.0):
+        """Cancel the heartbeat and end the watchdog thread (also done when the heartbeat task ends)"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        watchdog = self._stop_watchdog()
+        if watchdog is not None and watchdog is not threading.current_thread():
+            watchdog.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        lags = sorted(self.lags)
+
+        def percentile(p: float) -> float:
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))] * 1000, 1) if lags else 0.0
+
+        return {
+            "samples": len(lags),
+            "p50_ms": percentile(0.5),
+            "p90_ms": percentile(0.9),
+            "p99_ms": percentile(0.99),
+            "max_ms": percentile(1.0),
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "stalls": self.stall_count,
+        }
@@ -0,0 +1,109 @@
+"""
+Batched MatchRequest scoring for agent-to-agent callers.
+
+One MatchRequest envelope per pair pays signing, serialization, dispatch and
+a reply for every pair. A MatchBatchRequest carries many pairs, each with a
+correlation id. The agent geocodes every distinct address in the batch once,
+with a few lookups in flight at a time, then scores the pairs off the event
+loop. Requests and responses are split into chunks that stay under
+MAX_BATCH_BYTES, so thousands of pairs never produce an oversized envelope.
+Pairs whose gender and sexuality rule each other out are rejected with the
+match_engine bitmasks before any geocoding or scoring.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from uagents import Model
+
+from match_engine import encode_gender, encode_seeking, mutually_compatible
+from match_score import MatchScore
+
+# Serialized size budget per envelope; leaves headroom under mailbox and
+# Agentverse message limits for the envelope itself
+MAX_BATCH_BYTES = 256 * 1024
+BATCH_OVERHEAD_BYTES = 1024
+GEOCODE_CONCURRENCY = 4
+SCORE_WORKERS = 4
+
+Coordinates = Tuple[float | None, float | None]
+
+INCOMPATIBLE_PAIR = "Not a match: gender and sexuality are not mutually compatible"
+
+
+def chunk_by_size(items: Sequence[Model], max_bytes: int = MAX_BATCH_BYTES) -> List[List[Model]]:
+    """Split items into consecutive chunks whose serialized size stays under max_bytes"""
+    budget = max_bytes - BATCH_OVERHEAD_BYTES
+    chunks: List[List[Model]] = []
+    current: List[Model] = []
+    used = 0
+    for item in items:
+        size = len(item.model_dump_json()) + 1
+        if current and used + size > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += size
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+async def geocode_all(addresses: Sequence[str], geocode: Callable[[str], Coordinates],
+                      concurrency: int = GEOCODE_CONCURRENCY) -> Dict[str, Coordinates]:
+    """Look up each distinct address once, at most concurrency lookups at a time"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def lookup(address: str) -> Coordinates:
+        async with semaphore:
+            return await asyncio.to_thread(geocode, address)
+
+    unique = list(dict.fromkeys(addresses))
+    coordinates = await asyncio.gather(*(lookup(address) for address in unique))
+    return dict(zip(unique, coordinates))
+
+
+async def score_batch(requests: Sequence[Any], score: Callable[[Any, Callable[[str], Coordinates]], MatchScore],
+                      geocode: Callable[[str], Coordinates], workers: int = SCORE_WORKERS) -> List[MatchScore]:
+    """
+    Score MatchRequests with shared geocode lookups; returns the MatchScores
+    in request order. A failing pair gets MatchScore.failed with the error
+    message without affecting the rest of the batch.
+    """
+    addresses = [address for request in requests for address in (request.location1.address, request.location2.address)]
+    coordinates = await geocode_all(addresses, geocode)
+
+    def cached_geocode(address: str) -> Coordinates:
+        return coordinates.get(address, (None, None))
+
+    def score_slice(batch: Sequence[Any]) -> List[MatchScore]:
+        results = []
+        for request in batch:
+            try:
+                results.append(score(request, cached_geocode))
+            except Exception as err:
+                results.append(MatchScore.failed(f"Error processing match request: {str(err)}"))
+        return results
+
+    step = max(1, -(-len(requests) // workers))
+    slices = [requests[i:i + step] for i in range(0, len(requests), step)]
+    scored = await asyncio.gather(*(asyncio.to_thread(score_slice, batch) for batch in slices))
+    return [result for batch in scored for result in batch]
+
+
+def compatible_item(item: Any) -> bool:
+    """Gender/seeking bitmask check for a MatchBatchItem; a missing sexuality is open to any gender"""
+    request = item.request
+    return mutually_compatible(
+        encode_gender(request.gender1), encode_seeking(request.gender1, item.sexuality1),
+        encode_gender(request.gender2), encode_seeking(request.gender2, item.sexuality2),
+    )
+
+
+async def score_batch_items(items: Sequence[Any], score: Callable[[Any, Callable[[str], Coordinates]], MatchScore],
+                            geocode: Callable[[str], Coordinates], workers: int = SCORE_WORKERS) -> List[MatchScore]:
+    """score_batch over MatchBatchItems; incompatible pairs get MatchScore.failed and are never geocoded"""
+    compatible = [compatible_item(item) for item in items]
+    requests = [item.request for item, ok in zip(items, compatible) if ok]
+    scored = iter(await score_batch(requests, score, geocode, workers) if requests else [])
+    return [next(scored) if ok else MatchScore.failed(INCOMPATIBLE_PAIR) for ok in compatible]
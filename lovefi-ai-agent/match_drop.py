@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+"""
+Weekly "match drop" batch job: pair the whole active population at once.
+
+The job streams a sparse compatibility graph out of the existing top-K
+scorer (each user contributes edges to their K best candidates), keeps at
+most --max-edges of the heaviest edges in a min-heap so memory is bounded by
+edge count rather than by users squared, and then computes a greedy
+maximum-weight matching: edges are taken heaviest first whenever both
+endpoints are still free. Greedy matching is within a factor of two of the
+optimal weight and runs in O(E log E), which is what makes hundreds of
+thousands of users tractable on one machine.
+
+    python match_drop.py --profiles-dir ../server/data/profiles --output drop.jsonl
+    python match_drop.py --synthetic 200000 --workers 8 --k 10
+"""
+
+import argparse
+import glob
+import heapq
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(__file__))
+from match_engine import ProfileIndex
+from minhash_lsh import MinHashLSH
+from synthetic_profiles import make_synthetic_profiles
+
+Edge = Tuple[float, int, int]
+
+# Index shared with forked workers (copy-on-write, never pickled)
+_worker_index: Optional[ProfileIndex] = None
+_worker_options: Dict[str, Any] = {}
+
+
+def load_profiles(profiles_dir: Optional[str] = None, jsonl_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream stored profiles from a directory of *.json files or a JSON-lines file"""
+    if profiles_dir:
+        for path in sorted(glob.glob(os.path.join(profiles_dir, "*.json"))):
+            with open(path, encoding="utf-8") as f:
+                yield json.load(f)
+    if jsonl_path:
+        with open(jsonl_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def build_index(profiles: Iterable[Dict[str, Any]], approximate: bool = False) -> ProfileIndex:
+    index = ProfileIndex(lsh=MinHashLSH() if approximate else None)
+    for profile in profiles:
+        index.add(profile)
+    return index
+
+
+def edges_for(index: ProfileIndex, pids: Iterable[int], k: int, approximate: bool,
+              reciprocal: bool = False) -> List[Edge]:
+    """Top-K edges for a range of users, each as (score, low pid, high pid)"""
+    edges = []
+    profiles = index.profiles
+    for pid in pids:
+        profile = profiles[pid]
+        for other_key, score in index.top_k(profile.key, k, approximate, reciprocal):
+            other = index.by_key[other_key].pid
+            if score > 0:
+                edges.append((score, min(pid, other), max(pid, other)))
+    return edges
+
+
+def _worker_edges(pid_range: Tuple[int, int]) -> List[Edge]:
+    return edges_for(_worker_index, range(*pid_range), **_worker_options)
+
+
+def stream_edges(index: ProfileIndex, k: int, workers: int = 1, approximate: bool = False,
+                 reciprocal: bool = False, chunk_size: int = 2000) -> Iterator[List[Edge]]:
+    """Yield edge chunks as they are produced; with workers > 1 chunks come from forked processes"""
+    global _worker_index, _worker_options
+    chunks = [(start, min(start + chunk_size, len(index))) for start in range(0, len(index), chunk_size)]
+    if workers <= 1:
+        for start, end in chunks:
+            yield edges_for(index, range(start, end), k, approximate, reciprocal)
+        return
+
+    _worker_index = index
+    _worker_options = {"k": k, "approximate": approximate, "reciprocal": reciprocal}
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        yield from pool.imap_unordered(_worker_edges, chunks)
+
+
+def collect_edges(edge_chunks: Iterable[List[Edge]], max_edges: int) -> List[Edge]:
+    """Keep the max_edges heaviest distinct edges; duplicates (both users listing each other) collapse"""
+    heap: List[Edge] = []
+    seen = set()
+    for chunk in edge_chunks:
+        for edge in chunk:
+            key = (edge[1], edge[2])
+            if key in seen:
+                continue
+            if len(heap) < max_edges:
+                heapq.heappush(heap, edge)
+                seen.add(key)
+            elif edge[0] > heap[0][0]:
+                dropped = heapq.heapreplace(heap, edge)
+                seen.discard((dropped[1], dropped[2]))
+                seen.add(key)
+    return heap
+
+
+def greedy_matching(edges: List[Edge]) -> List[Edge]:
+    """Heaviest-first greedy matching (1/2-approximation of maximum weight)"""
+    edges.sort(reverse=True)
+    matched = set()
+    pairs = []
+    for edge in edges:
+        _, a, b = edge
+        if a in matched or b in matched:
+            continue
+        matched.add(a)
+        matched.add(b)
+        pairs.append(edge)
+    return pairs
+
+
+def run_match_drop(index: ProfileIndex, k: int = 10, max_edges: int = 5_000_000, workers: int = 1,
+                   approximate: bool = False, reciprocal: bool = False
+                   ) -> Tuple[List[Tuple[str, str, float]], Dict[str, Any]]:
+    started = time.perf_counter()
+    edges = collect_edges(stream_edges(index, k, workers, approximate, reciprocal), max_edges)
+    graph_built = time.perf_counter()
+    num_edges = len(edges)
+    pairs = greedy_matching(edges)
+    finished = time.perf_counter()
+
+    profiles = index.profiles
+    result = [(profiles[a].key, profiles[b].key, score) for score, a, b in pairs]
+    stats = {
+        "users": len(index),
+        "edges": num_edges,
+        "pairs": len(result),
+        "matched_users": 2 * len(result),
+        "total_score": sum(score for _, _, score in result),
+        "graph_seconds": round(graph_built - started, 3),
+        "matching_seconds": round(finished - graph_built, 3),
+    }
+    return result, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles-dir", help="directory of stored profile *.json files")
+    parser.add_argument("--profiles-jsonl", help="JSON-lines file with one stored profile per line")
+    parser.add_argument("--synthetic", type=int, default=0, help="generate N synthetic profiles instead")
+    parser.add_argument("--k", type=int, default=10, help="candidates per user in the graph")
+    parser.add_argument("--max-edges", type=int, default=5_000_000, help="memory bound on graph size")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--approximate", action="store_true", help="use MinHash LSH for the interest stage")
+    parser.add_argument("--reciprocal", action="store_true", help="weight edges by reciprocal (harmonic-mean) score")
+    parser.add_argument("--output", help="write pairs as JSON lines here (default: stdout)")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        profiles = make_synthetic_profiles(args.synthetic)
+    else:
+        profiles = load_profiles(args.profiles_dir, args.profiles_jsonl)
+
+    start = time.perf_counter()
+    index = build_index(profiles, args.approximate)
+    print(f"Indexed {len(index)} profiles in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    pairs, stats = run_match_drop(index, args.k, args.max_edges, args.workers, args.approximate, args.reciprocal)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for key_a, key_b, score in pairs:
+            out.write(json.dumps({"user1": key_a, "user2": key_b, "score": round(score, 2)}) + "\n")
+    finally:
+        if args.output:
+            out.close()
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
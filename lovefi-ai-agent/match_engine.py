@@ -0,0 +1,396 @@
+"""
+In-memory profile index with top-K and batch scoring for the dating match agents.
+
+Profiles are compiled once at ingestion into a compact form so that scoring a
+pair never re-parses the raw profile JSON. Candidate pairs go through cheap
+filter stages first; only pairs that survive every stage are scored.
+"""
+
+import difflib
+import heapq
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from math import radians, sin, cos, sqrt, asin
+
+from match_index import AgeIndex, GeoIndex, InterestIndex, intersect_sorted
+from memory_stats import deep_sizeof, sized
+from minhash_lsh import MinHashLSH
+
+# Gender bits. Each profile has exactly one gender bit and a mask of the genders
+# it is open to, so mutual compatibility is two bitwise ANDs.
+GENDER_WOMAN = 1
+GENDER_MAN = 2
+GENDER_NON_BINARY = 4
+GENDER_OTHER = 8
+GENDER_ANY = GENDER_WOMAN | GENDER_MAN | GENDER_NON_BINARY | GENDER_OTHER
+
+GENDER_BITS = {
+    "woman": GENDER_WOMAN,
+    "female": GENDER_WOMAN,
+    "man": GENDER_MAN,
+    "male": GENDER_MAN,
+    "non-binary": GENDER_NON_BINARY,
+    "non_binary": GENDER_NON_BINARY,
+    "nonbinary": GENDER_NON_BINARY,
+    "other": GENDER_OTHER,
+}
+
+DEFAULT_MAX_AGE_DIFF = 10
+DEFAULT_SEARCH_RADIUS = 10
+DEFAULT_CANDIDATE_CACHE_SIZE = 10000
+
+
+def haversine(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
+    c = 2 * asin(sqrt(a))
+    km = 6371 * c
+    return km
+
+
+def encode_gender(gender: Optional[str]) -> int:
+    """Return the gender bit for a selection; unknown genders match any mask"""
+    if not gender:
+        return GENDER_ANY
+    return GENDER_BITS.get(gender.strip().lower(), GENDER_ANY)
+
+
+def encode_seeking(gender: Optional[str], sexuality: Optional[str]) -> int:
+    """Return the mask of genders a profile is open to"""
+    gender_bit = encode_gender(gender)
+    sexuality = (sexuality or "").strip().lower()
+    if sexuality == "straight":
+        if gender_bit == GENDER_WOMAN:
+            return GENDER_MAN
+        if gender_bit == GENDER_MAN:
+            return GENDER_WOMAN
+        return GENDER_ANY
+    if sexuality == "gay":
+        return gender_bit
+    if sexuality == "lesbian":
+        return GENDER_WOMAN
+    return GENDER_ANY
+
+
+def mutually_compatible(gender_a: int, seeking_a: int, gender_b: int, seeking_b: int) -> bool:
+    return bool(seeking_a & gender_b) and bool(seeking_b & gender_a)
+
+
+def birth_ordinal(birthday_str: str) -> Optional[int]:
+    if not birthday_str:
+        return None
+    try:
+        return datetime.fromisoformat(birthday_str).date().toordinal()
+    except ValueError:
+        return None
+
+
+def age_from_ordinal(ordinal: Optional[int], today: Optional[date] = None) -> Optional[int]:
+    if ordinal is None:
+        return None
+    birth_date = date.fromordinal(ordinal)
+    today = today or datetime.now(timezone.utc).date()
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+
+class CompiledProfile:
+    """Scoring-ready view of a single profile"""
+
+    __slots__ = (
+        "pid", "key", "name", "gender", "seeking", "birth_ordinal", "age",
+        "max_age_diff", "address", "lat", "lon", "search_radius",
+        "interests", "preferences",
+    )
+
+    def __init__(self, pid: int, key: str, name: str, gender: int, seeking: int,
+                 birth_ordinal: Optional[int], age: Optional[int], max_age_diff: int,
+                 address: str, lat: Optional[float], lon: Optional[float], search_radius: int,
+                 interests: frozenset, preferences: Tuple[str, ...]):
+        self.pid = pid
+        self.key = key
+        self.name = name
+        self.gender = gender
+        self.seeking = seeking
+        self.birth_ordinal = birth_ordinal
+        self.age = age
+        self.max_age_diff = max_age_diff
+        self.address = address
+        self.lat = lat
+        self.lon = lon
+        self.search_radius = search_radius
+        self.interests = interests
+        self.preferences = preferences
+
+
+def compile_profile(data: Dict[str, Any], pid: int = 0) -> CompiledProfile:
+    """Compile a stored profile (server/data/profiles/*.json format)"""
+    personal_info = data.get("personalInfo") or {}
+    location = data.get("location") or {}
+    gender = (data.get("gender") or {}).get("selection")
+    sexuality = (data.get("sexuality") or {}).get("selection")
+    ordinal = birth_ordinal(personal_info.get("birthday", ""))
+    name = f"{personal_info.get('firstName', '')} {personal_info.get('lastName', '')}".strip()
+    return CompiledProfile(
+        pid=pid,
+        key=data.get("id") or str(pid),
+        name=name,
+        gender=encode_gender(gender),
+        seeking=encode_seeking(gender, sexuality),
+        birth_ordinal=ordinal,
+        age=age_from_ordinal(ordinal),
+        max_age_diff=DEFAULT_MAX_AGE_DIFF if data.get("maxAgeDiff") is None else data["maxAgeDiff"],
+        address=location.get("fullAddress") or location.get("city") or "",
+        lat=location.get("latitude"),
+        lon=location.get("longitude"),
+        search_radius=location.get("searchRadius") or DEFAULT_SEARCH_RADIUS,
+        interests=frozenset(data.get("personalInterests") or ()),
+        preferences=tuple(p.get("selectedOption", "") for p in data.get("partnerPreferences") or ()),
+    )
+
+
+def score_compiled(a: CompiledProfile, b: CompiledProfile) -> float:
+    """Score two compiled profiles with the same weights as calculate_match_score_internal"""
+    # Interest compatibility (40%)
+    max_interests = max(len(a.interests), len(b.interests), 1)
+    score = (len(a.interests & b.interests) / max_interests) * 40
+
+    # Age compatibility (20%)
+    if a.age is not None and b.age is not None:
+        max_age_diff = max(a.max_age_diff, b.max_age_diff)
+        score += max(0, (1 - abs(a.age - b.age) / max_age_diff)) * 20 if max_age_diff > 0 else 20
+    else:
+        score += 10
+
+    # Location compatibility (20%)
+    if a.lat is not None and a.lon is not None and b.lat is not None and b.lon is not None:
+        dist = haversine(a.lon, a.lat, b.lon, b.lat)
+        max_radius = max(a.search_radius, b.search_radius)
+        if dist <= max_radius:
+            score += 20 * (1 - dist / max_radius)
+    else:
+        score += difflib.SequenceMatcher(None, a.address.lower(), b.address.lower()).ratio() * 20
+
+    # Preference compatibility (20%)
+    total = min(len(a.preferences), len(b.preferences))
+    if total > 0:
+        num_matching = sum(1 for p1, p2 in zip(a.preferences, b.preferences) if p1 == p2)
+        score += (num_matching / total) * 20
+
+    return min(max(score, 0), 100)
+
+
+def score_directed(a: CompiledProfile, b: CompiledProfile) -> float:
+    """Score b from a's point of view: a's interests, a's age gap and a's search radius"""
+    # Interest compatibility (40%): share of a's interests that b also has
+    score = (len(a.interests & b.interests) / max(len(a.interests), 1)) * 40
+
+    # Age compatibility (20%)
+    if a.age is not None and b.age is not None:
+        score += max(0, (1 - abs(a.age - b.age) / a.max_age_diff)) * 20 if a.max_age_diff > 0 else 20
+    else:
+        score += 10
+
+    # Location compatibility (20%)
+    if a.lat is not None and a.lon is not None and b.lat is not None and b.lon is not None:
+        dist = haversine(a.lon, a.lat, b.lon, b.lat)
+        if dist <= a.search_radius:
+            score += 20 * (1 - dist / a.search_radius)
+    else:
+        score += difflib.SequenceMatcher(None, a.address.lower(), b.address.lower()).ratio() * 20
+
+    # Preference compatibility (20%)
+    total = min(len(a.preferences), len(b.preferences))
+    if total > 0:
+        num_matching = sum(1 for p1, p2 in zip(a.preferences, b.preferences) if p1 == p2)
+        score += (num_matching / total) * 20
+
+    return min(max(score, 0), 100)
+
+
+def harmonic_mean(x: float, y: float) -> float:
+    return 2 * x * y / (x + y) if x + y > 0 else 0.0
+
+
+class ProfileIndex:
+    """Compiled profiles addressable by external key or dense integer id"""
+
+    def __init__(self, lsh: Optional[MinHashLSH] = None, candidate_cache_size: int = DEFAULT_CANDIDATE_CACHE_SIZE):
+        self.profiles: List[CompiledProfile] = []
+        self.by_key: Dict[str, CompiledProfile] = {}
+        self.ages = AgeIndex()
+        self.geo = GeoIndex()
+        self.interests = InterestIndex()
+        # Optional approximate interest index used by top_k(approximate=True)
+        self.lsh = lsh
+        # Widest age gap / radius anyone accepts, so pruning never drops a pair
+        # whose age or location component could still be non-zero
+        self.max_age_diff = DEFAULT_MAX_AGE_DIFF
+        self.max_search_radius = DEFAULT_SEARCH_RADIUS
+        # LRU of directed candidate scores per (pid, approximate), reused by
+        # reciprocal top-K so the reverse direction is a dict lookup
+        self.candidate_cache: "OrderedDict[Tuple[int, bool], Dict[int, float]]" = OrderedDict()
+        self.candidate_cache_size = candidate_cache_size
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def add(self, data: Dict[str, Any]) -> CompiledProfile:
+        existing = self.by_key.get(data.get("id"))
+        pid = existing.pid if existing is not None else len(self.profiles)
+        profile = compile_profile(data, pid)
+        if self.candidate_cache:
+            self.candidate_cache.clear()
+        if existing is not None:
+            self._unindex(existing)
+            self.profiles[pid] = profile
+        else:
+            self.profiles.append(profile)
+        self.by_key[profile.key] = profile
+        self.ages.add(pid, profile.birth_ordinal)
+        self.geo.add(pid, profile.lat, profile.lon)
+        self.interests.add(pid, profile.interests)
+        if self.lsh is not None:
+            self.lsh.add(pid, profile.interests)
+        self.max_age_diff = max(self.max_age_diff, profile.max_age_diff)
+        self.max_search_radius = max(self.max_search_radius, profile.search_radius)
+        return profile
+
+    def _unindex(self, profile: CompiledProfile):
+        self.ages.remove(profile.pid, profile.birth_ordinal)
+        self.geo.remove(profile.pid, profile.lat, profile.lon)
+        self.interests.remove(profile.pid, profile.interests)
+        if self.lsh is not None:
+            self.lsh.remove(profile.pid)
+
+    def get(self, key: str) -> Optional[CompiledProfile]:
+        return self.by_key.get(key)
+
+    def footprint(self) -> Dict[str, Any]:
+        """
+        Bytes per compiled profile and per entry of each index. Profiles are
+        measured first, so the indexes are charged only for their own
+        containers, not for the interest strings the profiles already hold.
+        Walks every object: for benchmarks, not the request path.
+        """
+        seen: set = set()
+        structures = {
+            "profiles": sized(len(self.profiles), deep_sizeof(self.profiles, seen)),
+            "by_key": sized(len(self.by_key), deep_sizeof(self.by_key, seen)),
+            "ages": sized(len(self.ages), deep_sizeof(self.ages, seen)),
+            "geo": sized(len(self.geo), deep_sizeof(self.geo, seen)),
+            "interests": sized(len(self.interests), deep_sizeof(self.interests, seen)),
+            "candidate_cache": sized(len(self.candidate_cache), deep_sizeof(self.candidate_cache, seen)),
+        }
+        if self.lsh is not None:
+            structures["lsh"] = sized(len(self.lsh), deep_sizeof(self.lsh, seen))
+        total = sum(structure["bytes"] for structure in structures.values())
+        return {
+            "structures": structures,
+            "bytes": total,
+            "bytes_per_profile": round(total / len(self.profiles), 1) if self.profiles else 0.0,
+        }
+
+    def candidate_ids(self, profile: CompiledProfile, approximate: bool = False) -> List[int]:
+        """Sorted ids of candidates that pass every pre-filter stage
+
+        With approximate=True and an LSH index configured, the interest stage
+        only keeps candidates whose MinHash signature collides with the
+        profile's in some band instead of everyone sharing any interest.
+        """
+        profiles = self.profiles
+        gender, seeking = profile.gender, profile.seeking
+
+        # Stage 1: binary-search the admissible age window. Whichever of the
+        # age window and the geo grid is smaller drives the merge; the other
+        # is applied as a per-id range check instead of being materialised.
+        window = self.ages.bounds(profile.birth_ordinal, max(profile.max_age_diff, self.max_age_diff))
+        geo_ids = self.geo.within(profile.lat, profile.lon, max(profile.search_radius, self.max_search_radius))
+        if window is None:
+            ids = geo_ids if geo_ids is not None else range(len(profiles))
+        elif geo_ids is not None and len(geo_ids) < window.count:
+            lo, hi = window.lo, window.hi
+            ids = [pid for pid in geo_ids
+                   if profiles[pid].birth_ordinal is None or lo < profiles[pid].birth_ordinal < hi]
+        else:
+            ids = self.ages.window(profile.birth_ordinal, max(profile.max_age_diff, self.max_age_diff))
+            if geo_ids is not None:
+                ids = intersect_sorted(ids, geo_ids)
+
+        # Stage 2: gender/sexuality bitmask
+        ids = [pid for pid in ids if seeking & profiles[pid].gender and profiles[pid].seeking & gender]
+
+        # Stage 3: shared (or, approximately, likely high-overlap) interests
+        if ids and profile.interests:
+            if approximate and self.lsh is not None:
+                ids = intersect_sorted(ids, self.lsh.query(profile.interests))
+            elif self.interests.estimate(profile.interests) > len(ids):
+                interests = profile.interests
+                ids = [pid for pid in ids if not interests.isdisjoint(profiles[pid].interests)]
+            else:
+                ids = intersect_sorted(ids, self.interests.sharing(profile.interests))
+
+        return [pid for pid in ids if pid != profile.pid]
+
+    def candidates(self, profile: CompiledProfile, approximate: bool = False) -> Iterable[CompiledProfile]:
+        profiles = self.profiles
+        return (profiles[pid] for pid in self.candidate_ids(profile, approximate))
+
+    def directed_scores(self, profile: CompiledProfile, approximate: bool = False) -> Dict[int, float]:
+        """Directed scores of every candidate of a profile, cached per profile"""
+        cache_key = (profile.pid, approximate)
+        cache = self.candidate_cache
+        scores = cache.get(cache_key)
+        if scores is not None:
+            cache.move_to_end(cache_key)
+            return scores
+        scores = {other.pid: score_directed(profile, other) for other in self.candidates(profile, approximate)}
+        cache[cache_key] = scores
+        if len(cache) > self.candidate_cache_size:
+            cache.popitem(last=False)
+        return scores
+
+    def reverse_score(self, profile: CompiledProfile, other: CompiledProfile, approximate: bool = False) -> float:
+        """score(other -> profile): a cache lookup when other's list is cached, else one pair score"""
+        scores = self.candidate_cache.get((other.pid, approximate))
+        if scores is not None:
+            score = scores.get(profile.pid)
+            # The filter stages are not symmetric (an empty interest set skips
+            # the interest stage), so profile can be missing from other's list
+            if score is not None:
+                return score
+        return score_directed(other, profile)
+
+    def top_k(self, key: str, k: int = 10, approximate: bool = False,
+              reciprocal: bool = False) -> List[Tuple[str, float]]:
+        """Return the k best-scoring candidates for a profile as (key, score)
+
+        With reciprocal=True candidates are ranked by the harmonic mean of
+        score(profile -> candidate) and score(candidate -> profile), so someone
+        who suits the profile but would rank it poorly does not take a slot.
+        """
+        profile = self.by_key[key]
+        if reciprocal:
+            profiles = self.profiles
+            scored = (
+                (harmonic_mean(forward, self.reverse_score(profile, profiles[pid], approximate)), profiles[pid].key)
+                for pid, forward in self.directed_scores(profile, approximate).items()
+            )
+        else:
+            scored = ((score_compiled(profile, other), other.key) for other in self.candidates(profile, approximate))
+        return [(other_key, score) for score, other_key in heapq.nlargest(k, scored)]
+
+    def score_batch(self, pairs: Iterable[Tuple[str, str]]) -> List[float]:
+        """Score (key_a, key_b) pairs; mutually incompatible pairs score 0 without any scoring work"""
+        results = []
+        for key_a, key_b in pairs:
+            a = self.by_key[key_a]
+            b = self.by_key[key_b]
+            if not mutually_compatible(a.gender, a.seeking, b.gender, b.seeking):
+                results.append(0.0)
+                continue
+            results.append(score_compiled(a, b))
+        return results
@@ -0,0 +1,178 @@
+"""
+Candidate indexes for top-K retrieval.
+
+Every index answers a query with a sorted list of dense profile ids, so stages
+can be combined with a linear sorted-id merge and each stage only has to look
+at what the previous one let through.
+"""
+
+import bisect
+from datetime import date
+from math import cos, floor, radians
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Grid cell size for the geo index, in degrees (~55 km of latitude)
+GEO_CELL_DEG = 0.5
+KM_PER_DEG = 111.0
+
+
+def intersect_sorted(a: List[int], b: List[int]) -> List[int]:
+    """Merge-intersect two ascending id lists"""
+    result = []
+    i = j = 0
+    len_a, len_b = len(a), len(b)
+    while i < len_a and j < len_b:
+        x, y = a[i], b[j]
+        if x == y:
+            result.append(x)
+            i += 1
+            j += 1
+        elif x < y:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def union_sorted(lists: Iterable[List[int]]) -> List[int]:
+    merged = set()
+    for ids in lists:
+        merged.update(ids)
+    return sorted(merged)
+
+
+def shift_years(ordinal: int, years: int) -> int:
+    """Move a date ordinal by whole years, clamping Feb 29 to Feb 28"""
+    d = date.fromordinal(ordinal)
+    try:
+        return d.replace(year=d.year + years).toordinal()
+    except ValueError:
+        return d.replace(year=d.year + years, day=28).toordinal()
+
+
+class AgeWindow(NamedTuple):
+    """Exclusive birth-ordinal bounds and the number of dated profiles inside them"""
+    lo: int
+    hi: int
+    count: int
+
+
+class AgeIndex:
+    """Birth ordinals kept sorted alongside profile ids"""
+
+    def __init__(self):
+        self._entries: List[Tuple[int, int]] = []
+        self._unknown: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._unknown)
+
+    def add(self, pid: int, ordinal: Optional[int]):
+        if ordinal is None:
+            bisect.insort(self._unknown, pid)
+        else:
+            bisect.insort(self._entries, (ordinal, pid))
+
+    def remove(self, pid: int, ordinal: Optional[int]):
+        if ordinal is None:
+            entries, item = self._unknown, pid
+        else:
+            entries, item = self._entries, (ordinal, pid)
+        i = bisect.bisect_left(entries, item)
+        if i < len(entries) and entries[i] == item:
+            del entries[i]
+
+    def bounds(self, ordinal: Optional[int], max_age_diff: int) -> Optional[AgeWindow]:
+        """Binary-search the window of births strictly within max_age_diff years of ordinal"""
+        if ordinal is None:
+            return None
+        lo_ordinal = shift_years(ordinal, -max_age_diff)
+        hi_ordinal = shift_years(ordinal, max_age_diff)
+        lo = bisect.bisect_right(self._entries, (lo_ordinal, float("inf")))
+        hi = bisect.bisect_left(self._entries, (hi_ordinal, -1))
+        return AgeWindow(lo_ordinal, hi_ordinal, hi - lo)
+
+    def window(self, ordinal: Optional[int], max_age_diff: int) -> Optional[List[int]]:
+        """Ids born strictly within max_age_diff years of ordinal, plus ids with no birthday"""
+        if ordinal is None:
+            return None
+        lo = bisect.bisect_right(self._entries, (shift_years(ordinal, -max_age_diff), float("inf")))
+        hi = bisect.bisect_left(self._entries, (shift_years(ordinal, max_age_diff), -1))
+        ids = sorted(pid for _, pid in self._entries[lo:hi])
+        return union_sorted((ids, self._unknown)) if self._unknown else ids
+
+
+class GeoIndex:
+    """Fixed-size lat/lon grid of profile ids"""
+
+    def __init__(self, cell_deg: float = GEO_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._unknown: List[int] = []
+
+    def __len__(self) -> int:
+        return sum(map(len, self._cells.values())) + len(self._unknown)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return floor(lat / self.cell_deg), floor(lon / self.cell_deg)
+
+    def add(self, pid: int, lat: Optional[float], lon: Optional[float]):
+        if lat is None or lon is None:
+            bisect.insort(self._unknown, pid)
+        else:
+            bisect.insort(self._cells.setdefault(self._cell(lat, lon), []), pid)
+
+    def remove(self, pid: int, lat: Optional[float], lon: Optional[float]):
+        if lat is None or lon is None:
+            ids = self._unknown
+        else:
+            ids = self._cells.get(self._cell(lat, lon), [])
+        i = bisect.bisect_left(ids, pid)
+        if i < len(ids) and ids[i] == pid:
+            del ids[i]
+
+    def within(self, lat: Optional[float], lon: Optional[float], radius_km: float) -> Optional[List[int]]:
+        """Ids in grid cells overlapping the radius bounding box, plus ids without coordinates"""
+        if lat is None or lon is None:
+            return None
+        dlat = radius_km / KM_PER_DEG
+        dlon = radius_km / (KM_PER_DEG * max(cos(radians(lat)), 0.01))
+        i0, j0 = self._cell(lat - dlat, lon - dlon)
+        i1, j1 = self._cell(lat + dlat, lon + dlon)
+        cells = self._cells
+        found = [cells[(i, j)] for i in range(i0, i1 + 1) for j in range(j0, j1 + 1) if (i, j) in cells]
+        found.append(self._unknown)
+        return union_sorted(found)
+
+
+class InterestIndex:
+    """Inverted index from interest to sorted profile ids"""
+
+    def __init__(self):
+        self._postings: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        """Number of (interest, id) postings"""
+        return sum(map(len, self._postings.values()))
+
+    def add(self, pid: int, interests: Iterable[str]):
+        for interest in interests:
+            bisect.insort(self._postings.setdefault(interest, []), pid)
+
+    def remove(self, pid: int, interests: Iterable[str]):
+        for interest in interests:
+            ids = self._postings.get(interest, [])
+            i = bisect.bisect_left(ids, pid)
+            if i < len(ids) and ids[i] == pid:
+                del ids[i]
+
+    def estimate(self, interests: Iterable[str]) -> int:
+        """Upper bound on the size of sharing(interests), without merging"""
+        postings = self._postings
+        return sum(len(postings[i]) for i in interests if i in postings)
+
+    def sharing(self, interests: Iterable[str]) -> Optional[List[int]]:
+        """Ids sharing at least one interest; None when there is nothing to constrain on"""
+        if not interests:
+            return None
+        return union_sorted(self._postings[i] for i in interests if i in self._postings)
@@ -0,0 +1,67 @@
+"""
+Structured match score results.
+
+The scorers used to format four f-strings and join them into a details
+string for every pair, which batch callers then discarded. They now return
+a MatchScore holding the component scores and the facts behind them, and
+only callers that show the breakdown (chat replies, /api/match/full,
+MatchResponse) call details() to render it.
+"""
+
+from typing import AbstractSet, Optional
+
+
+class MatchScore:
+    __slots__ = (
+        "score", "interest_score", "age_score", "location_score", "preference_score",
+        "common_interests", "age_diff", "distance", "location_tier",
+        "matching_preferences", "total_preferences", "reduced", "error",
+    )
+
+    def __init__(self, interest_score: float = 0.0, age_score: float = 0.0, location_score: float = 0.0,
+                 preference_score: float = 0.0, common_interests: AbstractSet[str] = frozenset(),
+                 age_diff: Optional[int] = None, distance: Optional[float] = None, location_tier: str = "",
+                 matching_preferences: int = 0, total_preferences: int = 0, reduced: bool = False,
+                 error: Optional[str] = None):
+        self.interest_score = interest_score
+        self.age_score = age_score
+        self.location_score = location_score
+        self.preference_score = preference_score
+        # Ensure score is between 0 and 100
+        self.score = min(max(interest_score + age_score + location_score + preference_score, 0), 100)
+        self.common_interests = common_interests
+        self.age_diff = age_diff
+        self.distance = distance
+        self.location_tier = location_tier
+        self.matching_preferences = matching_preferences
+        self.total_preferences = total_preferences
+        # Scored in reduced mode (load_control.py): no details are rendered
+        self.reduced = reduced
+        self.error = error
+
+    @classmethod
+    def failed(cls, message: str) -> "MatchScore":
+        """Zero score whose details are the error message"""
+        return cls(error=message)
+
+    def details(self) -> str:
+        if self.error is not None:
+            return self.error
+        if self.reduced:
+            return ""
+        age_detail = f"{self.age_diff} years" if self.age_diff is not None else "Unknown"
+        dist_str = f"{self.distance:.1f} km" if self.distance is not None else "Unknown"
+        return "; ".join([
+            f"Interest compatibility: {self.interest_score:.1f}/40 "
+            f"(Common interests: {', '.join(self.common_interests) or 'None'})",
+            f"Age compatibility: {self.age_score:.1f}/20 (Age difference: {age_detail})",
+            f"Location compatibility: {self.location_score:.1f}/20 "
+            f"(Distance: {dist_str}, Location source: {self.location_tier})",
+            f"Preference compatibility: {self.preference_score:.1f}/20 "
+            f"(Matching preferences: {self.matching_preferences}/{self.total_preferences})",
+        ])
+
+
+def batch_details(result: MatchScore, with_details: bool) -> str:
+    """Details for a batch result: only if requested, but errors are always reported"""
+    return result.details() if with_details or result.error is not None else ""
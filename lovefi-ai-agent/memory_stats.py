@@ -0,0 +1,132 @@
+"""
+Memory accounting for profiles, indexes and caches.
+
+sys.getsizeof only counts an object's own header, so deep_sizeof walks
+containers, __slots__ and __dict__ and counts each object once. Passing the
+same seen set across calls attributes shared objects (interned interest
+strings, the same profile referenced from two structures) to whichever
+structure was measured first. Caches holding many entries are measured
+from a sample of them and extrapolated, so footprint() stays cheap enough
+for the REST endpoint. ProfileIndex.footprint() walks everything and is
+meant for benchmarks (bench_memory.py).
+
+TracemallocDiff starts tracemalloc on demand and reports which source
+lines allocated the most since the previous snapshot.
+"""
+
+import sys
+import tracemalloc
+from collections import deque
+from itertools import islice
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+FOOTPRINT_SAMPLE = 1000
+TOP_ALLOCATIONS = 20
+
+_LEAVES = (str, bytes, int, float, complex, bool, type(None))
+_SEQUENCES = (list, tuple, set, frozenset, deque)
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """Bytes of obj and everything it references that is not already in seen"""
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, type):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, _LEAVES):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, _SEQUENCES):
+            stack.extend(item)
+        else:
+            for cls in type(item).__mro__:
+                for name in getattr(cls, "__slots__", ()):
+                    if hasattr(item, name):
+                        stack.append(getattr(item, name))
+            if hasattr(item, "__dict__"):
+                stack.append(item.__dict__)
+    return total
+
+
+def sized(entries: int, total: int) -> Dict[str, Any]:
+    return {"entries": entries, "bytes": total, "bytes_per_entry": round(total / entries, 1) if entries else 0.0}
+
+
+def mapping_footprint(mapping: Mapping, sample: int = FOOTPRINT_SAMPLE) -> Dict[str, Any]:
+    """Entry count and bytes of a cache mapping, estimated from up to sample entries"""
+    for _ in range(3):
+        try:
+            entries = list(islice(mapping.items(), sample))
+            break
+        except RuntimeError:
+            # Resized by another thread mid-iteration; try again
+            continue
+    else:
+        entries = []
+    seen: Set[int] = set()
+    sampled = sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in entries)
+    count = len(mapping)
+    per_entry = sampled / len(entries) if entries else 0.0
+    return sized(count, sys.getsizeof(mapping) + round(per_entry * count))
+
+
+def rss_bytes() -> int:
+    """Current resident set size; peak RSS where /proc is not available"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class TracemallocDiff:
+    def __init__(self, frames: int = 1):
+        self.frames = frames
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def snapshot(self, limit: int = TOP_ALLOCATIONS) -> Dict[str, Any]:
+        """Start tracing on the first call; later calls diff against the previous snapshot"""
+        top: List[Dict[str, Any]] = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._baseline = None
+        current = self._take()
+        if self._baseline is not None:
+            for stat in current.compare_to(self._baseline, "lineno")[:limit]:
+                top.append({
+                    "location": str(stat.traceback[0]),
+                    "size_diff": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                    "size": stat.size,
+                })
+        self._baseline = current
+        traced, peak = tracemalloc.get_traced_memory()
+        return {"tracing": True, "traced_bytes": traced, "peak_bytes": peak, "top": top}
+
+    def stop(self) -> Dict[str, Any]:
+        tracemalloc.stop()
+        self._baseline = None
+        return {"tracing": False, "traced_bytes": 0, "peak_bytes": 0, "top": []}
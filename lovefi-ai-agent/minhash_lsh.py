@@ -0,0 +1,82 @@
+"""
+MinHash signatures and banded LSH tables over interest sets.
+
+A signature has bands * rows minhash values. Two profiles whose interest sets
+have Jaccard similarity s collide in at least one band with probability
+1 - (1 - s**rows)**bands, so more bands raise recall and more rows per band
+raise precision (fewer, better candidates).
+"""
+
+import random
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Mersenne prime used for the universal hash family
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def stable_hash(token: str) -> int:
+    """Process-independent 32-bit hash (str.__hash__ is salted per process)"""
+    return zlib.crc32(token.encode("utf-8"))
+
+
+class MinHashLSH:
+    """Banded LSH index of MinHash signatures keyed by profile id"""
+
+    def __init__(self, bands: int = 16, rows: int = 4, seed: int = 1):
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        num_perm = bands * rows
+        self._a = [rng.randrange(1, MERSENNE_PRIME) for _ in range(num_perm)]
+        self._b = [rng.randrange(0, MERSENNE_PRIME) for _ in range(num_perm)]
+        self._tables: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[int, Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, interests: Iterable[str]) -> Optional[Tuple[int, ...]]:
+        hashes = [stable_hash(i) for i in set(interests)]
+        if not hashes:
+            return None
+        return tuple(
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+            for a, b in zip(self._a, self._b)
+        )
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> Iterable[Tuple[int, ...]]:
+        rows = self.rows
+        return (signature[i * rows:(i + 1) * rows] for i in range(self.bands))
+
+    def add(self, pid: int, interests: Iterable[str]):
+        signature = self.signature(interests)
+        if signature is None:
+            return
+        self._signatures[pid] = signature
+        for table, key in zip(self._tables, self._band_keys(signature)):
+            table.setdefault(key, []).append(pid)
+
+    def remove(self, pid: int):
+        signature = self._signatures.pop(pid, None)
+        if signature is None:
+            return
+        for table, key in zip(self._tables, self._band_keys(signature)):
+            bucket = table.get(key)
+            if bucket:
+                bucket.remove(pid)
+                if not bucket:
+                    del table[key]
+
+    def query(self, interests: Iterable[str]) -> Optional[List[int]]:
+        """Sorted ids colliding with the interest set in any band; None for an empty set"""
+        signature = self.signature(interests)
+        if signature is None:
+            return None
+        found = set()
+        for table, key in zip(self._tables, self._band_keys(signature)):
+            bucket = table.get(key)
+            if bucket:
+                found.update(bucket)
+        return sorted(found)
@@ -0,0 +1,109 @@
+"""
+Agent-side cache for profile-reference match requests.
+
+A full MatchRequest resends both profiles (with their preference lists) for
+every pair. With MatchRefRequest the caller sends each profile once and then
+refers to it by id and version hash; the agent keeps validated profiles in
+an LRU cache and only asks the caller for profiles it does not have. Requests
+waiting on a ProfileUpload are parked in PendingRefs until their profiles
+arrive.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from uagents import Model
+
+from memory_stats import mapping_footprint
+
+DEFAULT_MAX_PROFILES = 50000
+DEFAULT_MAX_PENDING_PER_SENDER = 1000
+# A profile requested this long ago without an upload is requested again
+FETCH_RETRY_SECONDS = 30.0
+
+ProfileKey = Tuple[str, str]
+
+
+def profile_version(profile: Model) -> str:
+    """Version hash of a profile; callers send it in ProfileRef.version"""
+    return hashlib.sha256(profile.model_dump_json().encode("utf-8")).hexdigest()[:16]
+
+
+class ProfileCache:
+    """LRU mapping profile_id -> (version, profile); a new version replaces the old one"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_PROFILES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def footprint(self) -> Dict[str, Any]:
+        return mapping_footprint(self._entries)
+
+    def get(self, profile_id: str, version: str) -> Optional[Any]:
+        entry = self._entries.get(profile_id)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(profile_id)
+        self.hits += 1
+        return entry[1]
+
+    def has(self, profile_id: str, version: str) -> bool:
+        entry = self._entries.get(profile_id)
+        return entry is not None and entry[0] == version
+
+    def put(self, profile_id: str, version: str, profile: Any):
+        self._entries[profile_id] = (version, profile)
+        self._entries.move_to_end(profile_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class PendingRefs:
+    """
+    Requests waiting for profiles, per sender. Tracks which profiles were
+    already requested so a burst of requests for the same new profile only
+    triggers one fetch.
+    """
+
+    def __init__(self, max_per_sender: int = DEFAULT_MAX_PENDING_PER_SENDER):
+        self.max_per_sender = max_per_sender
+        self._waiting: Dict[str, "OrderedDict[Hashable, Any]"] = {}
+        self._requested: Dict[str, Dict[ProfileKey, float]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(waiting) for waiting in self._waiting.values())
+
+    def park(self, sender: str, request_id: Hashable, request: Any, missing: Sequence[ProfileKey]) -> List[ProfileKey]:
+        """Park a request; returns the missing profiles not already requested from this sender"""
+        waiting = self._waiting.setdefault(sender, OrderedDict())
+        waiting[request_id] = request
+        while len(waiting) > self.max_per_sender:
+            waiting.popitem(last=False)
+        now = time.monotonic()
+        requested = self._requested.setdefault(sender, {})
+        to_fetch = [key for key in missing if key not in requested or requested[key] + FETCH_RETRY_SECONDS <= now]
+        for key in to_fetch:
+            requested[key] = now
+        return to_fetch
+
+    def take(self, sender: str, received: Sequence[ProfileKey]) -> List[Any]:
+        """
+        Record profiles received from sender and remove every request parked
+        for it, oldest first; requests still missing a profile should be parked again
+        """
+        requested = self._requested.get(sender)
+        if requested:
+            for key in received:
+                requested.pop(key, None)
+            if not requested:
+                del self._requested[sender]
+        waiting = self._waiting.pop(sender, None)
+        return list(waiting.values()) if waiting else []
@@ -0,0 +1,63 @@
+"""
+Pre-serialized protocol messages for the dating agents.
+
+Context.send rebuilds the model's JSON schema to hash its digest and
+re-serializes every field on each call. For messages we send on every chat
+turn that is pure overhead: digests never change, and some messages (the
+StructuredOutputPrompt carrying the MatchRequest schema) are almost entirely
+constant. Digests are cached per model class and constant fields are
+serialized once, so per-message work is just the variable fields.
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, Optional, Type
+
+from uagents import Context, Model
+
+
+@lru_cache(maxsize=None)
+def schema_digest(model: Type[Model]) -> str:
+    return Model.build_schema_digest(model)
+
+
+class MessageTemplate:
+    """A protocol message whose digest and constant fields are serialized once"""
+
+    def __init__(self, model: Type[Model], **constant_fields: Any):
+        self.model = model
+        self.schema_digest = schema_digest(model)
+        self._constant_json = json.dumps(constant_fields)[1:-1]
+
+    def render(self, **fields: Any) -> str:
+        """Message body with the given variable fields merged into the constant ones"""
+        parts = [json.dumps(fields)[1:-1] if fields else "", self._constant_json]
+        return "{" + ", ".join(part for part in parts if part) + "}"
+
+
+def _queries(ctx: Context):
+    # Pending ctx.query futures, passed the way ctx.send does so sync replies
+    # resolve; interval and startup contexts have none
+    return getattr(ctx, "_queries", None)
+
+
+async def send_template(ctx: Context, destination: str, template: MessageTemplate,
+                        protocol_digest: Optional[str] = None, **fields: Any):
+    return await ctx.send_raw(
+        destination,
+        template.schema_digest,
+        template.render(**fields),
+        protocol_digest=protocol_digest,
+        queries=_queries(ctx),
+    )
+
+
+async def send_cached(ctx: Context, destination: str, message: Model, protocol_digest: Optional[str] = None):
+    """ctx.send with the schema digest looked up instead of recomputed"""
+    return await ctx.send_raw(
+        destination,
+        schema_digest(type(message)),
+        message.model_dump_json(),
+        protocol_digest=protocol_digest,
+        queries=_queries(ctx),
+    )
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+
+"""
+Multi-process server for the DatingMatchAgent REST endpoints.
+
+agent.run() serves the REST API from a single process, where JSON parsing
+and pydantic validation alone saturate one core. This launcher pre-forks
+worker processes that each run the same REST handlers behind uvicorn on
+their own SO_REUSEPORT socket, so the kernel spreads connections across
+them. Modules are imported before forking and shared copy-on-write, geocode
+lookups go through the shared on-disk cache, and every worker reports into a
+shared-memory stats table that GET /api/health shows as one view. The
+per-stage latency histograms (stage_metrics.py) live in shared memory as
+well, and GET /api/metrics serves their sum in Prometheus text format.
+
+Agent-to-agent messaging (chat, MatchRequest envelopes) still needs the
+agent itself: run dating_match_agent_rest_api.py for that.
+
+    python rest_server.py --workers 4 --port 8080
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from time import perf_counter_ns
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from pydantic.v1 import ValidationError
+
+sys.path.append(os.path.dirname(__file__))
+import dating_match_agent_rest_api as rest_api
+from admission import rejection
+from agent_logging import install_queue_logging
+from stage_metrics import METRICS, PROMETHEUS_CONTENT_TYPE, SIZE, StageMetrics, observe
+from dating_match_agent_rest_api import (
+    AdmissionStatsResponse,
+    AgentInfoResponse,
+    FullMatchRequest,
+    FullMatchResponse,
+    LoopStatsResponse,
+    MemorySnapshotRequest,
+    MemorySnapshotResponse,
+    MemoryStatsResponse,
+    ProfileReportResponse,
+    ProfileSettingsRequest,
+    SimpleMatchRequest,
+    SimpleMatchResponse,
+)
+
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = os.cpu_count() or 1
+HEARTBEAT_SECONDS = 1.0
+# A worker that has not updated its heartbeat for this long is reported as down
+STALE_SECONDS = 5.0
+
+# (request model or None, response model, handler)
+ROUTES = {
+    ("GET", "/api/agent-info"): (None, AgentInfoResponse, rest_api.handle_get_agent_info),
+    ("GET", "/api/admission"): (None, AdmissionStatsResponse, rest_api.handle_get_admission),
+    ("GET", "/api/loop"): (None, LoopStatsResponse, rest_api.handle_get_loop),
+    # Memory figures and tracemalloc snapshots are for the worker that answers
+    ("GET", "/api/memory"): (None, MemoryStatsResponse, rest_api.handle_get_memory),
+    ("POST", "/api/memory/snapshot"): (MemorySnapshotRequest, MemorySnapshotResponse, rest_api.handle_memory_snapshot_post),
+    # The profile rate set by POST applies to the worker that handled it; LOVEFI_PROFILE_RATE sets all
+    ("GET", "/api/profile"): (None, ProfileReportResponse, rest_api.handle_get_profile),
+    ("POST", "/api/profile"): (ProfileSettingsRequest, ProfileReportResponse, rest_api.handle_profile_settings_post),
+    ("POST", "/api/match/simple"): (SimpleMatchRequest, SimpleMatchResponse, rest_api.handle_simple_match_post),
+    ("POST", "/api/match/full"): (FullMatchRequest, FullMatchResponse, rest_api.handle_full_match_post),
+}
+
+logger = logging.getLogger("rest_server")
+
+
+class WorkerStats:
+    """
+    One row of float counters per worker slot in memory shared by all
+    processes. Each worker only writes its own row, so no locking is needed.
+    """
+
+    FIELDS = ("pid", "started", "heartbeat", "requests", "errors", "in_flight", "latency_seconds",
+              "geocode_hits", "geocode_misses", "queued", "rejected", "reduced", "mode_changes",
+              "loop_lag_p99_ms", "loop_stalls")
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self._values = RawArray("d", slots * len(self.FIELDS))
+        self._index = {field: i for i, field in enumerate(self.FIELDS)}
+        # Stage histograms are cumulative, so they are kept across worker restarts
+        self._stages = memoryview(RawArray("d", slots * SIZE)).cast("B").cast("d")
+
+    def _offset(self, slot: int, field: str) -> int:
+        return slot * len(self.FIELDS) + self._index[field]
+
+    def set(self, slot: int, field: str, value: float):
+        self._values[self._offset(slot, field)] = value
+
+    def add(self, slot: int, field: str, value: float = 1.0):
+        self._values[self._offset(slot, field)] += value
+
+    def row(self, slot: int) -> Dict[str, float]:
+        return {field: self._values[self._offset(slot, field)] for field in self.FIELDS}
+
+    def reset(self, slot: int):
+        for field in self.FIELDS:
+            self.set(slot, field, 0.0)
+
+    def stage_values(self, slot: int) -> memoryview:
+        """The slot's stage histogram counters, for StageMetrics.bind"""
+        return self._stages[slot * SIZE:(slot + 1) * SIZE]
+
+    def stage_metrics(self) -> StageMetrics:
+        """Stage histograms summed over all workers"""
+        return StageMetrics.merged(StageMetrics(self.stage_values(slot)) for slot in range(self.slots))
+
+
+class HandlerContext:
+    """The parts of uagents' Context the REST handlers use"""
+
+    def __init__(self):
+        self.agent = rest_api.agent
+        self.logger = logging.getLogger(rest_api.agent.name)
+
+
+def health_view(stats: WorkerStats, now: Optional[float] = None) -> Dict[str, Any]:
+    now = time.time() if now is None else now
+    workers: List[Dict[str, Any]] = []
+    # totals["reduced"] is the number of workers currently scoring in reduced mode
+    totals = {"requests": 0, "errors": 0, "in_flight": 0, "queued": 0, "rejected": 0, "reduced": 0}
+    for slot in range(stats.slots):
+        row = stats.row(slot)
+        requests = int(row["requests"])
+        alive = row["pid"] > 0 and now - row["heartbeat"] < STALE_SECONDS
+        workers.append({
+            "slot": slot,
+            "pid": int(row["pid"]),
+            "alive": alive,
+            "uptime_seconds": round(now - row["started"], 1) if row["pid"] else 0.0,
+            "requests": requests,
+            "errors": int(row["errors"]),
+            "in_flight": int(row["in_flight"]),
+            "avg_latency_ms": round(row["latency_seconds"] / requests * 1000, 2) if requests else 0.0,
+            "geocode_hits": int(row["geocode_hits"]),
+            "geocode_misses": int(row["geocode_misses"]),
+            "queued": int(row["queued"]),
+            "rejected": int(row["rejected"]),
+            "mode": "reduced" if row["reduced"] else "full",
+            "mode_changes": int(row["mode_changes"]),
+            "loop_lag_p99_ms": row["loop_lag_p99_ms"],
+            "loop_stalls": int(row["loop_stalls"]),
+        })
+        for field in totals:
+            totals[field] += int(row[field])
+    alive = sum(worker["alive"] for worker in workers)
+    return {
+        "status": "ok" if alive == stats.slots else ("degraded" if alive else "down"),
+        "workers_alive": alive,
+        "workers": workers,
+        "totals": totals,
+        "timestamp": int(now),
+    }
+
+
+def create_app(stats: WorkerStats, slot: int):
+    """ASGI app serving ROUTES plus GET /api/health for one worker slot"""
+    ctx = HandlerContext()
+    tasks = []
+
+    async def heartbeat():
+        while True:
+            stats.set(slot, "heartbeat", time.time())
+            stats.set(slot, "geocode_hits", rest_api.geocode_cache.hits)
+            stats.set(slot, "geocode_misses", rest_api.geocode_cache.misses)
+            lanes = (rest_api.interactive_admission, rest_api.batch_admission)
+            stats.set(slot, "queued", sum(lane.queued for lane in lanes))
+            stats.set(slot, "rejected", sum(lane.rejected_full + lane.rejected_timeout for lane in lanes))
+            load = rest_api.load_controller
+            stats.set(slot, "reduced", float(load.reduced))
+            stats.set(slot, "mode_changes", load.entered_reduced + load.exited_reduced)
+            lag = rest_api.loop_monitor.stats()
+            stats.set(slot, "loop_lag_p99_ms", lag["p99_ms"])
+            stats.set(slot, "loop_stalls", lag["stalls"])
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+
+    async def read_body(receive) -> bytes:
+        body = b""
+        more = True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+        return body
+
+    async def respond(send, status: int, body: str, headers=(), content_type: str = "application/json"):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type.encode()), *headers],
+        })
+        await send({"type": "http.response.body", "body": body.encode("utf-8")})
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    # After the fork, so each worker runs its own log listener thread
+                    install_queue_logging(ctx.logger)
+                    tasks.append(asyncio.create_task(heartbeat()))
+                    tasks.append(rest_api.load_controller.start(
+                        lambda mode: logger.warning(f"Worker {slot} switched scoring to {mode} mode")
+                    ))
+                    tasks.append(rest_api.loop_monitor.start(lambda stall: logger.warning(
+                        f"Worker {slot} event loop blocked {stall['blocked_ms']:.0f} ms in {stall['handler']}"
+                    )))
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    for task in tasks:
+                        task.cancel()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        key = (scope["method"], scope["path"])
+        if key == ("GET", "/api/health"):
+            await respond(send, 200, json.dumps(health_view(stats)))
+            return
+        if key == ("GET", "/api/metrics"):
+            await respond(send, 200, stats.stage_metrics().render(), content_type=PROMETHEUS_CONTENT_TYPE)
+            return
+        route = ROUTES.get(key)
+        if route is None:
+            await respond(send, 404, json.dumps({"error": "not found"}))
+            return
+
+        request_model, response_model, handler = route
+        start = time.perf_counter()
+        stats.add(slot, "in_flight")
+        try:
+            body = await read_body(receive)
+            if request_model is None:
+                response = await handler(ctx)
+            else:
+                try:
+                    parsed = perf_counter_ns()
+                    request = request_model.model_validate_json(body)
+                    observe("parse", perf_counter_ns() - parsed)
+                except (ValidationError, ValueError) as err:
+                    # Same 400 body uagents returns for an invalid REST request
+                    stats.add(slot, "errors")
+                    errors = err.errors() if isinstance(err, ValidationError) else [{"msg": str(err)}]
+                    await respond(send, 400, json.dumps(dict(errors.pop()), default=str))
+                    return
+                response = await handler(ctx, request)
+            sending = perf_counter_ns()
+            body = response_model.model_validate(response).model_dump_json()
+            rejected = rejection.get()
+            if rejected is not None:
+                # The handler's busy response goes out as 429 so clients and proxies back off
+                retry_after = str(max(1, round(rejected.retry_after))).encode()
+                await respond(send, 429, body, [(b"retry-after", retry_after)])
+                return
+            await respond(send, 200, body)
+            observe("send", perf_counter_ns() - sending)
+        except Exception as err:
+            stats.add(slot, "errors")
+            logger.exception(f"Error handling {key}: {err}")
+            await respond(send, 500, json.dumps({"error": "internal server error"}))
+        finally:
+            stats.add(slot, "in_flight", -1.0)
+            stats.add(slot, "requests")
+            stats.add(slot, "latency_seconds", time.perf_counter() - start)
+
+    return app
+
+
+def reuseport_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(stats: WorkerStats, slot: int, host: str, port: int):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    stats.reset(slot)
+    stats.set(slot, "pid", os.getpid())
+    stats.set(slot, "started", time.time())
+    stats.set(slot, "heartbeat", time.time())
+    METRICS.bind(stats.stage_values(slot))
+    config = uvicorn.Config(create_app(stats, slot), log_level="warning", access_log=False, lifespan="on")
+    uvicorn.Server(config).run(sockets=[reuseport_socket(host, port)])
+
+
+def serve(workers: int, host: str, port: int):
+    """Fork workers, restart any that die, and stop them all on SIGINT/SIGTERM"""
+    stats = WorkerStats(workers)
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(slot: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(stats, slot, host, port)
+            except BaseException:
+                logger.exception(f"REST worker {slot} crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = slot
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for slot in range(workers):
+        spawn(slot)
+    print(f"Serving REST endpoints on http://{host}:{port} with {workers} workers (GET /api/health for status)")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is None:
+            continue
+        stats.set(slot, "pid", 0.0)
+        if not stopping:
+            logger.warning(f"REST worker {slot} (pid {pid}) exited with status {status}, restarting")
+            time.sleep(0.5)
+            spawn(slot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    serve(args.workers, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Tracing spans for chat matches, propagated across hops by chat session.
+
+A chat match crosses several protocol hops. handle_message parses the text
+and forwards it to the external LLM agent. handle_structured_output_response
+gets the structured output back in another handler invocation. Then come
+scoring and the reply. The stage histograms (stage_metrics.py) show how long
+each stage takes overall but cannot connect the hops of one match. Spans
+can: a match is one trace whose id is derived from the uagents session id
+and the chat message id, so each message of a session gets its own trace
+and every span of that match, from either handler, lands in it.
+
+The LLM agent only echoes the session, not a trace header or the message
+id, so context is propagated on our side. hand_off() starts the "llm" span
+and parks it with its parent under the session, and resume() ends it and
+returns the parent once the structured output arrives. Parked traces whose
+reply never comes are ended with an error after the chat session TTL.
+
+Finished spans are queued and exported in batches by a background thread,
+as OTLP/JSON (the OpenTelemetry wire format). They go to a JSON-lines file
+(LOVEFI_TRACE_FILE) or are POSTed to an OTLP/HTTP collector
+(LOVEFI_TRACE_ENDPOINT, e.g. http://localhost:4318). trace_collector.py is
+a stand-in collector and prints the latency breakdown per hop. With
+neither set, tracing is off and every span is the no-op NOOP_SPAN.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from agent_storage import DEFAULT_SESSION_TTL
+from stage_metrics import RequestTimings
+
+DEFAULT_MAX_PARKED = 10000
+EXPORT_BATCH = 256
+EXPORT_INTERVAL_SECONDS = 1.0
+EXPORT_TIMEOUT_SECONDS = 5.0
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+# Root span error when scoring failed or was rejected; the score span has the reason
+SCORING_FAILED = "scoring failed or was rejected"
+
+
+def trace_id_for(session: str, msg_id: str) -> str:
+    """32 hex digits, the same for every span of one chat message"""
+    return hashlib.blake2b(f"{session}/{msg_id}".encode(), digest_size=16).hexdigest()
+
+
+def new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    """A timed operation; use as a context manager or call end() once"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes",
+                 "error", "_tracer")
+
+    def __init__(self, tracer: Optional["SessionTracer"], trace_id: str, name: str,
+                 parent_id: Optional[str] = None, kind: int = KIND_INTERNAL, **attributes: Any):
+        self._tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = new_span_id() if tracer is not None else ""
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def recording(self) -> bool:
+        return self._tracer is not None
+
+    def child(self, name: str, kind: int = KIND_INTERNAL, **attributes: Any) -> "Span":
+        if self._tracer is None:
+            return self
+        return Span(self._tracer, self.trace_id, name, self.span_id, kind, **attributes)
+
+    def set(self, **attributes: Any):
+        if self._tracer is not None:
+            self.attributes.update(attributes)
+
+    def end(self, error: Optional[str] = None):
+        if self._tracer is None or self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.error = error
+        self._tracer.export(self)
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(error=f"{exc_type.__name__}: {exc}" if exc_type is not None else None)
+        return False
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": otlp_value(value)} for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            span["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return span
+
+
+# Handed out while tracing is off; every method is a no-op
+NOOP_SPAN = Span(None, "", "noop")
+
+
+def timing_attributes(timings: Optional[RequestTimings]) -> Dict[str, Any]:
+    """Span attributes from a scorer's RequestTimings: microseconds per stage and geocoding totals"""
+    if timings is None:
+        return {}
+    attributes: Dict[str, Any] = {f"{stage}_us": round(us, 1) for stage, us in timings.stages.items()}
+    attributes["geocode_addresses"] = len(timings.geocode)
+    attributes["geocode_cache_hits"] = sum(1 for entry in timings.geocode if entry["cache_hit"])
+    return attributes
+
+
+def otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: List[Span], service: str) -> Dict[str, Any]:
+    """An OTLP/JSON ExportTraceServiceRequest"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+            "scopeSpans": [{"scope": {"name": "lovefi.session_tracing"}, "spans": [span.to_otlp() for span in spans]}],
+        }]
+    }
+
+
+class FileExporter:
+    """Appends one OTLP/JSON request per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, payload: Dict[str, Any]):
+        with open(self.path, "a") as out:
+            out.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OtlpHttpExporter:
+    """POSTs OTLP/JSON to a collector's /v1/traces"""
+
+    def __init__(self, endpoint: str, timeout: float = EXPORT_TIMEOUT_SECONDS):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, payload: Dict[str, Any]):
+        response = requests.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class SessionTracer:
+    def __init__(self, exporter=None, service: str = "dating-match-agent",
+                 ttl: float = DEFAULT_SESSION_TTL, max_parked: int = DEFAULT_MAX_PARKED):
+        self.exporter = exporter
+        self.service = service
+        self.ttl = ttl
+        self.max_parked = max_parked
+        # session -> (expiry, parent span, hop span), oldest first
+        self._parked: "OrderedDict[str, Tuple[float, Span, Span]]" = OrderedDict()
+        self._queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self.exported = 0
+        self.failed = 0
+        self.expired = 0
+
+    @classmethod
+    def from_env(cls, service: str) -> "SessionTracer":
+        endpoint = os.environ.get("LOVEFI_TRACE_ENDPOINT")
+        path = os.environ.get("LOVEFI_TRACE_FILE")
+        if endpoint:
+            return cls(OtlpHttpExporter(endpoint), service)
+        if path:
+            return cls(FileExporter(path), service)
+        return cls(None, service)
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def trace(self, session: str, msg_id: str, name: str, kind: int = KIND_SERVER, **attributes: Any) -> Span:
+        """Root span of the trace for one chat message"""
+        if self.exporter is None:
+            return NOOP_SPAN
+        return Span(self, trace_id_for(session, msg_id), name, None, kind, session=session, msg_id=msg_id,
+                    **attributes)
+
+    def hand_off(self, session: str, parent: Span, hop: str, **attributes: Any) -> Span:
+        """Start the hop span and park it until resume(session)"""
+        if not parent.recording:
+            return parent
+        self._expire(time.monotonic())
+        span = parent.child(hop, KIND_CLIENT, **attributes)
+        previous = self._parked.pop(session, None)
+        if previous is not None:
+            self._abandon(previous, "replaced by a newer message in the session")
+        self._parked[session] = (time.monotonic() + self.ttl, parent, span)
+        while len(self._parked) > self.max_parked:
+            _, oldest = self._parked.popitem(last=False)
+            self._abandon(oldest, "too many parked traces")
+        return span
+
+    def resume(self, session: str, name: str, **attributes: Any) -> Span:
+        """
+        End the parked hop span and return its parent. Without a parked trace
+        (expired, or parked before a restart) a new root named name is started
+        in a trace of its own, as the message id is no longer known.
+        """
+        if self.exporter is None:
+            return NOOP_SPAN
+        parked = self._parked.pop(session, None)
+        if parked is None:
+            return Span(self, new_trace_id(), name, None, KIND_SERVER, session=session, resumed=False, **attributes)
+        _, parent, span = parked
+        span.end()
+        parent.set(**attributes)
+        return parent
+
+    def _abandon(self, parked: Tuple[float, Span, Span], reason: str):
+        _, parent, span = parked
+        span.end(error=reason)
+        parent.end(error=reason)
+
+    def _expire(self, now: float):
+        while self._parked:
+            session, parked = next(iter(self._parked.items()))
+            if parked[0] > now:
+                break
+            del self._parked[session]
+            self.expired += 1
+            self._abandon(parked, "no reply within the session TTL")
+
+    def sweep(self) -> int:
+        """End parked traces whose reply never came; returns how many"""
+        before = self.expired
+        self._expire(time.monotonic())
+        return self.expired - before
+
+    def export(self, span: Span):
+        # Started lazily, and again in a forked child, which does not inherit threads
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+        self._queue.put(span)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            # Give the rest of the batch a moment to arrive
+            deadline = time.monotonic() + EXPORT_INTERVAL_SECONDS
+            while len(batch) < EXPORT_BATCH:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    self._send(batch)
+                    return
+                batch.append(span)
+            self._send(batch)
+
+    def _send(self, batch: List[Span]):
+        try:
+            self.exporter.export(otlp_payload(batch, self.service))
+            self.exported += len(batch)
+        except Exception:
+            # A missing collector must never break matching
+            self.failed += len(batch)
+
+    def flush(self, timeout: float = EXPORT_TIMEOUT_SECONDS):
+        """Export everything queued and stop the exporter thread"""
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+        self._pid = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "parked": len(self._parked),
+            "exported": self.exported,
+            "failed": self.failed,
+            "expired": self.expired,
+        }
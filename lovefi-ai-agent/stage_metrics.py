@@ -0,0 +1,147 @@
+"""
+Per-stage latency histograms for the match pipeline, in Prometheus text format.
+
+Each stage of a match (request parse, geocode, the four score components,
+response build, send) is timed with time.perf_counter_ns() and recorded
+with observe(), which is a bisect over fixed bucket bounds and two float
+increments under a lock, as scoring threads and the event loop observe
+concurrently. The counters live in one flat array of doubles so that the
+multi-process REST server (rest_server.py) can place each worker's
+counters in shared memory and serve the sum across workers.
+
+Geocoding is split by outcome: geocode_hit when both addresses came from
+the cache, geocode_remote when a live lookup was waited on, geocode_miss
+otherwise (gazetteer, similarity or neutral). geocode_lookup is the
+Nominatim request itself, which may finish after the match was scored.
+
+A client debugging one slow match can ask for its own breakdown instead:
+the REST handlers then attach a RequestTimings to the request's Deadline,
+and the scorer and geocoder fill it in alongside the histograms.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from time import perf_counter_ns
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+STAGES = (
+    "parse",
+    "geocode_hit", "geocode_miss", "geocode_remote", "geocode_lookup",
+    "score_interest", "score_age", "score_location", "score_preference",
+    "response", "send",
+)
+# Bucket upper bounds in nanoseconds, 1us to 10s
+BUCKETS_NS = (
+    1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 500_000,
+    1_000_000, 2_500_000, 5_000_000, 10_000_000, 25_000_000, 50_000_000, 100_000_000,
+    250_000_000, 500_000_000, 1_000_000_000, 2_500_000_000, 5_000_000_000, 10_000_000_000,
+)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Per stage: one count per bucket, the +Inf bucket, then the sum in nanoseconds
+ROW = len(BUCKETS_NS) + 2
+SIZE = len(STAGES) * ROW
+_SUM = ROW - 1
+
+
+class StageMetrics:
+    def __init__(self, values: Optional[Sequence[float]] = None):
+        self._values = array("d", bytes(8 * SIZE)) if values is None else values
+        self._base = {stage: i * ROW for i, stage in enumerate(STAGES)}
+        # Guards the read-modify-write of a bucket and its sum; each process
+        # has its own, as workers only write their own shared-memory row
+        self._lock = threading.Lock()
+
+    def bind(self, values: Sequence[float]):
+        """Record into values (SIZE doubles, e.g. shared memory) from now on"""
+        with self._lock:
+            self._values = values
+
+    def observe(self, stage: str, elapsed_ns: int):
+        base = self._base[stage]
+        bucket = base + bisect_left(BUCKETS_NS, elapsed_ns)
+        with self._lock:
+            values = self._values
+            values[bucket] += 1
+            values[base + _SUM] += elapsed_ns
+
+    def snapshot(self) -> List[float]:
+        """A consistent copy of every counter"""
+        with self._lock:
+            return list(self._values)
+
+    def count(self, stage: str) -> int:
+        base = self._base[stage]
+        return int(sum(self.snapshot()[base:base + _SUM]))
+
+    @classmethod
+    def merged(cls, parts: Iterable["StageMetrics"]) -> "StageMetrics":
+        total = cls()
+        for part in parts:
+            values = part.snapshot()
+            for i in range(SIZE):
+                total._values[i] += values[i]
+        return total
+
+    def render(self, labels: str = "") -> str:
+        """Prometheus text exposition of every stage histogram"""
+        lines: List[str] = [
+            "# HELP match_stage_seconds Time spent in each stage of the match pipeline",
+            "# TYPE match_stage_seconds histogram",
+        ]
+        extra = f",{labels}" if labels else ""
+        values = self.snapshot()
+        for stage in STAGES:
+            base = self._base[stage]
+            cumulative = 0
+            for i, bound in enumerate(BUCKETS_NS):
+                cumulative += int(values[base + i])
+                lines.append(f'match_stage_seconds_bucket{{stage="{stage}"{extra},le="{bound / 1e9:g}"}} {cumulative}')
+            cumulative += int(values[base + len(BUCKETS_NS)])
+            lines.append(f'match_stage_seconds_bucket{{stage="{stage}"{extra},le="+Inf"}} {cumulative}')
+            lines.append(f'match_stage_seconds_sum{{stage="{stage}"{extra}}} {values[base + _SUM] / 1e9:.9f}')
+            lines.append(f'match_stage_seconds_count{{stage="{stage}"{extra}}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide metrics shared by the scorers, the geocoder and the handlers
+METRICS = StageMetrics()
+observe = METRICS.observe
+
+
+class RequestTimings:
+    """Microsecond breakdown of a single request, returned to clients that ask for it"""
+
+    def __init__(self):
+        self.started = perf_counter_ns()
+        self.stages: Dict[str, float] = {}
+        self.geocode: List[Dict[str, Any]] = []
+
+    def add(self, stage: str, elapsed_ns: int):
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ns / 1000
+
+    def address(self, address: str, cache_hit: bool, source: str, elapsed_ns: int):
+        self.geocode.append({"address": address, "cache_hit": cache_hit, "source": source, "us": elapsed_ns / 1000})
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The breakdown so far; total_us runs from creation to now"""
+        return {
+            "total_us": (perf_counter_ns() - self.started) / 1000,
+            "stages_us": dict(self.stages),
+            "geocode": list(self.geocode),
+        }
+
+
+def observe_components(started: int, interest_done: int, age_done: int, location_done: int, preference_done: int,
+                       timings: Optional[RequestTimings] = None):
+    """Record the four score components from consecutive perf_counter_ns() readings"""
+    components = (
+        ("score_interest", interest_done - started),
+        ("score_age", age_done - interest_done),
+        ("score_location", location_done - age_done),
+        ("score_preference", preference_done - location_done),
+    )
+    for stage, elapsed_ns in components:
+        observe(stage, elapsed_ns)
+        if timings is not None:
+            timings.add(stage, elapsed_ns)
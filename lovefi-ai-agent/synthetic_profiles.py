@@ -0,0 +1,52 @@
+"""
+Synthetic profiles in the server/data/profiles/*.json format, for benchmarks and batch-job dry runs.
+"""
+
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator
+
+INTERESTS = [
+    "music", "art", "reading", "hiking", "cooking", "travel", "movies", "photography",
+    "gaming", "coding", "fitness", "dancing", "golf", "wine tasting", "blockchain", "yoga",
+    "running", "cycling", "theatre", "podcasts", "gardening", "surfing", "climbing", "chess",
+]
+PREFERENCE_OPTIONS = [
+    ("Lifestyle", ["🏠 Homebody (NYC)", "🌍 Digital Nomad (Homeless)"]),
+    ("Blockchain", ["EVM Compatible L1 Maxi", "ETH L2"]),
+    ("Investment", ["💎 ETH (steady & loyal)", "🚀 Alts (fun & whimsical)"]),
+    ("Community", ["The Hodlers 🟧", "The Builders 🛠️", "The Vibers 🐸"]),
+]
+
+# Profiles are spread uniformly over this box so candidate density stays
+# realistic as the corpus grows
+LAT_RANGE = (30.0, 55.0)
+LON_RANGE = (-125.0, -70.0)
+GENDERS = ["woman", "man", "non-binary", "other"]
+SEXUALITIES = ["straight", "straight", "straight", "gay", "lesbian", "other"]
+
+
+def make_synthetic_profiles(count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for i in range(count):
+        lat = rng.uniform(*LAT_RANGE)
+        lon = rng.uniform(*LON_RANGE)
+        birthday = date(1970, 1, 1) + timedelta(days=rng.randrange(0, 365 * 35))
+        yield {
+            "id": f"user_synthetic_{i}",
+            "personalInfo": {"firstName": f"User{i}", "lastName": "Synthetic", "birthday": birthday.isoformat()},
+            "gender": {"selection": rng.choice(GENDERS)},
+            "sexuality": {"selection": rng.choice(SEXUALITIES), "customSexuality": ""},
+            "location": {
+                "fullAddress": f"{lat:.4f}, {lon:.4f}",
+                "latitude": lat,
+                "longitude": lon,
+                "searchRadius": rng.choice([5, 10, 25, 50]),
+            },
+            "personalInterests": rng.sample(INTERESTS, rng.randint(2, 6)),
+            "partnerPreferences": [
+                {"category": category, "selectedOption": rng.choice(options)}
+                for category, options in PREFERENCE_OPTIONS
+            ],
+            "version": "2.0",
+        }
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+"""
+Tests for admission control: bounded concurrency, bounded queue and fast rejection
+"""
+
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(__file__))
+from admission import AdmissionLane, Overloaded, rejection
+
+
+async def hold(lane: AdmissionLane, release: asyncio.Event):
+    async with lane:
+        await release.wait()
+
+
+def test_full_queue_is_rejected_immediately():
+    """Past max_concurrent running and max_queue waiting, requests fail fast"""
+    async def scenario():
+        lane = AdmissionLane("interactive", max_concurrent=1, max_queue=1, max_wait=5.0)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(lane, release))
+        waiting = asyncio.create_task(hold(lane, release))
+        await asyncio.sleep(0)
+        assert (lane.in_flight, lane.queued) == (1, 1)
+        try:
+            async with lane:
+                raise AssertionError("admitted past the queue bound")
+        except Overloaded as err:
+            assert "queue full" in str(err)
+            assert rejection.get() is err
+        release.set()
+        await asyncio.gather(running, waiting)
+        assert lane.stats()["admitted"] == 2 and lane.rejected_full == 1
+        assert (lane.in_flight, lane.queued) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_queued_request_gives_up_after_max_wait():
+    """A queued request is rejected once it has waited max_wait seconds"""
+    async def scenario():
+        lane = AdmissionLane("batch", max_concurrent=1, max_queue=4, max_wait=0.01)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(lane, release))
+        await asyncio.sleep(0)
+        try:
+            async with lane:
+                raise AssertionError("admitted while the lane was busy")
+        except Overloaded:
+            pass
+        assert lane.rejected_timeout == 1 and lane.queued == 0
+        release.set()
+        await running
+
+    asyncio.run(scenario())
+
+
+def main():
+    """Run all tests"""
+    tests = [test_full_queue_is_rejected_immediately, test_queued_request_gives_up_after_max_wait]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
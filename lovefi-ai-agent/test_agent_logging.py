@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+"""
+Tests for sampled, truncated and queued hot-path logging
+"""
+
+import sys
+import os
+import io
+import logging
+
+sys.path.append(os.path.dirname(__file__))
+from agent_logging import SampledLog, Truncated, install_queue_logging, parse_rates
+
+
+class Payload:
+    """Counts how often it is rendered"""
+
+    renders = 0
+
+    def __str__(self):
+        Payload.renders += 1
+        return "x" * 1000
+
+
+def make_logger(name: str, level=logging.INFO):
+    stream = io.StringIO()
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(level)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    return logger, stream
+
+
+def test_rates_and_truncation():
+    """Payloads are cut to max_chars, numbers keep their format, and rate 0 drops everything"""
+    assert parse_rates("chat=0.1, match=2,bogus") == {"chat": 0.1, "match": 1.0}
+    assert str(Truncated("abcdef", 3)) == "abc... (6 chars)"
+    logger, stream = make_logger("test_agent_logging.rates")
+    log = SampledLog({"chat": 0.0}, max_chars=10)
+    log.info(logger, "match", "Score for %s: %.1f (%d pairs)", "y" * 50, 87.25, 3)
+    for _ in range(5):
+        log.info(logger, "chat", "Got a message: %s", "hello")
+    assert stream.getvalue() == "Score for yyyyyyyyyy... (50 chars): 87.2 (3 pairs)\n"
+    assert log.stats()["dropped"] == {"chat": 5}
+
+
+def test_payload_not_rendered_below_level():
+    """Nothing is stringified when the level is disabled or the line is sampled out"""
+    Payload.renders = 0
+    logger, _ = make_logger("test_agent_logging.level", level=logging.WARNING)
+    SampledLog().info(logger, "chat", "Got a message: %s", Payload())
+    quiet, _ = make_logger("test_agent_logging.sampled")
+    SampledLog({"chat": 0.0}).info(quiet, "chat", "Got a message: %s", Payload())
+    assert Payload.renders == 0
+
+
+def test_queue_handler_formats_on_listener():
+    """Records go through the queue and are rendered by the listener thread"""
+    Payload.renders = 0
+    logger, stream = make_logger("test_agent_logging.queue")
+    listener = install_queue_logging(logger)
+    assert install_queue_logging(logger) is None
+    SampledLog(max_chars=5).info(logger, "chat", "Got a message: %s", Payload())
+    logger.warning("Scoring switched to %s mode", "reduced")
+    listener.stop()
+    assert stream.getvalue() == "Got a message: xxxxx... (1000 chars)\nScoring switched to reduced mode\n"
+    assert Payload.renders == 1
+
+
+def main():
+    """Run all tests"""
+    tests = [test_rates_and_truncation, test_payload_not_rendered_below_level, test_queue_handler_formats_on_listener]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
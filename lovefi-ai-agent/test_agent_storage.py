@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the write-behind session store used in place of ctx.storage
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(__file__))
+import agent_storage
+from agent_storage import SessionTable, WriteBehindStore
+
+
+def test_flushed_changes_survive_restart():
+    """Sets and removes are replayed from the log; unflushed changes are not"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.log")
+        store = WriteBehindStore(path)
+        store.set("session-1", "agent1alice")
+        store.set("session-2", "agent1bob")
+        store.remove("session-1")
+        assert store.flush() == 3
+        store.set("session-3", "agent1carol")
+
+        recovered = WriteBehindStore(path)
+        assert recovered.get("session-1") is None
+        assert recovered.get("session-2") == "agent1bob"
+        assert not recovered.has("session-3")
+
+
+def test_torn_last_line_is_dropped():
+    """A partial record from a crash mid-append is skipped and truncated away"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.log")
+        store = WriteBehindStore(path)
+        store.set("session-1", "agent1alice")
+        store.flush()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"k": "session-2", "v": "agent1b')
+
+        recovered = WriteBehindStore(path)
+        assert len(recovered) == 1
+        recovered.set("session-3", "agent1carol")
+        recovered.flush()
+        assert WriteBehindStore(path).get("session-3") == "agent1carol"
+
+
+def test_log_is_compacted_into_snapshot():
+    """Rewriting the same keys compacts the log once it dwarfs the live data"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.log")
+        store = WriteBehindStore(path)
+        for i in range(agent_storage.COMPACT_MIN_RECORDS):
+            store.set(f"session-{i % 10}", i)
+        store.flush()
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == '{"g": 1}\n'
+        assert os.path.isfile(store.snapshot_path)
+
+        recovered = WriteBehindStore(path)
+        assert len(recovered) == 10
+        assert recovered.get("session-9") == agent_storage.COMPACT_MIN_RECORDS - 1
+
+
+def test_stale_log_is_not_replayed_over_snapshot():
+    """A crash between writing the snapshot and resetting the log does not bring cleared keys back"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.log")
+        store = WriteBehindStore(path)
+        store.set("session-1", "agent1alice")
+        store.set("session-2", "agent1bob")
+        store.flush()
+        with open(path, encoding="utf-8") as f:
+            old_log = f.read()
+        store.clear()
+        store.set("session-3", "agent1carol")
+        store.flush()
+        # As if the crash came right after the snapshot was replaced
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(old_log)
+        recovered = WriteBehindStore(path)
+        assert len(recovered) == 0
+        recovered.set("session-4", "agent1dave")
+        recovered.flush()
+        assert list(WriteBehindStore(path).keys()) == ["session-4"]
+
+        # A header torn while the log was being reset
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"g"')
+        assert len(WriteBehindStore(path)) == 0
+
+
+def test_flush_async_keeps_order():
+    """Batches flushed from concurrent tasks are written in the order they were queued"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.log")
+        store = WriteBehindStore(path)
+
+        async def scenario():
+            store.set("session-1", "first")
+            first = asyncio.create_task(store.flush_async())
+            await asyncio.sleep(0)
+            store.set("session-1", "second")
+            return await asyncio.gather(first, store.flush_async())
+
+        assert asyncio.run(scenario()) == [1, 1]
+        assert WriteBehindStore(path).get("session-1") == "second"
+
+
+def test_compact_during_flush_async():
+    """A batch still in flight when compact() runs is neither replayed over the snapshot nor lost"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.log")
+        store = WriteBehindStore(path)
+        store.set("session-1", "agent1alice")
+        # flush_async() has taken its batch, but its worker thread has not run yet
+        generation, pending = store._take_batch()
+        store.remove("session-1")
+        store.compact()
+        store._write(generation, pending)
+        assert len(WriteBehindStore(path)) == 0
+
+        # A snapshot taken for compaction but not yet written goes to disk before later records
+        store.set("session-2", "agent1bob")
+        store._next_snapshot()
+        store.set("session-3", "agent1carol")
+        store.flush()
+        assert sorted(WriteBehindStore(path).keys()) == ["session-2", "session-3"]
+
+
+def test_sessions_expire_and_are_swept():
+    """Expired sessions have no sender and are removed in bulk, also after a restart"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.log")
+        store = WriteBehindStore(path)
+        sessions = SessionTable(store, ttl=60.0)
+        sessions.open("session-1", "agent1alice")
+        sessions.open("session-2", "agent1bob")
+        store.flush()
+
+        recovered = SessionTable(WriteBehindStore(path), ttl=60.0)
+        assert recovered.sender("session-2") == "agent1bob"
+        assert recovered.sweep(now=time.time() + 61) == 2
+        assert recovered.sender("session-1") is None
+        assert len(recovered) == 0 and len(recovered.store) == 0
+
+
+def test_sessions_are_limited_per_sender():
+    """Opening more than max_per_sender sessions evicts that sender's oldest"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sessions = SessionTable(WriteBehindStore(os.path.join(tmp, "sessions.log")), max_per_sender=2)
+        sessions.open("session-1", "agent1alice")
+        sessions.open("session-2", "agent1bob")
+        sessions.open("session-3", "agent1alice")
+        assert sessions.open("session-4", "agent1alice") == ["session-1"]
+        assert sessions.sender("session-1") is None
+        assert sessions.sender("session-2") == "agent1bob"
+        sessions.close("session-3")
+        assert sessions.stats()["live_sessions"] == 2
+
+
+def main():
+    """Run all tests"""
+    tests = [test_flushed_changes_survive_restart, test_torn_last_line_is_dropped, test_log_is_compacted_into_snapshot,
+             test_stale_log_is_not_replayed_over_snapshot, test_flush_async_keeps_order,
+             test_compact_during_flush_async, test_sessions_expire_and_are_swept, test_sessions_are_limited_per_sender]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
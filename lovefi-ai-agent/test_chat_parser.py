@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the local chat fast-path parser
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+from chat_parser import STAGE_GRAMMAR, STAGE_JSON, parse_match_text
+
+
+def test_full_match_request_json():
+    """A pasted MatchRequest is used as-is"""
+    with open(os.path.join(os.path.dirname(__file__), "match_request.json")) as f:
+        stage, data = parse_match_text(f.read())
+    assert stage == STAGE_JSON
+    assert data["personal_info1"]["first_name"] == "Daniel"
+
+
+def test_flat_json_and_code_fence():
+    """Flat name1/location1 JSON, optionally fenced, is expanded"""
+    text = '```json\n{"name1": "Alice Smith", "location1": "New York", "name2": "Bob", "location2": "Boston"}\n```'
+    stage, data = parse_match_text(text)
+    assert stage == STAGE_JSON
+    assert data["personal_info1"] == {"first_name": "Alice", "last_name": "Smith", "birthday": ""}
+    assert data["location2"] == {"address": "Boston", "search_radius": 10}
+
+
+def test_key_value_form():
+    """Common 'key: value' phrasings parse without the LLM"""
+    text = """Person 1 name: Alice Smith
+age1: 25
+location1: New York
+interests1: reading, hiking and cooking
+Name 2: Bob Jones
+birthday2: 1998-04-02
+Location 2 = Brooklyn, NY
+radius2: 25"""
+    stage, data = parse_match_text(text)
+    assert stage == STAGE_GRAMMAR
+    assert data["personal_interests1"] == ["reading", "hiking", "cooking"]
+    assert data["personal_info1"]["birthday"]
+    assert data["location2"] == {"address": "Brooklyn, NY", "search_radius": 25}
+
+
+def test_free_text_falls_back():
+    """Free text is left for the LLM"""
+    assert parse_match_text("Would Alice from NYC get on with Bob from Boston?") == (None, None)
+    assert parse_match_text("name1: Alice\nlocation1: NYC") == (None, None)
+
+
+def test_malformed_json_fields_fall_back():
+    """Well-formed JSON with a blank name or non-string interests is left for the LLM"""
+    blank_name = '{"name1": " ", "location1": "New York", "name2": "Bob", "location2": "Boston"}'
+    assert parse_match_text(blank_name) == (None, None)
+    bad_interests = '{"name1": "Alice", "location1": "New York", "interests1": 5, "name2": "Bob", "location2": "Boston"}'
+    assert parse_match_text(bad_interests) == (None, None)
+    mixed_interests = bad_interests.replace('"interests1": 5', '"interests1": ["hiking", 3]')
+    assert parse_match_text(mixed_interests) == (None, None)
+
+
+def test_out_of_range_numbers_fall_back():
+    """Huge or infinite ages are left for the LLM; an infinite radius falls back to the default"""
+    form = "name1: Alice\nlocation1: NYC\nname2: Bob\nlocation2: Boston\n"
+    assert parse_match_text(form + "age1: 99999999999999999999999") == (None, None)
+    assert parse_match_text(form + "age1: 151") == (None, None)
+    assert parse_match_text(form + "age1: -3") == (None, None)
+    flat = '{"name1": "Alice", "location1": "NYC", "name2": "Bob", "location2": "Boston", %s}'
+    assert parse_match_text(flat % '"age1": Infinity') == (None, None)
+    assert parse_match_text(flat % '"age1": 1e400') == (None, None)
+    stage, data = parse_match_text(flat % '"radius1": Infinity')
+    assert stage == STAGE_JSON and data["location1"]["search_radius"] == 10
+
+
+def main():
+    """Run all tests"""
+    tests = [test_full_match_request_json, test_flat_json_and_code_fence, test_key_value_form, test_free_text_falls_back,
+             test_malformed_json_fields_fall_back, test_out_of_range_numbers_fall_back]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the TTL dedup cache used by the chat and protocol handlers
+"""
+
+import sys
+import os
+import asyncio
+import logging
+import time
+import uuid
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(__file__))
+import dating_match_agent
+from dedup_cache import MISSING, TTLCache
+
+
+def test_seen_without_reply_is_distinct_from_missing():
+    """A msg_id marked as seen returns None, an unknown one returns MISSING"""
+    cache = TTLCache()
+    cache.put("msg-1")
+    assert cache.get("msg-1") is None
+    assert cache.get("msg-2") is MISSING
+
+
+def test_entries_expire_and_are_bounded():
+    """Entries disappear after the TTL and the oldest go first when full"""
+    cache = TTLCache(max_entries=2, ttl=0.05)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("c", 3)
+    assert cache.get("a") is MISSING
+    assert cache.get("c") == 3
+    time.sleep(0.06)
+    assert cache.get("c") is MISSING
+    assert len(cache) == 0
+
+
+class RecordingContext:
+    """Stands in for a uagents Context and records what the handler sends"""
+
+    def __init__(self):
+        self.session = uuid.uuid4()
+        self.logger = logging.getLogger("test_dedup_cache")
+        self.texts = []
+
+    async def send(self, destination, message):
+        self.texts.append(message.content[0].text)
+
+    async def send_raw(self, destination, message_schema_digest, message_body, **kwargs):
+        if '"text"' in message_body:
+            self.texts.append(dating_match_agent.ChatMessage.parse_raw(message_body).content[0].text)
+
+
+class FakeScore:
+    score = 80.0
+
+    def details(self):
+        return ""
+
+
+def test_failed_chat_delivery_is_retried():
+    """A chat message whose scoring failed is scored again when the transport retries it"""
+    with open(os.path.join(os.path.dirname(__file__), "match_request.json")) as f:
+        message = dating_match_agent.create_text_chat(f.read())
+    outcomes = [RuntimeError("geocoder down"), FakeScore()]
+
+    def scorer(*args, **kwargs):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    ctx = RecordingContext()
+    with patch.object(dating_match_agent, "calculate_match_score_internal", scorer):
+        asyncio.run(dating_match_agent.handle_message(ctx, "agent1user", message))
+        assert dating_match_agent.chat_dedup.get(message.msg_id) is MISSING
+        asyncio.run(dating_match_agent.handle_message(ctx, "agent1user", message))
+    assert ctx.texts[0].startswith("Sorry, I couldn't process")
+    assert ctx.texts[1].startswith("Match Score for")
+    assert dating_match_agent.chat_dedup.get(message.msg_id) is not MISSING
+
+
+def test_escaped_exception_frees_the_reservation():
+    """An exception out of handle_message leaves the msg_id free for a retry"""
+    with open(os.path.join(os.path.dirname(__file__), "match_request.json")) as f:
+        message = dating_match_agent.create_text_chat(f.read())
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("send failed")
+
+    with patch.object(dating_match_agent, "send_match_score", broken):
+        try:
+            asyncio.run(dating_match_agent.handle_message(RecordingContext(), "agent1user", message))
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("expected the handler to re-raise")
+    assert dating_match_agent.chat_dedup.get(message.msg_id) is MISSING
+
+
+def main():
+    """Run all tests"""
+    tests = [test_seen_without_reply_is_distinct_from_missing, test_entries_expire_and_are_bounded,
+             test_failed_chat_delivery_is_retried, test_escaped_exception_frees_the_reservation]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+"""
+Tests for latency-budgeted geocoding and its fallback tiers
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(__file__))
+from geocode_budget import BudgetedGeocoder, Deadline, locate_pair
+from geocode_cache import GeocodeCache
+
+
+def slow_lookup(release: threading.Event):
+    def lookup(address):
+        release.wait(5.0)
+        return (1.0, 2.0) if address.startswith("Known") else (None, None)
+    return lookup
+
+
+def test_slow_geocoder_falls_back_within_budget():
+    """A lookup slower than the budget is abandoned for the gazetteer, then cached for next time"""
+    release = threading.Event()
+    with tempfile.TemporaryDirectory() as tmp:
+        geocoder = BudgetedGeocoder(slow_lookup(release), GeocodeCache(os.path.join(tmp, "geocode.sqlite3")))
+        deadline = Deadline(50)
+        start = time.monotonic()
+        first, second, tier = locate_pair("Boston, MA", "Known Street, Boston", geocoder, deadline)
+        assert time.monotonic() - start < 1.0
+        assert tier == deadline.tier == "gazetteer" and first == second
+
+        release.set()
+        geocoder._start("Known Street, Boston").result()
+        assert geocoder.locate("Known Street, Boston", "Known Street, Boston", Deadline(50))[2] == "cache"
+
+
+def test_lower_tiers():
+    """Unknown places compare address strings; a missing address scores neutral"""
+    release = threading.Event()
+    release.set()
+    geocoder = BudgetedGeocoder(slow_lookup(release))
+    assert geocoder.locate("Known A", "Known B", Deadline())[2] == "geocoder"
+    assert geocoder.locate("Known A", "Paris, France", Deadline())[2] == "gazetteer"
+    assert geocoder.locate("Atlantis", "Paris", Deadline())[2] == "similarity"
+    assert geocoder.locate("", "Paris", Deadline())[2] == "neutral"
+    assert geocoder.tiers["similarity"] == 1
+
+
+def main():
+    """Run all tests"""
+    tests = [test_slow_geocoder_falls_back_within_budget, test_lower_tiers]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
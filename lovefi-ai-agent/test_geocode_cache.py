@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the on-disk geocode cache shared by the REST worker processes
+"""
+
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.dirname(__file__))
+from dedup_cache import MISSING
+from geocode_cache import GeocodeCache
+
+
+def test_lookups_are_shared_through_disk():
+    """A second cache on the same file (another worker) sees stored coordinates"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "geocode.sqlite3")
+        writer = GeocodeCache(path)
+        assert writer.get("New York") is MISSING
+        writer.put("New York", (40.71, -74.0))
+        reader = GeocodeCache(path)
+        assert reader.get("New York") == (40.71, -74.0)
+        assert reader.hits == 1 and writer.misses == 1
+        assert len(reader) == 1
+
+
+def test_failed_lookups_expire():
+    """A failed lookup is cached as (None, None) until the negative TTL passes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "geocode.sqlite3")
+        cache = GeocodeCache(path)
+        cache.put("Atlantis", (None, None))
+        assert cache.get("Atlantis") == (None, None)
+        assert GeocodeCache(path, negative_ttl=0.0).get("Atlantis") is MISSING
+
+
+def test_default_path_ignores_working_directory():
+    """Without a path the cache uses LOVEFI_GEOCODE_CACHE, else a file next to the module"""
+    with tempfile.TemporaryDirectory() as tmp:
+        previous = os.environ.pop("LOVEFI_GEOCODE_CACHE", None)
+        cwd = os.getcwd()
+        try:
+            os.chdir(tmp)
+            default = GeocodeCache().path
+            assert os.path.isabs(default) and os.path.dirname(default) == os.path.dirname(os.path.abspath(__file__))
+            os.environ["LOVEFI_GEOCODE_CACHE"] = os.path.join(tmp, "custom.sqlite3")
+            cache = GeocodeCache()
+            cache.put("Paris", (48.8566, 2.3522))
+            assert os.listdir(tmp) and all(name.startswith("custom.sqlite3") for name in os.listdir(tmp))
+        finally:
+            os.chdir(cwd)
+            if previous is None:
+                os.environ.pop("LOVEFI_GEOCODE_CACHE", None)
+            else:
+                os.environ["LOVEFI_GEOCODE_CACHE"] = previous
+
+
+def main():
+    """Run all tests"""
+    tests = [test_lookups_are_shared_through_disk, test_failed_lookups_expire, test_default_path_ignores_working_directory]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
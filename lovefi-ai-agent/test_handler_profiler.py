@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the sampled handler profiler
+"""
+
+import sys
+import os
+import asyncio
+import cProfile
+import tempfile
+import threading
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(__file__))
+from handler_profiler import HandlerProfiler
+
+
+def busy_scoring(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+def test_sampled_calls_are_written_and_rotated():
+    """Every sampled call writes one profile; only the newest keep files remain"""
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = HandlerProfiler(rate=0.0, directory=tmp, keep=3)
+        assert profiler.call(busy_scoring, 10) == 285
+        assert profiler.files() == []
+
+        profiler.rate = 1.0
+        for _ in range(5):
+            assert profiler.call(busy_scoring, 1000) == 332833500
+        assert profiler.written == 5 and len(profiler.files()) == 3
+        assert all(path.endswith("-busy_scoring.prof") for path in profiler.files())
+
+
+def test_report_aggregates_top_functions():
+    """The report covers the kept profiles and lists the profiled function"""
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = HandlerProfiler(rate=1.0, directory=tmp)
+        for _ in range(2):
+            profiler.call(busy_scoring, 20000)
+
+        async def reply():
+            async with profiler.section("send"):
+                await asyncio.sleep(0)
+
+        asyncio.run(reply())
+        report = profiler.report()
+        assert report["profiles"] == 3
+        top = {row["function"]: row for row in report["functions"]}
+        scoring = next(row for name, row in top.items() if "(busy_scoring)" in name)
+        assert scoring["calls"] == 2 and scoring["cumulative_ms"] > 0
+        assert HandlerProfiler(directory=os.path.join(tmp, "missing")).report() == {"profiles": 0, "functions": []}
+
+
+def test_failed_enable_does_not_block_the_thread():
+    """A profile that cannot be enabled is skipped, and the thread is still sampled afterwards"""
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = HandlerProfiler(rate=1.0, directory=tmp)
+        with patch.object(cProfile.Profile, "enable", side_effect=ValueError("Another profiling tool is already active")):
+            assert profiler.call(busy_scoring, 10) == 285
+        assert profiler.sampled == 0 and profiler.files() == []
+        profiler.call(busy_scoring, 10)
+        assert profiler.sampled == 1 and len(profiler.files()) == 1
+
+
+def test_section_writes_off_the_event_loop():
+    """The profile of a section is dumped from a worker thread, not the loop thread"""
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = HandlerProfiler(rate=1.0, directory=tmp)
+        writers = []
+        write = profiler._write
+
+        def recording_write(profile, name):
+            writers.append(threading.get_ident())
+            write(profile, name)
+
+        profiler._write = recording_write
+
+        async def reply():
+            async with profiler.section("send"):
+                await asyncio.sleep(0)
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(reply())
+        assert len(writers) == 1 and writers[0] != loop_thread
+        assert len(profiler.files()) == 1
+
+
+
+def test_default_directory_ignores_working_directory():
+    """Without LOVEFI_PROFILE_DIR profiles go next to the module, else to the configured directory"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("LOVEFI_PROFILE_DIR", None)
+            cwd = os.getcwd()
+            try:
+                os.chdir(tmp)
+                directory = HandlerProfiler.from_env().directory
+            finally:
+                os.chdir(cwd)
+            assert directory == os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+            os.environ["LOVEFI_PROFILE_DIR"] = tmp
+            assert HandlerProfiler.from_env().directory == tmp
+
+def main():
+    """Run all tests"""
+    tests = [test_sampled_calls_are_written_and_rotated, test_report_aggregates_top_functions,
+             test_failed_enable_does_not_block_the_thread, test_section_writes_off_the_event_loop,
+             test_default_directory_ignores_working_directory]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the load-adaptive scoring mode and its hysteresis
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+from admission import AdmissionLane
+from geocode_budget import BudgetedGeocoder
+from load_control import LoadController
+
+
+def test_mode_switches_with_hysteresis():
+    """Enter reduced mode past a threshold, leave only after calm_samples quiet samples"""
+    lane = AdmissionLane("interactive", max_concurrent=1, max_queue=32, max_wait=1.0)
+    controller = LoadController([lane], calm_samples=3)
+    assert controller.observe(0.01, now=0.0) is None
+    assert controller.observe(0.3, now=1.0) == "reduced"
+    assert controller.deadline().reduced
+
+    # Below the enter threshold but above the exit threshold keeps reduced mode
+    assert controller.observe(0.1, now=2.0) is None
+    lane.queued = 20
+    assert [controller.observe(0.0, now=3.0 + i) for i in range(3)] == [None, None, None]
+    lane.queued = 0
+    assert [controller.observe(0.0, now=6.0 + i) for i in range(3)] == [None, None, "full"]
+    assert not controller.deadline().reduced
+
+    stats = controller.stats(now=10.0)
+    assert stats["entered_reduced"] == 1 and stats["exited_reduced"] == 1
+    assert stats["reduced_seconds"] == 7.0 and stats["mode"] == "full"
+
+    lane.queued = 16
+    assert controller.observe(0.0, now=11.0) == "reduced"
+
+
+def test_reduced_deadline_skips_lookups_and_similarity():
+    """Reduced mode never calls the geocoder and scores unknown places as neutral"""
+    calls = []
+    geocoder = BudgetedGeocoder(lambda address: calls.append(address) or (1.0, 2.0))
+    controller = LoadController([])
+    controller.observe(1.0)
+    assert geocoder.locate("Boston", "Paris", controller.deadline())[2] == "gazetteer"
+    assert geocoder.locate("Atlantis", "Paris", controller.deadline())[2] == "neutral"
+    assert calls == []
+
+
+def main():
+    """Run all tests"""
+    tests = [test_mode_switches_with_hysteresis, test_reduced_deadline_skips_lookups_and_similarity]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
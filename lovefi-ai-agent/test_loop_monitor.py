@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the event-loop lag monitor
+"""
+
+import sys
+import os
+import asyncio
+import threading
+
+sys.path.append(os.path.dirname(__file__))
+from loop_monitor import LoopMonitor
+
+
+def test_blocking_handler_is_caught():
+    """A handler that blocks the loop is reported with its name, stack and the lag it caused"""
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    entered = threading.Event()
+    release = threading.Event()
+
+    async def handle_slow_request():
+        entered.set()
+        # Blocks the loop thread until the test has inspected it
+        release.wait()
+
+    async def scenario():
+        heartbeat = asyncio.create_task(monitor.heartbeat())
+        await asyncio.sleep(0.05)
+        # Dispatched as its own task, the way uagents runs handlers
+        await asyncio.create_task(handle_slow_request())
+        await asyncio.sleep(0.05)
+        heartbeat.cancel()
+
+    loop_thread = threading.Thread(target=asyncio.run, args=(scenario(),))
+    loop_thread.start()
+    try:
+        assert entered.wait(5)
+        # Checked directly instead of by the watchdog thread, with a clock well past the threshold
+        stall = monitor.check(now=monitor._beat + 1.0)
+        assert monitor.check(now=monitor._beat + 2.0) is None
+    finally:
+        release.set()
+        loop_thread.join(5)
+    assert stall is not None and monitor.stall_count == 1 and list(monitor.stalls) == [stall]
+    assert stall["handler"] == "test_loop_monitor.py:handle_slow_request"
+    assert any("in handle_slow_request" in frame for frame in stall["stack"])
+    assert stall["blocked_ms"] == 990.0 and stall["lag_ms"] is not None
+
+    stats = monitor.stats()
+    assert stats["stalls"] == 1 and stats["samples"] > 1
+    assert stats["max_ms"] >= stall["lag_ms"]
+
+
+def test_watchdog_stops_with_heartbeat():
+    """stop() and the end of the heartbeat task both end the watchdog thread"""
+    for explicit in (True, False):
+        monitor = LoopMonitor(interval=0.01)
+
+        async def scenario():
+            monitor.start()
+            await asyncio.sleep(0.02)
+            watchdog = monitor._watchdog
+            assert watchdog.is_alive()
+            if explicit:
+                monitor.stop()
+                assert not watchdog.is_alive()
+            return watchdog
+
+        watchdog = asyncio.run(scenario())
+        watchdog.join(1)
+        assert not watchdog.is_alive() and monitor._watchdog is None
+
+
+def test_quiet_loop_has_no_stalls():
+    """Short awaits never cross the threshold"""
+    monitor = LoopMonitor(interval=0.01, threshold=0.1)
+
+    async def scenario():
+        monitor.start()
+        for _ in range(10):
+            await asyncio.sleep(0.005)
+
+    asyncio.run(scenario())
+    assert monitor.stall_count == 0 and monitor.stats()["samples"] > 0
+
+
+def main():
+    """Run all tests"""
+    tests = [test_blocking_handler_is_caught, test_watchdog_stops_with_heartbeat, test_quiet_loop_has_no_stalls]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""
+Tests for batched MatchRequest scoring and envelope chunking
+"""
+
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(__file__))
+from dating_match_agent import Location, MatchBatchItem, MatchBatchResult, MatchRequest, PersonalInfo, score_match_request
+from match_batch import INCOMPATIBLE_PAIR, chunk_by_size, score_batch, score_batch_items
+from match_score import MatchScore, batch_details
+
+
+def make_request(name1: str, location1: str, name2: str, location2: str) -> MatchRequest:
+    return MatchRequest(
+        personal_info1=PersonalInfo(first_name=name1, last_name=""),
+        gender1="not_specified",
+        location1=Location(address=location1),
+        personal_interests1=["hiking"],
+        partner_preferences1=[],
+        personal_info2=PersonalInfo(first_name=name2, last_name=""),
+        gender2="not_specified",
+        location2=Location(address=location2),
+        personal_interests2=["hiking"],
+        partner_preferences2=[],
+    )
+
+
+def test_batch_shares_geocode_lookups():
+    """Each distinct address is geocoded once and results keep request order"""
+    lookups = []
+
+    def geocode(address):
+        lookups.append(address)
+        return {"New York": (40.71, -74.0), "Brooklyn": (40.68, -73.94)}.get(address, (None, None))
+
+    requests = [
+        make_request("Alice", "New York", "Bob", "Brooklyn"),
+        make_request("Carol", "New York", "Dan", "New York"),
+        make_request("Eve", "Brooklyn", "Frank", "New York"),
+    ]
+    scores = asyncio.run(score_batch(requests, score_match_request, geocode, workers=2))
+    assert sorted(lookups) == ["Brooklyn", "New York"]
+    assert [s.score for s in scores] == [score_match_request(r, geocode).score for r in requests]
+    assert scores[1].distance == 0.0 and "Distance: 0.0 km" in scores[1].details()
+
+
+def test_failing_pair_does_not_fail_batch():
+    """A pair that raises gets a zero score and an error message"""
+    def score(request, geocode):
+        if request.personal_info1.first_name == "Bad":
+            raise ValueError("broken pair")
+        return 50.0, "ok"
+
+    requests = [make_request("Bad", "A", "B", "C"), make_request("Good", "A", "B", "C")]
+    scores = asyncio.run(score_batch(requests, score, lambda address: (None, None)))
+    assert scores[0].score == 0.0 and scores[0].details() == "Error processing match request: broken pair"
+    assert scores[1] == (50.0, "ok")
+
+
+def test_incompatible_items_are_not_scored():
+    """Pairs ruled out by gender and sexuality get a failed score without geocoding; others are scored"""
+    lookups = []
+
+    def geocode(address):
+        lookups.append(address)
+        return (None, None)
+
+    straight_men = make_request("Al", "Paris", "Bo", "Lyon").copy(update={"gender1": "man", "gender2": "man"})
+    straight_couple = make_request("Cy", "Oslo", "Di", "Oslo").copy(update={"gender1": "man", "gender2": "woman"})
+    items = [
+        MatchBatchItem(correlation_id="1", request=straight_men, sexuality1="straight", sexuality2="straight"),
+        MatchBatchItem(correlation_id="2", request=straight_couple, sexuality1="straight", sexuality2="straight"),
+        MatchBatchItem(correlation_id="3", request=straight_men),
+    ]
+    scores = asyncio.run(score_batch_items(items, score_match_request, geocode))
+    assert scores[0].score == 0.0 and scores[0].details() == INCOMPATIBLE_PAIR
+    assert scores[1].score > 0 and scores[2].score > 0
+    assert sorted(set(lookups)) == ["Lyon", "Oslo", "Paris"]
+    assert asyncio.run(score_batch_items(items[:1], score_match_request, geocode))[0].details() == INCOMPATIBLE_PAIR
+
+
+def test_chunks_stay_under_size_limit():
+    """Thousands of pairs are split into envelopes under the byte budget, in order"""
+    items = [
+        MatchBatchItem(correlation_id=str(i), request=make_request("Alice", "New York", "Bob", "Brooklyn"))
+        for i in range(2000)
+    ]
+    chunks = chunk_by_size(items, max_bytes=64 * 1024)
+    assert len(chunks) > 1
+    assert [item.correlation_id for chunk in chunks for item in chunk] == [str(i) for i in range(2000)]
+    for chunk in chunks:
+        assert sum(len(item.model_dump_json()) + 1 for item in chunk) <= 64 * 1024
+    assert chunk_by_size([]) == [[]]
+    assert len(chunk_by_size([MatchBatchResult(correlation_id="1", score=1.0, details="")])) == 1
+
+
+def test_details_rendered_only_on_request():
+    """Component scores are kept structured; the details string is built by details()"""
+    result = score_match_request(make_request("Alice", "New York", "Bob", "New York"), lambda address: (40.71, -74.0))
+    assert (result.interest_score, result.age_score, result.location_score, result.preference_score) == (40.0, 10, 20.0, 0)
+    assert result.score == 70.0 and result.common_interests == {"hiking"} and result.total_preferences == 0
+    assert batch_details(result, with_details=False) == ""
+    assert batch_details(result, with_details=True) == result.details()
+    assert result.details().startswith("Interest compatibility: 40.0/40 (Common interests: hiking); Age compatibility")
+    assert batch_details(MatchScore.failed("Error: boom"), with_details=False) == "Error: boom"
+
+
+def main():
+    """Run all tests"""
+    tests = [test_batch_shares_geocode_lookups, test_failing_pair_does_not_fail_batch, test_incompatible_items_are_not_scored,
+             test_chunks_stay_under_size_limit,
+             test_details_rendered_only_on_request]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the compiled-profile match engine (no agent or network required)
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+from match_index import AgeIndex, intersect_sorted
+from minhash_lsh import MinHashLSH
+from match_engine import (
+    DEFAULT_MAX_AGE_DIFF, GENDER_ANY, GENDER_MAN, GENDER_WOMAN, ProfileIndex,
+    birth_ordinal, encode_gender, encode_seeking, mutually_compatible,
+)
+
+
+def make_profile(pid, gender, sexuality, interests=("music", "art"), lat=49.24, lon=-122.97, birthday="1995-05-15"):
+    return {
+        "id": pid,
+        "personalInfo": {"firstName": pid, "lastName": "", "birthday": birthday},
+        "gender": {"selection": gender},
+        "sexuality": {"selection": sexuality},
+        "location": {"fullAddress": "Burnaby, BC, Canada", "latitude": lat, "longitude": lon, "searchRadius": 10},
+        "personalInterests": list(interests),
+        "partnerPreferences": [{"selectedOption": "🏠 Homebody (NYC)"}],
+    }
+
+
+def test_gender_masks():
+    """Seeking masks follow the selected sexuality"""
+    assert encode_gender("woman") == GENDER_WOMAN
+    assert encode_gender("") == GENDER_ANY
+    assert encode_seeking("woman", "straight") == GENDER_MAN
+    assert encode_seeking("man", "gay") == GENDER_MAN
+    assert encode_seeking("woman", "lesbian") == GENDER_WOMAN
+    assert encode_seeking("non-binary", "other") == GENDER_ANY
+    assert mutually_compatible(GENDER_WOMAN, GENDER_MAN, GENDER_MAN, GENDER_WOMAN)
+    assert not mutually_compatible(GENDER_WOMAN, GENDER_MAN, GENDER_MAN, GENDER_MAN)
+
+
+def test_top_k_skips_incompatible():
+    """Incompatible profiles never reach the scorer"""
+    index = ProfileIndex()
+    index.add(make_profile("alice", "woman", "straight"))
+    index.add(make_profile("bob", "man", "straight"))
+    index.add(make_profile("carol", "woman", "lesbian"))
+    index.add(make_profile("dave", "man", "gay"))
+
+    assert [key for key, _ in index.top_k("alice")] == ["bob"]
+    assert [key for key, _ in index.top_k("dave")] == []
+    assert index.score_batch([("alice", "bob"), ("alice", "carol")])[1] == 0.0
+
+
+def test_identical_profiles_score_high():
+    """Same interests, location, age and preferences gives a perfect score"""
+    index = ProfileIndex()
+    index.add(make_profile("alice", "woman", "straight"))
+    index.add(make_profile("bob", "man", "straight"))
+    [score] = index.score_batch([("alice", "bob")])
+    assert score == 100
+
+
+def test_null_max_age_diff_uses_default():
+    """A stored "maxAgeDiff": null falls back to the default instead of breaking the age window"""
+    index = ProfileIndex()
+    alice = make_profile("alice", "woman", "straight")
+    alice["maxAgeDiff"] = None
+    index.add(alice)
+    index.add(make_profile("bob", "man", "straight"))
+    assert index.get("alice").max_age_diff == DEFAULT_MAX_AGE_DIFF
+    assert [key for key, _ in index.top_k("alice")] == ["bob"]
+
+
+def test_age_window_and_merge():
+    """The age window is a binary search; stages combine by sorted-id merge"""
+    ages = AgeIndex()
+    for pid, birthday in enumerate(["1990-01-01", "1995-06-01", "2005-01-01", "1960-03-03"]):
+        ages.add(pid, birth_ordinal(birthday))
+    ages.add(4, None)
+    assert ages.window(birth_ordinal("1993-01-01"), 10) == [0, 1, 4]
+    assert intersect_sorted([0, 1, 4, 7], [1, 2, 4, 8]) == [1, 4]
+
+
+def test_top_k_prunes_by_age_and_distance():
+    """Candidates outside the age window or search grid are never scored"""
+    index = ProfileIndex()
+    index.add(make_profile("alice", "woman", "straight"))
+    index.add(make_profile("bob", "man", "straight"))
+    index.add(make_profile("carl", "man", "straight", birthday="1960-01-01"))
+    index.add(make_profile("dan", "man", "straight", lat=40.71, lon=-74.0))
+    index.add(make_profile("ed", "man", "straight", interests=("golf",)))
+    assert [key for key, _ in index.top_k("alice")] == ["bob"]
+
+
+def test_approximate_top_k_uses_lsh():
+    """Identical interest sets always collide; disjoint ones never do"""
+    index = ProfileIndex(lsh=MinHashLSH(bands=8, rows=2))
+    index.add(make_profile("alice", "woman", "straight"))
+    index.add(make_profile("bob", "man", "straight"))
+    index.add(make_profile("carl", "man", "straight", interests=("golf", "chess")))
+    assert [key for key, _ in index.top_k("alice", approximate=True)] == ["bob"]
+
+
+def test_reciprocal_top_k_reuses_cached_lists():
+    """A candidate who fits me but would rank me poorly drops in reciprocal mode"""
+    index = ProfileIndex()
+    index.add(make_profile("alice", "woman", "straight", interests=("music", "art")))
+    index.add(make_profile("bob", "man", "straight", interests=("music", "art")))
+    index.add(make_profile("carl", "man", "straight", interests=("music", "art", "golf", "chess", "yoga", "surfing")))
+    assert [key for key, _ in index.top_k("alice")] == ["bob", "carl"]
+
+    index.top_k("carl", reciprocal=True)
+    alice = index.get("alice")
+    assert (index.get("carl").pid, False) in index.candidate_cache
+    assert index.reverse_score(alice, index.get("carl")) < 100
+    [(best, score), (second, _)] = index.top_k("alice", reciprocal=True)
+    assert best == "bob" and score == 100
+    assert second == "carl"
+
+
+def test_reciprocal_top_k_ignores_cache_order():
+    """A candidate missing from the other side's cached list is scored, not counted as 0"""
+    def build():
+        index = ProfileIndex()
+        index.add(make_profile("alice", "woman", "straight", interests=()))
+        index.add(make_profile("carl", "man", "straight", interests=("golf", "chess")))
+        return index
+
+    cold = build().top_k("alice", reciprocal=True)
+    warm_index = build()
+    warm_index.top_k("carl", reciprocal=True)
+    assert (warm_index.get("carl").pid, False) in warm_index.candidate_cache
+    warm = warm_index.top_k("alice", reciprocal=True)
+    assert warm == cold and cold[0][0] == "carl" and cold[0][1] > 0
+
+
+def test_match_drop_pairs_each_user_once():
+    """Greedy matching takes the heaviest edges and never reuses a user"""
+    from match_drop import collect_edges, greedy_matching
+    edges = collect_edges([[(90.0, 0, 1), (80.0, 1, 2)], [(70.0, 2, 3), (90.0, 0, 1)]], max_edges=10)
+    assert len(edges) == 3
+    assert greedy_matching(edges) == [(90.0, 0, 1), (70.0, 2, 3)]
+    assert len(collect_edges([[(90.0, 0, 1), (80.0, 1, 2), (70.0, 2, 3)]], max_edges=2)) == 2
+
+
+def main():
+    """Run all tests"""
+    tests = [test_gender_masks, test_top_k_skips_incompatible, test_identical_profiles_score_high,
+             test_null_max_age_diff_uses_default, test_age_window_and_merge, test_top_k_prunes_by_age_and_distance,
+             test_approximate_top_k_uses_lsh, test_reciprocal_top_k_reuses_cached_lists,
+             test_reciprocal_top_k_ignores_cache_order,
+             test_match_drop_pairs_each_user_once]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+"""
+Tests for memory accounting of profiles, indexes and caches
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+from dedup_cache import TTLCache
+from match_engine import ProfileIndex
+from memory_stats import TracemallocDiff, deep_sizeof, rss_bytes
+from synthetic_profiles import make_synthetic_profiles
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    """Nested containers are walked, and objects already in seen are not counted again"""
+    shared = "x" * 1000
+    assert deep_sizeof([shared]) > 1000
+    seen = set()
+    first = deep_sizeof({"a": [shared]}, seen)
+    second = deep_sizeof({"b": [shared]}, seen)
+    assert first > 1000 > second
+
+
+def test_cache_footprint_scales_with_entries():
+    """Cache size is extrapolated from a sample of entries"""
+    cache = TTLCache(max_entries=5000)
+    for i in range(3000):
+        cache.put(f"message-{i}", "reply " * 20)
+    footprint = cache.footprint()
+    assert footprint["entries"] == 3000
+    assert footprint["bytes_per_entry"] > 100
+    assert footprint["bytes"] >= footprint["bytes_per_entry"] * 3000
+
+
+def test_index_footprint_per_structure():
+    """Every index structure reports its entry count and bytes per entry"""
+    index = ProfileIndex()
+    for profile in make_synthetic_profiles(200):
+        index.add(profile)
+    footprint = index.footprint()
+    structures = footprint["structures"]
+    assert structures["profiles"]["entries"] == 200 and structures["geo"]["entries"] == 200
+    assert structures["interests"]["entries"] == sum(len(p.interests) for p in index.profiles)
+    assert structures["profiles"]["bytes_per_entry"] > structures["ages"]["bytes_per_entry"] > 0
+    assert footprint["bytes"] == sum(structure["bytes"] for structure in structures.values())
+
+
+def test_tracemalloc_diff_reports_new_allocations():
+    """The second snapshot lists the line that allocated since the first"""
+    snapshots = TracemallocDiff()
+    try:
+        assert snapshots.snapshot()["top"] == []
+        hoard = [bytearray(1000) for _ in range(1000)]
+        top = snapshots.snapshot(limit=5)["top"]
+        assert any("test_memory_stats.py" in entry["location"] and entry["size_diff"] >= 1000000 for entry in top)
+        assert len(hoard) == 1000
+    finally:
+        assert snapshots.stop()["tracing"] is False
+    assert rss_bytes() > 0
+
+
+def main():
+    """Run all tests"""
+    tests = [test_deep_sizeof_counts_shared_objects_once, test_cache_footprint_scales_with_entries,
+             test_index_footprint_per_structure, test_tracemalloc_diff_reports_new_allocations]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the profile-reference cache and the requests parked on it
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+import profile_cache
+from dating_match_agent import Location, MatchProfile, PersonalInfo
+from profile_cache import PendingRefs, ProfileCache, profile_version
+
+
+def make_profile(address: str) -> MatchProfile:
+    return MatchProfile(
+        personal_info=PersonalInfo(first_name="Alice", last_name="Smith", birthday="1998-04-02"),
+        gender="female",
+        location=Location(address=address),
+        personal_interests=["hiking", "jazz"],
+        partner_preferences=[],
+    )
+
+
+def test_version_hash_tracks_profile_content():
+    """Equal profiles share a version, edited ones get a new one"""
+    assert profile_version(make_profile("New York")) == profile_version(make_profile("New York"))
+    assert profile_version(make_profile("New York")) != profile_version(make_profile("Brooklyn"))
+
+
+def test_cache_is_lru_and_version_checked():
+    """A stale version misses, and the least recently used profile is evicted"""
+    cache = ProfileCache(max_entries=2)
+    cache.put("alice", "v1", "alice-v1")
+    cache.put("bob", "v1", "bob-v1")
+    assert cache.get("alice", "v2") is None
+    assert cache.get("alice", "v1") == "alice-v1"
+    cache.put("carol", "v1", "carol-v1")
+    assert not cache.has("bob", "v1")
+    assert cache.has("alice", "v1")
+    cache.put("alice", "v2", "alice-v2")
+    assert cache.get("alice", "v1") is None
+    assert cache.get("alice", "v2") == "alice-v2"
+
+
+def test_missing_profile_is_fetched_once():
+    """Requests waiting on the same profile trigger one fetch and are released together"""
+    pending = PendingRefs()
+    assert pending.park("agent1caller", "r1", "request-1", [("alice", "v1")]) == [("alice", "v1")]
+    assert pending.park("agent1caller", "r2", "request-2", [("alice", "v1"), ("bob", "v1")]) == [("bob", "v1")]
+    assert len(pending) == 2
+    assert pending.take("agent1caller", [("alice", "v1")]) == ["request-1", "request-2"]
+    assert len(pending) == 0
+    # bob's upload is still outstanding, so parking again does not refetch it
+    assert pending.park("agent1caller", "r2", "request-2", [("bob", "v1")]) == []
+
+    profile_cache.FETCH_RETRY_SECONDS, retry = 0.0, profile_cache.FETCH_RETRY_SECONDS
+    try:
+        assert pending.park("agent1caller", "r2", "request-2", [("bob", "v1")]) == [("bob", "v1")]
+    finally:
+        profile_cache.FETCH_RETRY_SECONDS = retry
+
+
+def main():
+    """Run all tests"""
+    tests = [test_version_hash_tracks_profile_content, test_cache_is_lru_and_version_checked, test_missing_profile_is_fetched_once]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
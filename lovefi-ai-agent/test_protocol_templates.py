@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+"""
+Tests for pre-serialized protocol messages
+"""
+
+import sys
+import os
+import asyncio
+import json
+
+sys.path.append(os.path.dirname(__file__))
+from uagents import Model
+from protocol_templates import MessageTemplate, schema_digest, send_cached, send_template
+
+
+class Prompt(Model):
+    prompt: str
+    output_schema: dict = {}
+
+
+class RecordingContext:
+    """Stands in for a uagents Context and records send_raw calls"""
+
+    def __init__(self, queries=None):
+        self.sent = []
+        if queries is not None:
+            self._queries = queries
+
+    async def send_raw(self, destination, message_schema_digest, message_body, **kwargs):
+        self.sent.append((destination, message_schema_digest, message_body, kwargs))
+
+
+def test_render_merges_constant_and_variable_fields():
+    """Every combination of constant and variable fields renders valid JSON"""
+    with_constants = MessageTemplate(Prompt, output_schema={"type": "object"})
+    assert json.loads(with_constants.render(prompt="x")) == {"prompt": "x", "output_schema": {"type": "object"}}
+    assert json.loads(with_constants.render()) == {"output_schema": {"type": "object"}}
+    no_constants = MessageTemplate(Prompt)
+    assert json.loads(no_constants.render(prompt="x")) == {"prompt": "x"}
+    assert no_constants.render() == "{}"
+
+
+def test_sends_pass_pending_queries():
+    """Replies to a pending ctx.query resolve through the helpers, as they do through ctx.send"""
+    queries = {}
+    ctx = RecordingContext(queries)
+    asyncio.run(send_template(ctx, "agent1llm", MessageTemplate(Prompt), "proto", prompt="x"))
+    asyncio.run(send_cached(ctx, "agent1client", Prompt(prompt="y"), "proto"))
+    assert len(ctx.sent) == 2 and all(sent[3]["queries"] is queries for sent in ctx.sent)
+    assert ctx.sent[1][1] == schema_digest(Prompt)
+    # Interval contexts have no queries
+    interval_ctx = RecordingContext()
+    asyncio.run(send_cached(interval_ctx, "agent1client", Prompt(prompt="y")))
+    assert interval_ctx.sent[0][3]["queries"] is None
+
+
+def main():
+    """Run all tests"""
+    tests = [test_render_merges_constant_and_variable_fields, test_sends_pass_pending_queries]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
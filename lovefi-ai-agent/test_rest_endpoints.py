@@ -10,6 +10,17 @@ import time
 # 代理的基础URL
 BASE_URL = "http://localhost:8000"
 
+def print_timings(timings):
+    """Print the per-stage breakdown returned for requests sent with "timings": true"""
+    if not timings:
+        return
+    print(f"  Timings (total {timings['total_us']:.0f} us):")
+    for stage, us in timings["stages_us"].items():
+        print(f"    {stage}: {us:.1f} us")
+    for lookup in timings["geocode"]:
+        hit = "cache hit" if lookup["cache_hit"] else lookup["source"]
+        print(f"    geocode {lookup['address']!r}: {lookup['us']:.1f} us ({hit})")
+
 def test_get_agent_info():
     """Test GET /api/agent-info endpoint"""
     print("=== Testing GET /api/agent-info endpoint ===")
@@ -48,7 +59,8 @@ def test_simple_match_post():
         "age2": 26,
         "interests2": ["music", "photography", "food", "sports"],
         "location2": "Boston",
-        "preferences2": {"max_age_diff": 5}
+        "preferences2": {"max_age_diff": 5},
+        "timings": True
     }
     
     try:
@@ -65,6 +77,7 @@ def test_simple_match_post():
             print(f"  Details: {data['details']}")
             print(f"  Timestamp: {data['timestamp']}")
             print(f"  Agent address: {data['agent_address']}")
+            print_timings(data.get("timings"))
         else:
             print(f"❌ Request failed, status code: {response.status_code}")
             print(f"  Response content: {response.text}")
@@ -119,7 +132,8 @@ def test_full_match_post():
                 "selected_index": 2,
                 "selected_option": "balanced"
             }
-        ]
+        ],
+        "timings": True
     }
     
     try:
@@ -134,6 +148,7 @@ def test_full_match_post():
             print("✅ Successfully calculated full match score:")
             print(f"  Match score: {data['score']:.1f}/100")
             print(f"  Details: {data['details']}")
+            print_timings(data.get("timings"))
         else:
             print(f"❌ Request failed, status code: {response.status_code}")
             print(f"  Response content: {response.text}")
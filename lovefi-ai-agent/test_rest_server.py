@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the multi-process REST server's shared stats and ASGI routing
+"""
+
+import sys
+import os
+import asyncio
+import json
+
+sys.path.append(os.path.dirname(__file__))
+import dating_match_agent_rest_api as rest_api
+from admission import AdmissionLane
+from rest_server import WorkerStats, create_app, health_view
+from stage_metrics import StageMetrics
+
+
+async def call_async(app, method: str, path: str, body: bytes = b"", decode=json.loads):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": method, "path": path}, receive, send)
+    return sent[0]["status"], decode(sent[1]["body"]), dict(sent[0]["headers"])
+
+
+def call(app, method: str, path: str, body: bytes = b""):
+    return asyncio.run(call_async(app, method, path, body))[:2]
+
+
+def test_health_combines_worker_rows():
+    """The health view sums every worker's counters and flags stale workers"""
+    stats = WorkerStats(2)
+    for slot, pid in ((0, 100), (1, 101)):
+        stats.set(slot, "pid", pid)
+        stats.set(slot, "started", 1000.0)
+        stats.set(slot, "heartbeat", 1009.0 if slot == 0 else 1000.0)
+        stats.add(slot, "requests", 4)
+        stats.add(slot, "latency_seconds", 0.2)
+    view = health_view(stats, now=1010.0)
+    assert view["status"] == "degraded"
+    assert view["totals"]["requests"] == 8
+    assert [worker["alive"] for worker in view["workers"]] == [True, False]
+    assert view["workers"][0]["avg_latency_ms"] == 50.0
+
+
+def test_app_serves_rest_handlers():
+    """Requests are routed to the agent's REST handlers and counted for the worker slot"""
+    stats = WorkerStats(1)
+    app = create_app(stats, 0)
+    status, body = call(app, "GET", "/api/agent-info")
+    assert status == 200 and body["name"] == "DatingMatchAgent"
+    status, body = call(app, "POST", "/api/match/full", b'{"gender1": "x"}')
+    assert status == 400 and body["msg"] == "field required"
+    assert call(app, "GET", "/api/unknown")[0] == 404
+    assert stats.row(0)["requests"] == 2 and stats.row(0)["errors"] == 1
+
+
+def test_saturated_lane_returns_429():
+    """A request rejected by admission control is answered with 429 and Retry-After"""
+    lane = rest_api.interactive_admission
+    rest_api.interactive_admission = AdmissionLane("interactive", max_concurrent=1, max_queue=0, max_wait=2.0)
+    request = json.dumps({
+        "name1": "Alice", "age1": 25, "interests1": ["hiking"], "location1": "",
+        "name2": "Bob", "age2": 27, "interests2": ["hiking"], "location2": "",
+    }).encode()
+
+    async def scenario():
+        async with rest_api.interactive_admission:
+            return await call_async(create_app(WorkerStats(1), 0), "POST", "/api/match/simple", request)
+
+    try:
+        status, body, headers = asyncio.run(scenario())
+    finally:
+        rest_api.interactive_admission = lane
+    assert status == 429 and headers[b"retry-after"] == b"2"
+    assert body["score"] == 0.0 and "server busy" in body["details"]
+
+
+def test_simple_match_timings_on_request():
+    """timings: true adds the per-stage breakdown to the response; it is absent otherwise"""
+    request = {
+        "name1": "Alice", "age1": 25, "interests1": ["hiking"], "location1": "",
+        "name2": "Bob", "age2": 27, "interests2": ["hiking"], "location2": "",
+    }
+    app = create_app(WorkerStats(1), 0)
+    status, body = call(app, "POST", "/api/match/simple", json.dumps(request).encode())
+    assert status == 200 and body["timings"] is None
+    status, body = call(app, "POST", "/api/match/simple", json.dumps({**request, "timings": True}).encode())
+    stages = body["timings"]["stages_us"]
+    assert status == 200 and set(stages) == {"score_interest", "score_age", "score_location", "score_preference"}
+    assert body["timings"]["total_us"] >= sum(stages.values())
+
+
+def test_metrics_sum_worker_histograms():
+    """GET /api/metrics serves the stage histograms of every worker slot added together"""
+    stats = WorkerStats(2)
+    StageMetrics(stats.stage_values(0)).observe("parse", 20_000)
+    StageMetrics(stats.stage_values(1)).observe("parse", 2_000_000)
+    status, body, headers = asyncio.run(call_async(create_app(stats, 0), "GET", "/api/metrics", decode=bytes.decode))
+    assert status == 200 and headers[b"content-type"].startswith(b"text/plain")
+    assert 'match_stage_seconds_bucket{stage="parse",le="2.5e-05"} 1' in body
+    assert 'match_stage_seconds_count{stage="parse"} 2' in body
+
+
+def main():
+    """Run all tests"""
+    tests = [test_health_combines_worker_rows, test_app_serves_rest_handlers, test_saturated_lane_returns_429,
+             test_simple_match_timings_on_request, test_metrics_sum_worker_histograms]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+"""
+Tests for per-message tracing spans propagated by session, and the stand-in trace collector
+"""
+
+import sys
+import os
+import asyncio
+import json
+import logging
+import tempfile
+import threading
+import time
+import uuid
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(__file__))
+import dating_match_agent
+from session_tracing import (
+    KIND_CLIENT, NOOP_SPAN, SCORING_FAILED, FileExporter, OtlpHttpExporter, SessionTracer, timing_attributes,
+    trace_id_for,
+)
+from stage_metrics import RequestTimings
+from trace_collector import breakdown, make_server, read_spans
+
+
+def chat_match(tracer: SessionTracer, session: str, llm_seconds: float, msg_id: str = "msg-1"):
+    """The span sequence of a chat match that goes through the LLM agent"""
+    trace = tracer.trace(session, msg_id, "chat_match", sender="agent1user")
+    with trace.child("parse_text"):
+        pass
+    tracer.hand_off(session, trace, "llm", agent="agent1llm")
+    time.sleep(llm_seconds)
+    resumed = tracer.resume(session, "chat_match", llm_agent="agent1llm")
+    assert resumed is trace
+    with trace.child("score") as span:
+        span.set(score=87.5)
+    trace.end()
+
+
+def test_hops_share_the_message_trace():
+    """Spans from both handlers land in one trace, and the report names the LLM hop as the slow one"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        tracer = SessionTracer(FileExporter(path))
+        session = str(uuid.uuid4())
+        chat_match(tracer, session, 0.05)
+        tracer.flush()
+        spans = read_spans(path)
+        assert tracer.stats()["exported"] == 4 and tracer.stats()["parked"] == 0
+
+    assert {span["trace_id"] for span in spans} == {trace_id_for(session, "msg-1")}
+    by_name = {span["name"]: span for span in spans}
+    root = by_name["chat_match"]
+    assert root["parent_id"] is None
+    assert all(span["parent_id"] == root["span_id"] for name, span in by_name.items() if name != "chat_match")
+    assert by_name["llm"]["duration_ms"] >= 50
+    report = breakdown(spans)
+    assert report["traces"] == 1 and report["slowest"][0]["slowest_hop"] == "llm"
+    assert report["hops"]["llm"]["share"] > report["hops"]["score"]["share"]
+
+
+def test_messages_in_a_session_get_separate_traces():
+    """Two matches in one chat session are two traces, each with a single root"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        tracer = SessionTracer(FileExporter(path))
+        session = str(uuid.uuid4())
+        chat_match(tracer, session, 0.0, msg_id="msg-1")
+        chat_match(tracer, session, 0.0, msg_id="msg-2")
+        tracer.flush()
+        spans = read_spans(path)
+    roots = [span for span in spans if span["parent_id"] is None]
+    assert len(roots) == 2 and len({span["trace_id"] for span in roots}) == 2
+    assert breakdown(spans)["traces"] == 2
+
+
+def test_scoring_failure_marks_the_root():
+    """When scoring raises, the chat match root span carries an error as well as the score span"""
+    class RecordingContext:
+        def __init__(self, session):
+            self.session = session
+            self.logger = logging.getLogger("test_session_tracing")
+            self.sent = []
+
+        async def send(self, destination, message):
+            self.sent.append((destination, message))
+
+        async def send_raw(self, destination, schema_digest, body, **kwargs):
+            self.sent.append((destination, body))
+
+    with open(os.path.join(os.path.dirname(__file__), "match_request.json")) as f:
+        output = json.load(f)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        tracer = SessionTracer(FileExporter(path))
+        session = str(uuid.uuid4())
+        dating_match_agent.chat_sessions.open(session, "agent1user")
+        tracer.hand_off(session, tracer.trace(session, "msg-1", "chat_match"), "llm")
+        ctx = RecordingContext(session)
+
+        def failing_scorer(*args, **kwargs):
+            raise RuntimeError("geocoder exploded")
+
+        with patch.object(dating_match_agent, "tracer", tracer), \
+                patch.object(dating_match_agent, "calculate_match_score_internal", failing_scorer):
+            asyncio.run(dating_match_agent.handle_structured_output_response(
+                ctx, "agent1llm", dating_match_agent.StructuredOutputResponse(output=output)
+            ))
+        tracer.flush()
+        spans = {span["name"]: span for span in read_spans(path)}
+    assert [destination for destination, _ in ctx.sent] == ["agent1user"]
+    assert spans["score"]["error"] == "geocoder exploded"
+    assert spans["chat_match"]["error"] == SCORING_FAILED
+    assert "reply" not in spans
+
+
+def test_disabled_tracer_is_a_noop():
+    """Without an exporter every span is NOOP_SPAN and nothing is parked"""
+    tracer = SessionTracer()
+    trace = tracer.trace("session", "msg-1", "chat_match")
+    assert trace is NOOP_SPAN and trace.child("score") is NOOP_SPAN
+    assert tracer.hand_off("session", trace, "llm") is NOOP_SPAN
+    assert tracer.resume("session", "chat_match") is NOOP_SPAN
+    trace.set(score=1.0)
+    trace.end()
+    assert tracer.stats() == {"enabled": False, "parked": 0, "exported": 0, "failed": 0, "expired": 0}
+
+
+def test_unanswered_hop_expires():
+    """A parked trace whose reply never comes is ended with an error; a late reply starts a new root"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        tracer = SessionTracer(FileExporter(path), ttl=0.0)
+        trace = tracer.trace("not-a-uuid", "msg-1", "chat_match")
+        llm = tracer.hand_off("not-a-uuid", trace, "llm")
+        assert llm.kind == KIND_CLIENT
+        assert tracer.sweep() == 1 and tracer.stats()["parked"] == 0
+        late = tracer.resume("not-a-uuid", "chat_match")
+        assert late is not trace and late.trace_id != trace.trace_id and late.attributes["resumed"] is False
+        late.end()
+        tracer.flush()
+        spans = read_spans(path)
+    assert [span["error"] for span in spans] == ["no reply within the session TTL"] * 2 + [None]
+
+
+def test_timing_attributes():
+    """A scorer's RequestTimings becomes flat span attributes"""
+    timings = RequestTimings()
+    timings.add("score_interest", 1500)
+    timings.address("Paris", True, "cache", 2000)
+    timings.address("Lyon", False, "remote", 90000)
+    assert timing_attributes(timings) == {"score_interest_us": 1.5, "geocode_addresses": 2, "geocode_cache_hits": 1}
+    assert timing_attributes(None) == {}
+
+
+def test_otlp_http_export_to_collector():
+    """Spans POSTed as OTLP/JSON are appended by the stand-in collector"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "collected.jsonl")
+        server = make_server("127.0.0.1", 0, path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            tracer = SessionTracer(OtlpHttpExporter(f"http://127.0.0.1:{server.server_address[1]}"))
+            chat_match(tracer, str(uuid.uuid4()), 0.0)
+            tracer.flush()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert tracer.stats()["failed"] == 0
+        assert sorted(span["name"] for span in read_spans(path)) == ["chat_match", "llm", "parse_text", "score"]
+
+
+def main():
+    """Run all tests"""
+    tests = [test_hops_share_the_message_trace, test_messages_in_a_session_get_separate_traces,
+             test_scoring_failure_marks_the_root, test_disabled_tracer_is_a_noop, test_unanswered_hop_expires,
+             test_timing_attributes, test_otlp_http_export_to_collector]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the per-stage latency histograms
+"""
+
+import sys
+import os
+import threading
+from array import array
+
+sys.path.append(os.path.dirname(__file__))
+from dedup_cache import MISSING
+from geocode_budget import BudgetedGeocoder, Deadline
+from stage_metrics import SIZE, RequestTimings, StageMetrics
+import stage_metrics
+
+
+def test_observe_and_render():
+    """Observations land in the first bucket at or above them and render cumulatively"""
+    metrics = StageMetrics()
+    metrics.observe("parse", 1_000)
+    metrics.observe("parse", 3_000)
+    metrics.observe("parse", 20_000_000_000)
+    assert metrics.count("parse") == 3 and metrics.count("send") == 0
+    text = metrics.render()
+    assert 'match_stage_seconds_bucket{stage="parse",le="1e-06"} 1' in text
+    assert 'match_stage_seconds_bucket{stage="parse",le="5e-06"} 2' in text
+    assert 'match_stage_seconds_bucket{stage="parse",le="10"} 2' in text
+    assert 'match_stage_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+    assert 'match_stage_seconds_sum{stage="parse"} 20.000004000' in text
+    assert 'match_stage_seconds_count{stage="send"} 0' in text
+
+
+def test_bound_values_are_merged():
+    """Metrics bound to an external buffer record there and merge with others"""
+    shared = array("d", bytes(8 * SIZE))
+    worker = StageMetrics()
+    worker.bind(memoryview(shared))
+    worker.observe("score_age", 500)
+    other = StageMetrics()
+    other.observe("score_age", 700)
+    assert StageMetrics(shared).count("score_age") == 1 and worker.count("score_age") == 1
+    assert StageMetrics.merged([StageMetrics(shared), other]).count("score_age") == 2
+
+
+class Cache(dict):
+    def get(self, key):
+        return super().get(key, MISSING)
+
+    def put(self, key, value):
+        self[key] = value
+
+
+def test_geocoder_records_hit_and_miss():
+    """locate() records cache hits and misses separately"""
+    before = (stage_metrics.METRICS.count("geocode_hit"), stage_metrics.METRICS.count("geocode_miss"))
+    geocoder = BudgetedGeocoder(lambda address: (1.0, 2.0), Cache(a=(1.0, 1.0), b=(2.0, 2.0)))
+    assert geocoder.locate("a", "b", Deadline())[2] == "cache"
+    assert geocoder.locate("", "b", Deadline())[2] == "neutral"
+    after = (stage_metrics.METRICS.count("geocode_hit"), stage_metrics.METRICS.count("geocode_miss"))
+    assert after == (before[0] + 1, before[1] + 1)
+
+
+def test_request_timings_per_address():
+    """A Deadline carrying RequestTimings gets one geocode entry per address with its source"""
+    geocoder = BudgetedGeocoder(lambda address: (3.0, 4.0), Cache(a=(1.0, 1.0)))
+    deadline = Deadline()
+    deadline.timings = RequestTimings()
+    assert geocoder.locate("a", "b", deadline)[2] == "geocoder"
+    deadline.timings.add("score_age", 1500)
+    timings = deadline.timings.as_dict()
+    assert [(entry["address"], entry["cache_hit"], entry["source"]) for entry in timings["geocode"]] == [
+        ("a", True, "cache"), ("b", False, "geocoder"),
+    ]
+    assert timings["stages_us"] == {"score_age": 1.5}
+    assert timings["total_us"] >= timings["geocode"][1]["us"] > 0
+
+
+def test_concurrent_observations_are_not_lost():
+    """Observations from several threads all land, and the sum agrees with the count"""
+    metrics = StageMetrics()
+    threads = [
+        threading.Thread(target=lambda: [metrics.observe("score_location", 3_000) for _ in range(20_000)])
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert metrics.count("score_location") == 80_000
+    assert metrics.snapshot()[stage_metrics.STAGES.index("score_location") * stage_metrics.ROW + stage_metrics._SUM] == 80_000 * 3_000
+
+
+def main():
+    """Run all tests"""
+    tests = [test_observe_and_render, test_bound_values_are_merged, test_geocoder_records_hit_and_miss,
+             test_request_timings_per_address, test_concurrent_observations_are_not_lost]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
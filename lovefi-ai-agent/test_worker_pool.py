@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the dispatcher's least-outstanding routing and worker health tracking
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+from dating_match_agent import MatchBatchItem, MatchBatchRequest, MatchRequest
+from dating_match_dispatcher import WorkerJob, unanswered
+from worker_pool import WorkerPool
+
+
+def test_routes_to_least_outstanding_worker():
+    """New jobs go to the worker with the fewest jobs in flight"""
+    pool = WorkerPool(["w1", "w2"])
+    pool.start("j1", pool.pick(now=0), "client", "job-1", now=0)
+    pool.start("j2", pool.pick(now=0), "client", "job-2", now=0)
+    assert {job.worker for job in pool.jobs.values()} == {"w1", "w2"}
+    pool.reply("j2", pool.jobs["j2"].worker, now=1)
+    assert pool.pick(now=1) == pool.workers["w2"].address
+    assert pool.pick(exclude=["w2"], now=1) == "w1"
+
+
+def test_replies_are_correlated_to_client():
+    """Partial replies keep the job open, the final one closes it, strangers are ignored"""
+    pool = WorkerPool(["w1"])
+    pool.start("j1", "w1", "agent1client", "batch", now=0)
+    assert pool.reply("j1", "w2", now=1) is None
+    assert pool.reply("j1", "w1", done=False, now=1).client == "agent1client"
+    assert pool.workers["w1"].outstanding == 1
+    assert pool.reply("j1", "w1", now=2).message == "batch"
+    assert pool.reply("j1", "w1", now=3) is None
+    assert pool.workers["w1"].outstanding == 0
+
+
+def test_failing_worker_is_taken_out_of_rotation():
+    """Timeouts mark a worker down; after the cooldown it gets one probe job"""
+    pool = WorkerPool(["w1", "w2"], job_timeout=10, max_failures=2, cooldown=30)
+    for i in range(2):
+        pool.start(f"j{i}", "w1", "client", "job", now=0)
+    expired = pool.expire(now=10)
+    assert len(expired) == 2
+    assert pool.pick(now=11) == "w2"
+    pool.start("j3", "w2", "client", "job", now=11)
+    pool.start("j4", "w2", "client", "job", now=11)
+    assert pool.pick(now=20) == "w2"
+    assert pool.pick(now=41) == "w1"
+    pool.start("probe", "w1", "client", "job", now=41)
+    assert pool.pick(exclude=["w2"], now=42) is None
+    pool.reply("probe", "w1", now=43)
+    assert pool.stats(now=43)[0]["healthy"]
+
+
+def test_retry_skips_forwarded_batch_items():
+    """A batch that times out after some chunks were forwarded is retried for the other items only"""
+    with open(os.path.join(os.path.dirname(__file__), "match_request.json")) as f:
+        request = MatchRequest.parse_raw(f.read())
+    items = [MatchBatchItem(correlation_id=f"pair-{i}", request=request) for i in range(3)]
+    job = WorkerJob(job_id="j1", batch=MatchBatchRequest(batch_id="b1", items=items))
+    pool = WorkerPool(["w1", "w2"], job_timeout=10)
+    pool.start("j1", "w1", "agent1client", job, now=0)
+    assert unanswered(pool.jobs["j1"]) is job
+    pool.reply("j1", "w1", done=False, now=1, parts=["pair-0", "pair-2"])
+    [expired] = pool.expire(now=11)
+    retry = unanswered(expired)
+    assert retry.job_id == "j1" and retry.batch.batch_id == "b1"
+    assert [item.correlation_id for item in retry.batch.items] == ["pair-1"]
+    assert len(job.batch.items) == 3
+    expired.answered.add("pair-1")
+    assert unanswered(expired) is None
+
+
+def main():
+    """Run all tests"""
+    tests = [test_routes_to_least_outstanding_worker, test_replies_are_correlated_to_client,
+             test_failing_worker_is_taken_out_of_rotation, test_retry_skips_forwarded_batch_items]
+    for test_func in tests:
+        test_func()
+        print(f"✅ {test_func.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,14 @@ from uagents import Agent, Context, Model
 from typing import List
 import asyncio
 import time
+from uuid import uuid4
 
 # Import the proper models from dating_match_agent
-from dating_match_agent import MatchRequest, MatchResponse, PersonalInfo, Location, Preference
+from dating_match_agent import (
+    MatchRequest, MatchResponse, PersonalInfo, Location, Preference,
+    MatchBatchItem, MatchBatchRequest, MatchBatchResponse,
+)
+from match_batch import chunk_by_size
 
 # Initialize the test agent
 test_agent = Agent(
@@ -157,6 +162,8 @@ def create_match_request(profile):
 # Track test results
 test_results = []
 current_test_index = 0
+# Send every test profile in MatchBatchRequest envelopes instead of one MatchRequest each
+batch_mode = False
 
 # Handle responses from the dating agent
 @test_agent.on_message(MatchResponse)
@@ -188,6 +195,21 @@ async def handle_match_response(ctx: Context, sender: str, response: MatchRespon
             # All tests completed, print summary
             print_test_summary(ctx)
 
+@test_agent.on_message(MatchBatchResponse)
+async def handle_match_batch_response(ctx: Context, sender: str, response: MatchBatchResponse):
+    for result in response.results:
+        profile = TEST_PROFILES[int(result.correlation_id)]
+        test_results.append({
+            "name": profile["name"],
+            "score": result.score,
+            "details": result.details,
+            "expected": profile["expected"]
+        })
+        ctx.logger.info(f"✅ Received batch result for {profile['name']}: Score {result.score:.1f}/100")
+    ctx.logger.info(f"📦 Batch {response.batch_id} chunk {response.chunk + 1}/{response.chunks}")
+    if len(test_results) == len(TEST_PROFILES):
+        print_test_summary(ctx)
+
 def print_test_summary(ctx):
     """Print a summary of all test results"""
     ctx.logger.info("\n" + "=" * 60)
@@ -211,13 +233,23 @@ async def send_test_requests(ctx: Context):
     
     ctx.logger.info("🚀 Starting Dating Match Agent Tests")
     ctx.logger.info(f"Running {len(TEST_PROFILES)} test cases...\n")
-    
+    dating_agent_address = "agent1qgh8g2gfcrrcjqjuuav8v6de3tp3dtc7f5hz4aveccpyym0g6s06ge5yf9w"
+
+    if batch_mode:
+        items = [
+            MatchBatchItem(correlation_id=str(i), request=create_match_request(profile))
+            for i, profile in enumerate(TEST_PROFILES)
+        ]
+        for chunk in chunk_by_size(items):
+            await ctx.send(dating_agent_address, MatchBatchRequest(batch_id=str(uuid4()), items=chunk, with_details=True))
+            ctx.logger.info(f"📤 Sent batch of {len(chunk)} test requests")
+        return
+
     # Send the first test
     if TEST_PROFILES:
         current_test_index = 0
         profile = TEST_PROFILES[current_test_index]
         request = create_match_request(profile)
-        dating_agent_address = "agent1qgh8g2gfcrrcjqjuuav8v6de3tp3dtc7f5hz4aveccpyym0g6s06ge5yf9w"
         await ctx.send(dating_agent_address, request)
         ctx.logger.info(f"📤 Sent first test request: {profile['name']}")
 
@@ -225,7 +257,8 @@ async def send_test_requests(ctx: Context):
 if __name__ == "__main__":
     import sys
     
-    if len(sys.argv) > 1 and sys.argv[1] == "--run-tests":
+    if len(sys.argv) > 1 and sys.argv[1] in ("--run-tests", "--run-batch-tests"):
+        batch_mode = sys.argv[1] == "--run-batch-tests"
         # Run the actual agent communication tests
         print("🚀 Starting Dating Match Agent Communication Tests")
         print(f"TestAgent address: {test_agent.address}")
@@ -263,6 +296,7 @@ if __name__ == "__main__":
         print("   python dating_match_agent.py")
         print("\n2. Then, in another terminal, run the tests:")
         print("   python testing_dating_match_agent.py --run-tests")
+        print("   (or --run-batch-tests to send all profiles in one MatchBatchRequest)")
         print("\n3. Or run direct function tests:")
         print("   python test_agent_logic.py")
         print("=" * 60)
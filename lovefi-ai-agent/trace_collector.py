@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""
+Stand-in OTLP/HTTP trace collector and latency breakdown for session traces.
+
+serve accepts OTLP/JSON on POST /v1/traces, the format that
+session_tracing.py sends when LOVEFI_TRACE_ENDPOINT is set. It appends
+each request to a JSON-lines file, which is the same format
+LOVEFI_TRACE_FILE writes directly. report reads such a file and, for
+every span name (hop), prints the latency percentiles and the share of
+end-to-end time spent in it. It also lists the slowest traces with the
+hop that dominated each one.
+
+    python trace_collector.py serve --port 4318 --out traces.jsonl
+    LOVEFI_TRACE_ENDPOINT=http://localhost:4318 python dating_match_agent.py
+    python trace_collector.py report traces.jsonl
+"""
+
+import argparse
+import json
+import sys
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+SLOWEST_TRACES = 10
+
+
+def read_spans(path: str) -> List[Dict[str, Any]]:
+    """Flattened spans (trace_id, span_id, parent_id, name, duration_ms, error) from an OTLP/JSON lines file"""
+    spans = []
+    with open(path) as lines:
+        for line in lines:
+            try:
+                payload = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line while the agent is still writing
+                continue
+            for resource in payload.get("resourceSpans", []):
+                for scope in resource.get("scopeSpans", []):
+                    for span in scope.get("spans", []):
+                        spans.append({
+                            "trace_id": span["traceId"],
+                            "span_id": span["spanId"],
+                            "parent_id": span.get("parentSpanId"),
+                            "name": span["name"],
+                            "duration_ms": (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6,
+                            "error": span.get("status", {}).get("message"),
+                        })
+    return spans
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+
+def breakdown(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-hop latency percentiles and the slowest traces with their dominant hop"""
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        traces[span["trace_id"]].append(span)
+    total_ms = 0.0
+    durations: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    slowest = []
+    for trace_id, trace in traces.items():
+        roots = [span for span in trace if not span["parent_id"]]
+        hops = [span for span in trace if span["parent_id"]]
+        end_to_end = sum(span["duration_ms"] for span in roots)
+        total_ms += end_to_end
+        for span in trace:
+            durations[span["name"]].append(span["duration_ms"])
+            if span["error"]:
+                errors[span["name"]] += 1
+        slow_hop = max(hops, key=lambda span: span["duration_ms"], default=None)
+        slowest.append({
+            "trace_id": trace_id,
+            "total_ms": round(end_to_end, 3),
+            "slowest_hop": slow_hop["name"] if slow_hop else None,
+            "slowest_hop_ms": round(slow_hop["duration_ms"], 3) if slow_hop else 0.0,
+        })
+    hops = {
+        name: {
+            "count": len(values),
+            "errors": errors[name],
+            "p50_ms": round(percentile(values, 0.5), 3),
+            "p90_ms": round(percentile(values, 0.9), 3),
+            "p99_ms": round(percentile(values, 0.99), 3),
+            "max_ms": round(max(values), 3),
+            "share": round(sum(values) / total_ms, 4) if total_ms else 0.0,
+        }
+        for name, values in durations.items()
+    }
+    slowest.sort(key=lambda trace: trace["total_ms"], reverse=True)
+    return {"traces": len(traces), "hops": hops, "slowest": slowest[:SLOWEST_TRACES]}
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"{report['traces']} traces")
+    print(f"{'span':<16}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'share':>8}")
+    for name, hop in sorted(report["hops"].items(), key=lambda item: item[1]["share"], reverse=True):
+        print(f"{name:<16}{hop['count']:>8}{hop['errors']:>8}{hop['p50_ms']:>10.1f}{hop['p90_ms']:>10.1f}"
+              f"{hop['p99_ms']:>10.1f}{hop['max_ms']:>10.1f}{hop['share']:>8.1%}")
+    print("\nSlowest traces:")
+    for trace in report["slowest"]:
+        print(f"  {trace['trace_id']}  {trace['total_ms']:.1f} ms, slowest hop {trace['slowest_hop']} "
+              f"({trace['slowest_hop_ms']:.1f} ms)")
+
+
+def make_server(host: str, port: int, out: str) -> ThreadingHTTPServer:
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/traces":
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError:
+                self.send_error(400, "expected OTLP/JSON")
+                return
+            with lock, open(out, "a") as traces:
+                traces.write(json.dumps(payload, separators=(",", ":")) + "\n")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="accept OTLP/JSON on POST /v1/traces")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=4318)
+    serve.add_argument("--out", default="traces.jsonl")
+    report = commands.add_parser("report", help="latency breakdown per hop")
+    report.add_argument("path")
+    report.add_argument("--json", action="store_true", help="print the breakdown as JSON")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = make_server(args.host, args.port, args.out)
+        print(f"Collecting traces on http://{args.host}:{args.port}/v1/traces into {args.out}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+    result = breakdown(read_spans(args.path))
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Routing and health state for the dispatcher's pool of scoring workers.
+
+Jobs go to the healthy worker with the fewest outstanding jobs. A job that
+gets no reply within job_timeout counts as a failure for its worker; after
+max_failures consecutive failures the worker is taken out of rotation for
+cooldown seconds and then given one job at a time until it answers again.
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+DEFAULT_JOB_TIMEOUT = 30.0
+DEFAULT_MAX_FAILURES = 3
+DEFAULT_COOLDOWN = 30.0
+
+
+class WorkerState:
+    __slots__ = ("address", "outstanding", "failures", "down_until", "completed", "last_reply")
+
+    def __init__(self, address: str):
+        self.address = address
+        self.outstanding = 0
+        self.failures = 0
+        self.down_until = 0.0
+        self.completed = 0
+        self.last_reply: Optional[float] = None
+
+
+class PendingJob:
+    __slots__ = ("job_id", "client", "worker", "message", "started", "attempts", "answered")
+
+    def __init__(self, job_id: str, client: str, worker: str, message: Any, started: float, attempts: int):
+        self.job_id = job_id
+        self.client = client
+        self.worker = worker
+        self.message = message
+        self.started = started
+        self.attempts = attempts
+        # Ids of the parts (batch correlation ids) already forwarded to the client
+        self.answered: Set[str] = set()
+
+
+class WorkerPool:
+    def __init__(self, addresses: Iterable[str], job_timeout: float = DEFAULT_JOB_TIMEOUT,
+                 max_failures: int = DEFAULT_MAX_FAILURES, cooldown: float = DEFAULT_COOLDOWN):
+        self.workers: Dict[str, WorkerState] = {address: WorkerState(address) for address in addresses}
+        self.jobs: Dict[str, PendingJob] = {}
+        self.job_timeout = job_timeout
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+
+    def _available(self, worker: WorkerState, now: float) -> bool:
+        if worker.failures < self.max_failures:
+            return True
+        # Cooled-down workers get a single probe job before rejoining the rotation
+        return worker.down_until <= now and worker.outstanding == 0
+
+    def pick(self, exclude: Iterable[str] = (), now: Optional[float] = None) -> Optional[str]:
+        """Healthy worker with the fewest outstanding jobs, or None if none is available"""
+        now = time.monotonic() if now is None else now
+        exclude = set(exclude)
+        best = None
+        for worker in self.workers.values():
+            if worker.address in exclude or not self._available(worker, now):
+                continue
+            if best is None or worker.outstanding < best.outstanding:
+                best = worker
+        return best.address if best is not None else None
+
+    def start(self, job_id: str, worker: str, client: str, message: Any, attempts: int = 1,
+              now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self.jobs[job_id] = PendingJob(job_id, client, worker, message, now, attempts)
+        self.workers[worker].outstanding += 1
+
+    def reply(self, job_id: str, worker: str, done: bool = True, now: Optional[float] = None,
+              parts: Iterable[str] = ()) -> Optional[PendingJob]:
+        """
+        Record a reply from worker carrying parts; returns the job (removed if
+        done) or None for unknown, late or misrouted replies
+        """
+        now = time.monotonic() if now is None else now
+        job = self.jobs.get(job_id)
+        if job is None or job.worker != worker:
+            return None
+        job.answered.update(parts)
+        state = self.workers[worker]
+        state.failures = 0
+        state.last_reply = now
+        if done:
+            del self.jobs[job_id]
+            state.outstanding -= 1
+            state.completed += 1
+        else:
+            # Partial replies (batch chunks) show the worker is alive; restart the clock
+            job.started = now
+        return job
+
+    def expire(self, now: Optional[float] = None) -> List[PendingJob]:
+        """Remove and return jobs that timed out, counting a failure against their worker"""
+        now = time.monotonic() if now is None else now
+        expired = [job for job in self.jobs.values() if now - job.started >= self.job_timeout]
+        for job in expired:
+            del self.jobs[job.job_id]
+            state = self.workers[job.worker]
+            state.outstanding -= 1
+            state.failures += 1
+            if state.failures >= self.max_failures:
+                state.down_until = now + self.cooldown
+        return expired
+
+    def stats(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        now = time.monotonic() if now is None else now
+        return [
+            {
+                "address": worker.address,
+                "healthy": worker.failures < self.max_failures,
+                "outstanding": worker.outstanding,
+                "completed": worker.completed,
+                "failures": worker.failures,
+                "last_reply_seconds_ago": None if worker.last_reply is None else round(now - worker.last_reply, 1),
+            }
+            for worker in self.workers.values()
+        ]